@@ -5,15 +5,19 @@ from flask import Flask, jsonify
 from flask_wtf import CSRFProtect
 from flask_mail import Mail
 from models import db
-from routes import auth, emergency_plan, incident, security_check, user, event_type, summary, message
+from routes import auth, emergency_plan, incident, security_check, user, event_type, summary, message, export, bulk_import
 from config import Config
 from version import version
+from utils.audit import audit_writer
+from utils.email import mail_dispatcher
 # from flasgger import Swagger
 app = Flask(__name__)
 app.config.from_object(Config)
 db.init_app(app)
+audit_writer.init_app(app)  # 审计日志异步批量写入
 #csrf = CSRFProtect(app)
 mail = Mail(app)
+mail_dispatcher.init_app(app)  # 邮件异步发送
 # Swagger(app)
 # 注册蓝图
 app.register_blueprint(auth)
@@ -24,6 +28,8 @@ app.register_blueprint(user)
 app.register_blueprint(event_type)
 app.register_blueprint(summary)
 app.register_blueprint(message)
+app.register_blueprint(export)
+app.register_blueprint(bulk_import)
 # OpenAPI 全局信息
 """
 openapi: 3.0.0
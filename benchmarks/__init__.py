@@ -0,0 +1,34 @@
+# benchmarks/__init__.py
+"""
+端到端基准测试 (经过完整的 Flask 应用和路由), 在仓库根目录运行:
+    python -m benchmarks.login
+    python -m benchmarks.broadcast
+数据库为临时目录下的 SQLite 文件, 未设置的必需环境变量使用占位值
+单个模块的计算基准见各模块自带的 __main__ (如 python -m utils.search)
+"""
+import os
+import tempfile
+
+def load_app():
+    """设置环境变量后导入 app, 返回 (app, 临时目录)"""
+    directory = tempfile.mkdtemp(prefix='air_emergency_bench_')
+    for key, value in {
+        'JWT_SECRET_KEY': 'bench-jwt-secret',
+        'SM2_PRIVATE_KEY': 'bench-sm2-key',
+        'SECRET_KEY': 'bench-secret-key',
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': '2525',
+        'MAIL_USERNAME': 'bench',
+        'MAIL_PASSWORD': 'bench',
+        'MAIL_DEFAULT_SENDER': 'noreply@example.com',
+    }.items():
+        os.environ.setdefault(key, value)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'bench.db')
+    os.environ['SEARCH_INDEX_PATH'] = os.path.join(directory, 'incident_search.db')
+    from app import app
+    app.config['TESTING'] = True
+    return app, directory
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
@@ -0,0 +1,55 @@
+# benchmarks/broadcast.py
+"""
+群发消息基准测试: 向同一角色的全部用户 (默认 10000 人) 发送一条消息
+逐条: 对每个收件人调用 send_message, 每条消息单独提交
+群发: POST /messages/broadcast, 一次索引查询解析收件人, 一次批量插入、一次提交
+运行: python -m benchmarks.broadcast --recipients 10000
+"""
+import argparse
+import time
+from benchmarks import load_app
+
+def main():
+    parser = argparse.ArgumentParser(description='群发消息基准测试')
+    parser.add_argument('--recipients', type=int, default=10000, help='收件人数 (role_level=1 的用户数)')
+    parser.add_argument('--loop-sample', type=int, default=1000,
+                        help='逐条发送只实测前 N 人, 总耗时按比例估算 (0 表示全部实测)')
+    options = parser.parse_args()
+
+    app, _ = load_app()
+    from models import db, User, Message
+    from routes.message import send_message
+    from utils.jwt_utils import generate_jwt_token
+    with app.app_context():
+        db.create_all()
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'hashed_password': '-', 'salt': '-',
+             'role_level': 0 if i == 0 else 1, 'is_active': True} for i in range(options.recipients + 1)])
+        db.session.commit()
+        sender = User.query.filter_by(username='user0').first()
+        token = generate_jwt_token(sender, app.config['JWT_SECRET_KEY'])
+        recipient_ids = [uid for (uid,) in db.session.query(User.user_id).filter(User.role_level == 1)]
+
+        sample = recipient_ids[:options.loop_sample] if options.loop_sample else recipient_ids
+        start = time.perf_counter()
+        for recipient_id in sample:
+            send_message(sender.user_id, recipient_id, None, '请审批事件')
+        loop_seconds = (time.perf_counter() - start) * len(recipient_ids) / len(sample)
+        db.session.query(Message).delete()
+        db.session.commit()
+
+    client = app.test_client()
+    start = time.perf_counter()
+    response = client.post('/messages/broadcast', json={'content': '请审批事件', 'role_level': 1},
+                           headers={'Authorization': token})
+    broadcast_seconds = time.perf_counter() - start
+    assert response.status_code == 201, response.get_json()
+    assert response.get_json()['recipient_count'] == len(recipient_ids)
+
+    print(f'{len(recipient_ids)} 个收件人 (role_level=1)')
+    estimated = '' if len(sample) == len(recipient_ids) else f' (按前 {len(sample)} 人估算)'
+    print(f'逐条发送  {loop_seconds:8.2f} s{estimated}')
+    print(f'群发接口  {broadcast_seconds:8.2f} s  ({loop_seconds / broadcast_seconds:.0f}x)')
+
+if __name__ == '__main__':
+    main()
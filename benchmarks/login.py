@@ -0,0 +1,104 @@
+# benchmarks/login.py
+"""
+登录接口基准测试: 当前流程 (/login) 与改造前的流程对比
+改造前: 锁定检查查一次用户并统计失败次数, 登录查一次用户, 记录尝试再查一次用户并单独提交
+当前: 锁定检查走内存滑动窗口, 只查询一次用户, 登录尝试交给审计写入器异步批量写库
+两条路径使用同一个 SM3 实现, 差异只来自数据库访问
+运行: python -m benchmarks.login --requests 2000
+"""
+import argparse
+import datetime
+import threading
+import time
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import event
+from benchmarks import load_app, percentile
+
+MAX_FAILED_ATTEMPTS = 5
+BAN_DURATION = 300
+
+legacy = Blueprint('legacy_auth', __name__)
+
+def _legacy_is_user_banned(username):
+    from models import User, LoginAttempt
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        return False
+    cutoff_time = datetime.datetime.utcnow() - datetime.timedelta(seconds=BAN_DURATION)
+    failed_attempts = LoginAttempt.query.filter(
+        LoginAttempt.user_id == user.user_id,
+        LoginAttempt.success == False,
+        LoginAttempt.attempt_time >= cutoff_time
+    ).count()
+    return failed_attempts >= MAX_FAILED_ATTEMPTS
+
+def _legacy_record_attempt(username, ip_address, success):
+    from models import db, User, LoginAttempt
+    user = User.query.filter_by(username=username).first()
+    if user:
+        db.session.add(LoginAttempt(user_id=user.user_id, success=success, ip_address=ip_address))
+        db.session.commit()
+
+@legacy.route('/legacy-login', methods=['POST'])
+def legacy_login():
+    """改造前的 /login (去掉了与数据库无关的差异)"""
+    from models import User
+    from utils.jwt_utils import generate_jwt_token
+    from utils.sm_utils import encrypt_sm3
+    data = request.get_json()
+    username, password, ip_address = data.get('username'), data.get('password'), request.remote_addr
+    if _legacy_is_user_banned(username):
+        return jsonify({'message': '账户已锁定,请稍后重试!'}), 403
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        _legacy_record_attempt(username, ip_address, False)
+        return jsonify({'message': '用户不存在!'}), 404
+    if user.hashed_password != encrypt_sm3(password, user.salt):
+        _legacy_record_attempt(username, ip_address, False)
+        return jsonify({'message': '密码错误!'}), 401
+    token = generate_jwt_token(user, current_app.config['JWT_SECRET_KEY'])
+    _legacy_record_attempt(username, ip_address, True)
+    return jsonify({'token': token}), 200
+
+def main():
+    parser = argparse.ArgumentParser(description='登录接口基准测试')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=1000, help='用户表行数')
+    options = parser.parse_args()
+
+    app, _ = load_app()
+    app.register_blueprint(legacy)
+    from models import db, User
+    from utils.sm_utils import encrypt_sm3, generate_salt
+    with app.app_context():
+        db.create_all()
+        salt = generate_salt()
+        hashed = encrypt_sm3('password123', salt)
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'hashed_password': hashed, 'salt': salt,
+             'role_level': 3, 'is_active': True} for i in range(options.users)])
+        db.session.commit()
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *args: statements.append(threading.get_ident()))
+
+    client = app.test_client()
+    print(f'{options.requests} 次登录, users 表 {options.users} 行')
+    for label, path in (('改造前', '/legacy-login'), ('当前', '/login')):
+        latencies = []
+        statements.clear()
+        for i in range(options.requests):
+            # 每 10 次有 1 次密码错误; 来源 IP 轮换, 不会触发按 IP 的锁定
+            password = 'wrong-password' if i % 10 == 0 else 'password123'
+            start = time.perf_counter()
+            response = client.post(path, json={'username': f'user{i % options.users}', 'password': password},
+                                   environ_base={'REMOTE_ADDR': f'10.0.{i // 256 % 256}.{i % 256}'})
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code in (200, 401), response.get_json()
+        in_request = sum(1 for ident in statements if ident == threading.get_ident())
+        print(f'{label:<6} 平均 {sum(latencies) / len(latencies) * 1000:6.2f} ms  '
+              f'P50 {percentile(latencies, 50) * 1000:6.2f} ms  P95 {percentile(latencies, 95) * 1000:6.2f} ms  '
+              f'请求内 SQL {in_request / options.requests:.1f} 条/次')
+
+if __name__ == '__main__':
+    main()
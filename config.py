@@ -13,6 +13,13 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
     if not JWT_SECRET_KEY:
         raise ValueError("JWT_SECRET_KEY 环境变量未设置！")
+    # 已验证 Token 缓存 (按 Token 自身的 exp 过期)
+    JWT_CACHE_ENABLED = os.environ.get('JWT_CACHE_ENABLED', 'true').lower() == 'true'
+    JWT_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE', 4096))
+    # 用户身份缓存: 角色/状态变更时只有执行变更的进程立即失效, 其他 worker 进程最多延迟 TTL 秒生效
+    # (停用账户、降低角色在其他进程上最多仍有 TTL 秒可用); 每个活跃用户每 TTL 秒最多查询一次数据库
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 4096))
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', 5))
 
     # SM2私钥配置（必须通过环境变量设置！）
     SM2_PRIVATE_KEY = os.environ.get('SM2_PRIVATE_KEY')
@@ -42,7 +49,46 @@ class Config:
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
     if not MAIL_DEFAULT_SENDER:
         raise ValueError("MAIL_DEFAULT_SENDER 环境变量未设置!")
+    # 邮件异步发送
+    MAIL_WORKERS = int(os.environ.get('MAIL_WORKERS', 2))  # 每个 worker 复用一个 SMTP 连接
+    MAIL_QUEUE_SIZE = int(os.environ.get('MAIL_QUEUE_SIZE', 1000))
+    MAIL_MAX_RETRIES = int(os.environ.get('MAIL_MAX_RETRIES', 3))
+    MAIL_RETRY_BACKOFF = float(os.environ.get('MAIL_RETRY_BACKOFF', 2.0))  # 首次重试等待秒数, 之后翻倍
+    MAIL_IDLE_TIMEOUT = int(os.environ.get('MAIL_IDLE_TIMEOUT', 30))  # 连接空闲多久后关闭
+    MAIL_DEAD_LETTER_FILE = os.environ.get('MAIL_DEAD_LETTER_FILE')  # 默认为 instance 目录下的 mail_dead_letter.jsonl
+
+    # 新消息推送 (SSE)
+    SSE_HEARTBEAT_INTERVAL = int(os.environ.get('SSE_HEARTBEAT_INTERVAL', 15))  # 心跳间隔 (秒)
+    SSE_MAX_DURATION = int(os.environ.get('SSE_MAX_DURATION', 300))  # 单个连接最长保持时间 (秒), 到期后客户端自动重连
+    SSE_BUFFER_SIZE = int(os.environ.get('SSE_BUFFER_SIZE', 100))  # 每个连接的事件缓冲区大小
+
+    # 事件类型目录缓存: 其他进程中的变更最多延迟多少秒生效 (本进程内的变更立即生效)
+    EVENT_TYPE_CACHE_TTL = int(os.environ.get('EVENT_TYPE_CACHE_TTL', 300))
+
+    # 事件批量状态流转 (POST /incidents/transitions) 单次最多处理的事件数
+    MAX_BATCH_TRANSITIONS = int(os.environ.get('MAX_BATCH_TRANSITIONS', 1000))
+
+    # 批量导入: 每块校验、插入并提交的行数; 报告中最多返回的错误行数
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 2000))
+    IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 1000))
+
+    # 事件全文检索
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'fts5')  # fts5 或 memory
+    SEARCH_INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH')  # 默认存放在 instance 目录下
+    SEARCH_AUTOSAVE_EVERY = int(os.environ.get('SEARCH_AUTOSAVE_EVERY', 1000))  # memory 后端每多少次更新落盘一次
 
     # 其他参数
     MAX_FAILED_ATTEMPTS = int(os.environ.get('MAX_FAILED_ATTEMPTS', 5))
     BAN_DURATION = int(os.environ.get('BAN_DURATION', 300))
+    MAX_FAILED_ATTEMPTS_PER_IP = int(os.environ.get('MAX_FAILED_ATTEMPTS_PER_IP', 20))
+    # 登录锁定状态的本机共享存储 (SQLite 文件路径), 不设置则每个进程各自在内存中维护
+    LOGIN_GUARD_STORE = os.environ.get('LOGIN_GUARD_STORE')
+
+    # 审计日志异步批量写入
+    AUDIT_SYNC = os.environ.get('AUDIT_SYNC', 'false').lower() == 'true'  # 同步模式, 测试时开启
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 500))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))
+    AUDIT_ENQUEUE_TIMEOUT = float(os.environ.get('AUDIT_ENQUEUE_TIMEOUT', 0.05))
+    AUDIT_RETRY_DELAY = float(os.environ.get('AUDIT_RETRY_DELAY', 0.1))  # 整批写入失败后重试前的等待 (秒)
+    AUDIT_LOG_OPERATIONS = os.environ.get('AUDIT_LOG_OPERATIONS', 'false').lower() == 'true'  # 记录每个已认证请求
@@ -1,6 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import mysql
 
 db = SQLAlchemy()
+# 精确到微秒的时间类型: MySQL 的 DATETIME 默认只保留到秒, 同一秒内的两次修改会得到相同的值
+# 用于参与生成 ETag 的 updated_at 列 (已有的 MySQL 库需执行 ALTER TABLE ... MODIFY updated_at DATETIME(6))
+PreciseDateTime = db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
 
 from .user import User
 from .emergency_plan import EmergencyPlan
@@ -12,11 +16,16 @@ from .system_log import SystemLog
 from .login_attempt import LoginAttempt
 from .event_type import EventType
 from .department import Department  # 确保导⼊ Department
-from .summary import Summary  # 确保导⼊ Summary
+from .summary import Summary, load_encrypted_columns  # 确保导⼊ Summary
 from .message import Message  # 导⼊ Message
+from .message_counter import MessageUnreadCounter
+from .incident_stat import IncidentStatCounter
+from .incident_transition import IncidentStatusTransition
 
 # 定义incident和department的多对多表
 incident_departments = db.Table('incident_departments',
     db.Column('incident_id', db.Integer, db.ForeignKey('incidents.incident_id'), primary_key=True),
-    db.Column('department_id', db.Integer, db.ForeignKey('departments.department_id'), primary_key=True)
+    db.Column('department_id', db.Integer, db.ForeignKey('departments.department_id'), primary_key=True),
+    # 按部门查询事件时使用 (主键顺序为 incident_id, department_id)
+    db.Index('ix_incident_departments_department', 'department_id', 'incident_id')
 )
@@ -1,5 +1,6 @@
 # /www/wwwroot/air_emergency_response/models/emergency_plan.py
-from . import db
+from . import db, PreciseDateTime
+from datetime import datetime
 
 class EmergencyPlan(db.Model):
     __tablename__ = 'emergency_plans'
@@ -7,6 +8,7 @@ class EmergencyPlan(db.Model):
     plan_details = db.Column(db.Text, nullable=False)  # 应急预案详情
     version = db.Column(db.String(20), nullable=False)  # 版本号
     status = db.Column(db.Integer, nullable=False)  # 状态
+    updated_at = db.Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # 最后修改时间 (用于条件请求)
 
 """
 components:
@@ -26,6 +28,10 @@ components:
         status:
           type: integer
           description: 状态 (例如：1-草稿, 2-已发布, 3-已废弃)
+        updated_at:
+          type: string
+          format: date-time
+          description: 最后修改时间
       required:
         - plan_details
         - version
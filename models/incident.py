@@ -36,11 +36,23 @@ class Incident(db.Model):
     resolution_measures = db.Column(db.Text)
     closed_at = db.Column(db.DateTime)
     resolved_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow) # 创建时间 (列表按时间范围过滤)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1') # 行版本, 每次修改递增 (乐观锁)
     # 和event_type表建立relationship关系
     event_type = db.relationship('EventType', backref='incidents')
     # 和user表建立relationship关系
     submitted_by = db.relationship('User', backref='incidents')
     # 和department建立多对多的relationship关系
     departments = db.relationship('Department', secondary='incident_departments', backref=db.backref('incidents', lazy='dynamic'))
+    # 事件列表常用过滤条件的组合索引, 末列 incident_id 用于键集分页
+    __table_args__ = (
+        db.Index('ix_incidents_status_id', 'status', 'incident_id'),
+        db.Index('ix_incidents_event_type_status_id', 'event_type_id', 'status', 'incident_id'),
+        db.Index('ix_incidents_level_status_id', 'incident_level', 'status', 'incident_id'),
+        db.Index('ix_incidents_submitter_status_id', 'submitted_by_user_id', 'status', 'incident_id'),
+        db.Index('ix_incidents_created_id', 'created_at', 'incident_id'),
+    )
+    # ORM 更新时带上 version 条件, 并发修改同一事件时后提交的一方会失败而不是覆盖
+    __mapper_args__ = {'version_id_col': version}
     def __repr__(self):
         return f'<Incident {self.incident_id}>'
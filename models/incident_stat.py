@@ -0,0 +1,39 @@
+# models/incident_stat.py
+from . import db
+from .incident import IncidentStatus
+
+class IncidentStatCounter(db.Model):
+    """按 状态/等级/事件类型 汇总的事件数, 随事件状态流转在同一事务内维护"""
+    __tablename__ = 'incident_stat_counters'
+    status = db.Column(db.Enum(IncidentStatus), primary_key=True)  # 事件状态
+    level_key = db.Column(db.Integer, primary_key=True)  # 事件等级, 未定级记为 -1 (主键列不能为空)
+    event_type_id = db.Column(db.Integer, primary_key=True)  # 事件类型ID
+    incident_count = db.Column(db.Integer, nullable=False, default=0)  # 事件数
+
+    def __repr__(self):
+        return f'<IncidentStatCounter {self.status.name}/{self.level_key}/{self.event_type_id}: {self.incident_count}>'
+
+"""
+components:
+  schemas:
+    IncidentStatCounter:
+      type: object
+      properties:
+        status:
+          type: string
+          description: 事件状态
+        level_key:
+          type: integer
+          description: 事件等级, 未定级为 -1
+        event_type_id:
+          type: integer
+          description: 事件类型ID
+        incident_count:
+          type: integer
+          description: 事件数
+      required:
+        - status
+        - level_key
+        - event_type_id
+        - incident_count
+"""
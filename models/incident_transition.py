@@ -0,0 +1,57 @@
+# models/incident_transition.py
+from . import db
+from datetime import datetime
+from .incident import IncidentStatus
+
+class IncidentStatusTransition(db.Model):
+    """事件状态流转记录 (只追加, 不修改), 用于追溯和统计各阶段停留时长"""
+    __tablename__ = 'incident_status_transitions'
+    transition_id = db.Column(db.Integer, primary_key=True)
+    incident_id = db.Column(db.Integer, db.ForeignKey('incidents.incident_id'), nullable=False)  # 事件ID
+    from_status = db.Column(db.Enum(IncidentStatus), nullable=False)  # 流转前状态
+    to_status = db.Column(db.Enum(IncidentStatus), nullable=False)  # 流转后状态
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)  # 操作人
+    transitioned_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 流转时间
+
+    actor = db.relationship('User')
+    # 按事件查询历史, 以及按时间范围统计
+    __table_args__ = (
+        db.Index('ix_incident_status_transitions_incident', 'incident_id', 'transitioned_at'),
+        db.Index('ix_incident_status_transitions_time', 'transitioned_at'),
+    )
+
+    def __repr__(self):
+        return f'<IncidentStatusTransition {self.incident_id}: {self.from_status.name} -> {self.to_status.name}>'
+
+"""
+components:
+  schemas:
+    IncidentStatusTransition:
+      type: object
+      properties:
+        transition_id:
+          type: integer
+          description: 记录ID
+        incident_id:
+          type: integer
+          description: 事件ID
+        from_status:
+          type: string
+          description: 流转前状态
+        to_status:
+          type: string
+          description: 流转后状态
+        actor_id:
+          type: integer
+          description: 操作人ID
+        transitioned_at:
+          type: string
+          format: date-time
+          description: 流转时间
+      required:
+        - incident_id
+        - from_status
+        - to_status
+        - actor_id
+        - transitioned_at
+"""
@@ -13,6 +13,10 @@ class Message(db.Model):
 
     recipient = db.relationship('User', foreign_keys=[recipient_id], backref='received_messages')
     sender = db.relationship('User', foreign_keys=[sender_id], backref='sent_messages')
+    # 收件箱按 (sent_at, message_id) 倒序做键集分页
+    __table_args__ = (
+        db.Index('ix_messages_recipient_sent', 'recipient_id', 'sent_at', 'message_id'),
+    )
 
     def __repr__(self):
         return f'<Message {self.message_id}>'
@@ -0,0 +1,28 @@
+# models/message_counter.py
+from . import db
+
+class MessageUnreadCounter(db.Model):
+    """每个用户的未读消息数, 随消息发送/已读在同一事务内维护"""
+    __tablename__ = 'message_unread_counters'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), primary_key=True)  # 用户ID
+    unread_count = db.Column(db.Integer, nullable=False, default=0)  # 未读消息数
+
+    def __repr__(self):
+        return f'<MessageUnreadCounter {self.user_id}: {self.unread_count}>'
+
+"""
+components:
+  schemas:
+    MessageUnreadCounter:
+      type: object
+      properties:
+        user_id:
+          type: integer
+          description: 用户ID
+        unread_count:
+          type: integer
+          description: 未读消息数
+      required:
+        - user_id
+        - unread_count
+"""
@@ -1,5 +1,6 @@
 # /www/wwwroot/air_emergency_response/models/security_check.py
-from . import db
+from . import db, PreciseDateTime
+from datetime import datetime
 
 class SecurityCheck(db.Model):
     __tablename__ = 'security_checks'
@@ -8,6 +9,7 @@ class SecurityCheck(db.Model):
     issue_tracking = db.Column(db.Text, nullable=False)  # 问题跟踪
     improvement_status = db.Column(db.Integer, nullable=False)  # 改进建议状态
     evaluation_report = db.Column(db.Text, nullable=True)  # 评估报告
+    updated_at = db.Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # 最后修改时间 (用于条件请求)
 
 """
 components:
@@ -30,6 +32,10 @@ components:
         evaluation_report:
           type: string
           description: 评估报告
+        updated_at:
+          type: string
+          format: date-time
+          description: 最后修改时间
       required:
         - check_record
         - issue_tracking
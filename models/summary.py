@@ -1,5 +1,5 @@
 # models/summary.py
-from . import db
+from . import db, PreciseDateTime
 from datetime import datetime
 from sqlalchemy_utils import EncryptedType  # 导入 EncryptedType
 from flask import current_app  # 导入 current_app
@@ -35,12 +35,23 @@ class SM4EncryptedType(TypeDecorator):
             from utils.sm_utils import decrypt_sm4
             value = decrypt_sm4(self.key, value,self.iv)
         return value
+    def decrypt_many(self, values):
+        """批量解密多行密文 (共用同一个解密上下文, 相同密文只解密一次)"""
+        from utils.sm_utils import decrypt_sm4_many
+        return decrypt_sm4_many(self.key, values, self.iv)
+# 延迟加载的加密列所在的分组
+ENCRYPTED_GROUP = 'encrypted'
+def load_encrypted_columns():
+    """查询选项: 在主查询中一并加载 (并解密) 所有加密列, 用于确定需要读取内容的场景"""
+    return db.undefer_group(ENCRYPTED_GROUP)
 class Summary(db.Model):
     __tablename__ = 'summaries'
     summary_id = db.Column(db.Integer, primary_key=True)
-    incident_id = db.Column(db.Integer, db.ForeignKey('incidents.incident_id'), nullable=False)
+    incident_id = db.Column(db.Integer, db.ForeignKey('incidents.incident_id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
-    content = db.Column(SM4EncryptedType(key=hashlib.md5(b'content').hexdigest()), nullable=False)
+    # 加密列默认延迟加载: 只有真正读取 content 时才查询并解密, 审批/计数等路径不做任何 SM4 运算
+    content = db.deferred(db.Column(SM4EncryptedType(key=hashlib.md5(b'content').hexdigest()), nullable=False),
+                          group=ENCRYPTED_GROUP)
     created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
     incident = db.relationship('Incident', backref=db.backref('summaries', lazy=True))
     user = db.relationship('User', backref=db.backref('summaries', lazy=True))
@@ -48,6 +59,7 @@ class Summary(db.Model):
     event_type = db.Column(db.String(100), nullable=False)  # 应急事件类型
     security_level = db.Column(db.String(50), nullable=False)  # 安全等级
     summary_status = db.Column(db.Integer, default=1)  # 1:待审批, 2:审批通过, 3:审批拒绝
+    updated_at = db.Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # 最后修改时间 (用于条件请求)
     def __repr__(self):
         return f'<Summary {self.summary_id}>'
 """
@@ -72,6 +84,10 @@ components:
           type: string
           format: date-time
           description: 创建时间
+        updated_at:
+          type: string
+          format: date-time
+          description: 最后修改时间
         event_type:
           type: string
           description: 应急事件类型
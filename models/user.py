@@ -10,11 +10,16 @@ class User(db.Model):
     salt = db.Column(db.String(32), nullable=False)
     role_level = db.Column(db.Integer, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)  # 添加邮箱字段
-    is_active = db.Column(db.Boolean, default=True)  # 添加 is_active 字段
+    # 添加 is_active 字段; 不允许为空, 旧库中的空值用 flask user backfill-active 回填为有效
+    is_active = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # 添加创建时间
-    # 新增：与 Department 模型建立外键关联   后续再用
-    #  department_id = db.Column(db.Integer, db.ForeignKey('departments.department_id'))
-    #  department = db.relationship('Department', backref='users')
+    # 与 Department 模型建立外键关联 (按部门群发消息时使用)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.department_id'), nullable=True, index=True)
+    department = db.relationship('Department', backref='users')
+    # 按角色解析收件人时使用的索引
+    __table_args__ = (
+        db.Index('ix_users_role_level_is_active', 'role_level', 'is_active'),
+    )
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -50,6 +55,9 @@ components:
           type: string
           format: email
           description: 邮箱
+        department_id:
+          type: integer
+          description: 所属部门ID
         is_active:
           type: boolean
           description: 是否激活
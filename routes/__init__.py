@@ -9,6 +9,8 @@ user = Blueprint('user', __name__)
 event_type = Blueprint('event_type', __name__)
 summary = Blueprint('summary', __name__)
 message = Blueprint('message', __name__)
+export = Blueprint('export', __name__)
+bulk_import = Blueprint('bulk_import', __name__, cli_group='import')
 from .auth import *  # 导入认证路由
 from .emergency_plan import *  # 导入应急预案路由
 from .incident import *  # 导入事件路由
@@ -16,4 +18,6 @@ from .security_check import *  # 导入安全检查路由
 from .user import *  # 导入用户路由
 from .event_type import *  # 导入事件类型路由
 from .summary import *  # 导入事件总结路由
-from .message import *  # 导入消息路由
\ No newline at end of file
+from .message import *  # 导入消息路由
+from .export import *  # 导入数据导出路由
+from .bulk_import import *  # 导入数据导入路由
\ No newline at end of file
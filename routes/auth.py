@@ -1,84 +1,66 @@
 from flask import Flask, Blueprint, request, jsonify
 from models.user import User
-from models.login_attempt import LoginAttempt
 from utils.jwt_utils import generate_jwt_token
 from flask import current_app
-import binascii
-from gmssl import sm3
+from utils.sm_utils import encrypt_sm3
+from utils.login_guard import get_login_tracker
+from utils.audit import record_login_attempt
 import datetime
 from models import db
 import uuid  # 导入 uuid
 
 auth = Blueprint('auth', __name__)
-MAX_FAILED_ATTEMPTS = 5
-BAN_DURATION = 300
 
-def is_user_banned(username):
-    """检查用户是否被锁定"""
-    user = User.query.filter_by(username=username).first()
-    if not user:
-        return False
-
-    cutoff_time = datetime.datetime.utcnow() - datetime.timedelta(seconds=BAN_DURATION)
-    failed_attempts = LoginAttempt.query.filter(
-        LoginAttempt.user_id == user.user_id,
-        LoginAttempt.success == False,
-        LoginAttempt.attempt_time >= cutoff_time
-    ).count()
-    return failed_attempts >= MAX_FAILED_ATTEMPTS
-
-def record_attempt(username, ip_address, success):
-    """记录登录尝试"""
-    user = User.query.filter_by(username=username).first()
-    if user:
-        attempt = LoginAttempt(
-            user_id=user.user_id,
-            success=success,
-            ip_address=ip_address
-        )
-        db.session.add(attempt)
-        db.session.commit()
+def is_user_banned(username, ip_address=None):
+    """检查用户 (或来源 IP) 是否被锁定, 基于滑动窗口追踪器, 不查询业务数据库"""
+    return get_login_tracker().is_locked(username, ip_address)
 
-def record_successful_attempt(username, ip_address):
-    """记录成功登录"""
-    record_attempt(username, ip_address, True)
+def record_attempt(user, ip_address, success):
+    """
+    记录登录尝试
+    复用登录流程中已查询到的 user, 通过审计写入器异步批量写库, 不阻塞登录响应
+    :param user: 登录用户, 用户不存在时为 None (login_attempts.user_id 不可为空, 不写库)
+    """
+    if user is None:
+        return
+    record_login_attempt(user.user_id, ip_address, success)
 
-def record_failed_attempt(username, ip_address):
-    """记录失败登录"""
-    record_attempt(username, ip_address, False)
+def record_failed_attempt(username, user, ip_address):
+    """记录失败登录 (用户名不存在时也计入锁定窗口)"""
+    get_login_tracker().record_failure(username, ip_address)
+    record_attempt(user, ip_address, False)
 
 
 @auth.route('/login', methods=['POST'])
 def login():
+    """
+    登录流程: 锁定检查 (不查库) -> 查询用户 (仅一次) -> 校验密码 -> 记录尝试 (异步批量写库)
+    """
     data = request.get_json()
     username = data.get('username')
     password = data.get('password')
     ip_address = request.remote_addr
 
     # 账户锁定检查
-    if is_user_banned(username):
+    if is_user_banned(username, ip_address):
         return jsonify({'message': '账户已锁定,请稍后重试!'}), 403
 
     user = User.query.filter_by(username=username).first()
     if not user:
-        record_failed_attempt(username, ip_address)
+        record_failed_attempt(username, None, ip_address)
         return jsonify({'message': '用户不存在!'}), 404
 
     if user.salt is None:
         print("Error: Salt is None!")
         return jsonify({'message': '用户数据异常,请联系管理员!'}), 500
 
-    salt = user.salt
-    salted_password = salt + password
-    message = [x for x in salted_password.encode('utf-8')]
-    hashed_password_hex = sm3.sm3_hash(message)  # hashed_password 已经是字节串
-    #hashed_password_hex = binascii.hexlify(hashed_password).decode('utf-8')  # 直接 hexlify
+    hashed_password_hex = encrypt_sm3(password, user.salt)
 
     # 比较哈希密码并添加匹配状态信息
     password_match = user.hashed_password == hashed_password_hex
 
     if not password_match:
-        record_failed_attempt(username, ip_address)
+        record_failed_attempt(username, user, ip_address)
         return jsonify({
             'message': '密码错误!',
             'password_match': password_match,  # 添加匹配状态
@@ -88,7 +70,7 @@ def login():
 
     # 密码验证通过,生成 Token
     token = generate_jwt_token(user, current_app.config['JWT_SECRET_KEY'])
-    record_successful_attempt(username, ip_address)
+    record_attempt(user, ip_address, True)
     return jsonify({
         'token': token,
         'password_match': password_match  # 添加匹配状态
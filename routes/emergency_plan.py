@@ -1,28 +1,12 @@
 # /www/wwwroot/air_emergency_response/routes/emergency_plan.py
 from flask import Blueprint, current_app, request, jsonify
 from models.emergency_plan import EmergencyPlan
-from functools import wraps
-from models.user import User
-from utils.jwt_utils import decode_jwt_token
+from utils.jwt_utils import token_required
+from utils.conditional import make_etag, is_not_modified, not_modified, set_validators
 from models import db
 
 emergency_plan = Blueprint('emergency_plan', __name__)
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'message': '缺少Token!'}), 401
-        user_id = decode_jwt_token(token, current_app.config['JWT_SECRET_KEY'])
-        if isinstance(user_id, str):
-            return jsonify({'message': user_id}), 401
-        current_user = User.query.filter_by(user_id=user_id).first()
-        if not current_user:
-            return jsonify({'message': '用户不存在!'}), 401
-        return f(current_user, *args, **kwargs)
-    return decorated
-
 """
   tags:
     - 应急预案
@@ -80,7 +64,7 @@ def get_emergency_plan(current_user, plan_id):
     """
     openapi:
       summary: 获取应急预案
-      description: 根据ID获取指定的应急预案。
+      description: 根据ID获取指定的应急预案。响应携带 ETag 和 Last-Modified, 条件请求命中时返回 304。
       security:
         - bearerAuth: []
       parameters:
@@ -97,17 +81,26 @@ def get_emergency_plan(current_user, plan_id):
             application/json:
               schema:
                 $ref: '#/components/schemas/EmergencyPlan'
+        '304':
+          description: 内容未变化 (If-None-Match / If-Modified-Since 命中)
         '401':
           description: 未授权访问
         '404':
           description: 应急预案不存在
     """
+    # 先只查询修改时间, 客户端缓存有效时不加载整行
+    row = db.session.query(EmergencyPlan.updated_at).filter(EmergencyPlan.plan_id == plan_id).first()
+    if not row:
+        return jsonify({'message': '应急预案不存在!'}), 404
+    etag = make_etag('emergency-plan', plan_id, row.updated_at)
+    if is_not_modified(etag, row.updated_at):
+        return not_modified(etag, row.updated_at)
     plan = EmergencyPlan.query.filter_by(plan_id=plan_id).first()
     if not plan:
         return jsonify({'message': '应急预案不存在!'}), 404
-    return jsonify({
+    return set_validators(jsonify({
         'plan_id': plan.plan_id,
         'plan_details': plan.plan_details,
         'version': plan.version,
         'status': plan.status
-    }), 200
\ No newline at end of file
+    }), make_etag('emergency-plan', plan_id, plan.updated_at), plan.updated_at), 200
\ No newline at end of file
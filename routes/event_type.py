@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, jsonif
 from forms import EventTypeForm
 from models import db, EventType  # 确保从 models 导入 EventType
 from utils.jwt_utils import token_required, role_required  # 确保 utils 路径正确
+from utils.event_type_catalog import event_type_catalog
 
 event_type = Blueprint('event_type', __name__)
 """
@@ -15,8 +16,15 @@ def list_event_types(current_user):
     """
     openapi:
       summary: 获取所有事件类型（管理员）
+      description: 返回进程内缓存的事件类型目录, 携带 ETag; 请求头 If-None-Match 与当前 ETag 一致时返回 304。
       security:
         - bearerAuth: []
+      parameters:
+        - name: If-None-Match
+          in: header
+          required: false
+          schema:
+            type: string
       responses:
         '200':
           description: 返回所有事件类型
@@ -26,13 +34,21 @@ def list_event_types(current_user):
                 type: array
                 items:
                   $ref: '#/components/schemas/EventType'
+        '304':
+          description: 事件类型目录未变化
         '401':
           description: 未授权
         '403':
           description: 权限不足
     """
-    event_types = EventType.query.all()
-    return jsonify([{'type_id': et.type_id, 'type_name': et.type_name, 'is_aviation': et.is_aviation} for et in event_types])
+    catalog = event_type_catalog.snapshot()
+    if request.if_none_match.contains(catalog.etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(catalog.body, mimetype='application/json')
+    response.set_etag(catalog.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'  # 客户端每次需携带 ETag 重新验证
+    return response
 
 """
 tags:
@@ -86,6 +102,7 @@ def create_event_type(current_user):
         new_event_type = EventType(type_name=type_name, is_aviation=is_aviation)
         db.session.add(new_event_type)
         db.session.commit()
+        event_type_catalog.invalidate()
         return jsonify({'message': '事件类型创建成功!'}), 201
     return jsonify({'errors': form.errors}), 400  # 返回错误信息
 """
@@ -148,6 +165,7 @@ def update_event_type(current_user, type_id):
         event_type.type_name = form.type_name.data
         event_type.is_aviation = form.is_aviation.data
         db.session.commit()
+        event_type_catalog.invalidate()
         return jsonify({'message': '事件类型更新成功!'}), 200
     return jsonify({'errors': form.errors}), 400  # 返回错误信息
 
@@ -192,4 +210,5 @@ def delete_event_type(current_user, type_id):
     event_type = EventType.query.get_or_404(type_id)
     db.session.delete(event_type)
     db.session.commit()
+    event_type_catalog.invalidate()
     return jsonify({'message': '事件类型删除成功!'}), 200
\ No newline at end of file
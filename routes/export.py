@@ -0,0 +1,118 @@
+# routes/export.py
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
+from datetime import datetime
+import click
+from utils.jwt_utils import token_required, role_required
+from utils.export import DATASETS, EXPORT_FORMATS, export_stream, export_filename
+
+export = Blueprint('export', __name__)
+
+def _parse_range(start, end, dataset):
+    """解析导出时间范围 (ISO 8601), 不合法时抛出 ValueError"""
+    start = datetime.fromisoformat(start) if start else None
+    end = datetime.fromisoformat(end) if end else None
+    if (start or end) and dataset.time_column is None:
+        raise ValueError(f'{dataset.name} 不支持按时间范围导出!')
+    return start, end
+
+"""
+tags:
+  - 数据导出
+"""
+@export.route('/exports/<string:name>', methods=['GET'])
+@token_required
+@role_required([0, -1])  # 只有领导小组和管理员可以访问
+def export_dataset(current_user, name):
+    """
+    openapi:
+      summary: 批量导出数据
+      description: 按主键顺序流式导出 incidents / summaries / security-checks, 事件总结返回解密后的正文。响应以分块传输返回, 服务端内存占用与行数无关。
+      security:
+        - bearerAuth: []
+      parameters:
+        - name: name
+          in: path
+          required: true
+          description: 数据集名称
+          schema:
+            type: string
+            enum: [incidents, summaries, security-checks]
+        - name: format
+          in: query
+          required: false
+          description: 导出格式 (默认 ndjson)
+          schema:
+            type: string
+            enum: [ndjson, csv]
+        - name: gzip
+          in: query
+          required: false
+          description: 是否 gzip 压缩
+          schema:
+            type: boolean
+        - name: from
+          in: query
+          required: false
+          description: 创建时间起 (含, ISO 8601), security-checks 不支持
+          schema:
+            type: string
+            format: date-time
+        - name: to
+          in: query
+          required: false
+          description: 创建时间止 (不含, ISO 8601), security-checks 不支持
+          schema:
+            type: string
+            format: date-time
+      responses:
+        '200':
+          description: 导出文件 (Content-Disposition 为附件)
+        '400':
+          description: 格式或时间范围无效
+        '401':
+          description: 未授权
+        '403':
+          description: 权限不足
+        '404':
+          description: 数据集不存在
+    """
+    dataset = DATASETS.get(name)
+    if dataset is None:
+        return jsonify({'message': '数据集不存在!'}), 404
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'message': f'不支持的导出格式, 可选: {", ".join(EXPORT_FORMATS)}'}), 400
+    compress = request.args.get('gzip', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        start, end = _parse_range(request.args.get('from'), request.args.get('to'), dataset)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    if compress:
+        mimetype = 'application/gzip'
+    else:
+        mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = current_app.response_class(stream_with_context(export_stream(name, fmt, compress, start, end)),
+                                          mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={export_filename(name, fmt, compress)}'
+    return response, 200
+
+@export.cli.command('dump')
+@click.argument('name', type=click.Choice(list(DATASETS)))
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='ndjson', help='导出格式')
+@click.option('--gzip', 'compress', is_flag=True, help='gzip 压缩')
+@click.option('--from', 'start', help='时间范围起 (含, ISO 8601)')
+@click.option('--to', 'end', help='时间范围止 (不含, ISO 8601)')
+@click.option('-o', '--output', help='输出文件, 默认按数据集和时间生成')
+def dump_command(name, fmt, compress, start, end, output):
+    """导出数据: flask export dump incidents --format csv --gzip -o incidents.csv.gz"""
+    try:
+        start, end = _parse_range(start, end, DATASETS[name])
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    output = output or export_filename(name, fmt, compress)
+    size = 0
+    with open(output, 'wb') as f:
+        for part in export_stream(name, fmt, compress, start, end):
+            f.write(part)
+            size += len(part)
+    print(f'已导出 {name} 到 {output} ({size / 1024 / 1024:.1f} MiB)')
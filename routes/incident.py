@@ -1,35 +1,120 @@
-from flask import Blueprint, request, jsonify
-from models import db, Incident, Department, EventType, IncidentStatus, User
+from flask import Blueprint, request, jsonify, current_app
+from models import db, Incident, Department, EventType, IncidentStatus, IncidentStatusTransition, User, incident_departments
 from utils.jwt_utils import token_required, role_required
+from utils.pagination import encode_cursor, decode_cursor, page_size, parse_bool, InvalidCursor
+from utils.search import get_search_index, SEARCH_FIELDS
+from utils.incident_stats import STAT_DIMENSIONS, query_stats, reconcile_stats
+from utils.incident_analytics import PERCENTILES, stage_duration_stats
+from utils.serializers import ModelSerializer, isoformat, enum_name, json_response
+from utils.conditional import make_etag, is_not_modified, not_modified, set_validators
+from utils.incident_workflow import TRANSITIONS, role_allowed, validate_payload, run_transition, run_transitions
 from datetime import datetime
-import bleach
+import click
 incident = Blueprint('incident', __name__)
-# 辅助函数：用于检查用户是否可以修改事件状态
-def can_modify_incident(user, incident):
+# 事件详情的返回格式
+INCIDENT_SERIALIZER = ModelSerializer(
+    'incident_id', 'incident_info', 'process_status', 'response_log', 'incident_level', 'is_aviation',
+    'event_type_id', 'attachment_url', 'submitted_by_user_id',
+    ('status', enum_name('status')),  # 返回枚举名称
+    'rejection_reason', 'resolution_measures',
+    ('closed_at', isoformat('closed_at')),
+    ('resolved_at', isoformat('resolved_at')),
+    ('created_at', isoformat('created_at')),
+    'version',
+)
+def _transition_response(current_user, name, incident_id):
+    """单个事件流转接口的公共实现"""
+    result = run_transition(current_user, name, incident_id, request.get_json(silent=True))
+    return jsonify({'message': result.message}), result.status_code
+"""
+tags:
+  - 事件管理
+"""
+@incident.route('/incidents/transitions', methods=['POST'])
+@token_required
+def batch_transition(current_user):
     """
-    检查用户是否可以修改事件状态,根据Status和Role进行判断,抽取出来可以⽅便后续维护和功能添加
+    openapi:
+      summary: 批量执行事件状态流转
+      description: 对多个事件执行同一个流转, 成功的事件在同一个事务中提交, 失败的事件逐项返回原因, 不影响其他事件。
+      security:
+        - bearerAuth: []
+      requestBody:
+        required: true
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                transition:
+                  type: string
+                  description: 流转名称
+                  enum: [department_approve, department_reject, command_center_submit, command_center_resolve, issue_emergency_team, resolve, close]
+                incident_ids:
+                  type: array
+                  items:
+                    type: integer
+                payload:
+                  type: object
+                  description: 流转参数, 如 rejection_reason、resolution_measures、incident_info
+              required:
+                - transition
+                - incident_ids
+      responses:
+        '200':
+          description: 逐项执行结果
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  succeeded:
+                    type: integer
+                  failed:
+                    type: integer
+                  results:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        incident_id:
+                          type: integer
+                        status_code:
+                          type: integer
+                        message:
+                          type: string
+        '400':
+          description: 流转名称、事件ID列表或参数无效
+        '401':
+          description: 未授权
+        '403':
+          description: 无权限执行此操作
     """
-    if user.role_level == -1 or user.role_level == 0:
-        return True  # 管理员和领导⼩组有权修改所有事件
-    if incident.submitted_by_user_id == user.user_id:  # 提交⼈
-        if incident.status == IncidentStatus.DRAFT or incident.status == IncidentStatus.DEPARTMENT_REJECTED:
-            return True
-    # 部门领导⻆⾊
-    if user.role_level == 2 and incident.status == IncidentStatus.SUBMITTED_DEPARTMENT_REVIEW:
-        # 只有当事件状态为 SUBMITTED_DEPARTMENT_REVIEW 时，部⻔领导才能修改
-            return True
-    # 指挥中⼼⻆⾊
-    if user.role_level == 1 and incident.status in [
-            IncidentStatus.DEPARTMENT_APPROVED,
-            IncidentStatus.PENDING_COMMAND_CENTER
-    ]:
-            return True
-    return False
-# 添加以下配置
-ALLOWED_TAGS = ['b', 'i', 'u', 'strong', 'em', 'a', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'br', 'ul', 'ol', 'li']
-ALLOWED_ATTRIBUTES = {'a': ['href', 'title'], 'abbr': ['title'], 'acronym': ['title']}
-def clean_html(text):
-        return bleach.clean(text, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+    data = request.get_json(silent=True) or {}
+    transition = TRANSITIONS.get(data.get('transition'))
+    if transition is None:
+        return jsonify({'message': '无效的流转名称!'}), 400
+    incident_ids = data.get('incident_ids')
+    if not isinstance(incident_ids, list) or not incident_ids \
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in incident_ids):
+        return jsonify({'message': 'incident_ids 必须是非空的整数数组!'}), 400
+    incident_ids = list(dict.fromkeys(incident_ids))  # 去重并保持顺序
+    if len(incident_ids) > current_app.config.get('MAX_BATCH_TRANSITIONS', 1000):
+        return jsonify({'message': '单次批量操作的事件数量过多!'}), 400
+    if not role_allowed(current_user, transition):
+        return jsonify({'message': '⽆权限执⾏此操作'}), 403
+    payload = data.get('payload') or {}
+    error = validate_payload(transition, payload)
+    if error:
+        return jsonify({'message': error}), 400
+    results = run_transitions(current_user, transition.name, incident_ids, payload)
+    succeeded = sum(1 for result in results if result.ok)
+    return jsonify({
+        'transition': transition.name,
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': [result._asdict() for result in results],
+    }), 200
 """
 tags:
   - 事件管理
@@ -71,14 +156,7 @@ def department_approve_incident(current_user, incident_id):
         '404':
           description: 事件不存在
     """
-    incident = Incident.query.get_or_404(incident_id)
-    if incident.status != IncidentStatus.SUBMITTED_DEPARTMENT_REVIEW:
-        return jsonify({'message': '事件状态不正确，⽆法批准!'}), 400
-    if not can_modify_incident(current_user, incident):
-        return jsonify({'message': '⽆权限执⾏此操作'}), 403
-    incident.status = IncidentStatus.DEPARTMENT_APPROVED
-    db.session.commit()
-    return jsonify({'message': '事件已批准!'}), 200
+    return _transition_response(current_user, 'department_approve', incident_id)
 """
 tags:
   - 事件管理
@@ -132,20 +210,7 @@ def department_reject_incident(current_user, incident_id):
         '404':
           description: 事件不存在
     """
-    # 假设前端通过JSON传递驳回原因
-    data = request.get_json()
-    rejection_reason = data.get('rejection_reason')
-    if not rejection_reason:
-        return jsonify({'message': '请提供驳回原因!'}), 400
-    incident = Incident.query.get_or_404(incident_id)
-    if incident.status != IncidentStatus.SUBMITTED_DEPARTMENT_REVIEW:
-            return jsonify({'message': '事件状态不正确，⽆法驳回!'}), 400
-    if not can_modify_incident(current_user, incident):
-        return jsonify({'message': '⽆权限执⾏此操作'}), 403
-    incident.status = IncidentStatus.DEPARTMENT_REJECTED
-    incident.rejection_reason = rejection_reason  # 记录驳回原因
-    db.session.commit()
-    return jsonify({'message': '事件已驳回!'}), 200
+    return _transition_response(current_user, 'department_reject', incident_id)
 """
 tags:
   - 事件管理
@@ -187,15 +252,7 @@ def command_center_submit_incident(current_user, incident_id):
           '404':
             description: 事件不存在
     """
-    incident = Incident.query.get_or_404(incident_id)
-    if incident.status != IncidentStatus.DEPARTMENT_APPROVED:
-        return jsonify({'message': '当前状态⽆法提交⾄指挥中⼼'}), 400
-    if not can_modify_incident(current_user, incident):
-        return jsonify({'message': '⽆权限执⾏此操作'}), 403
-    incident.status = IncidentStatus.PENDING_COMMAND_CENTER
-    db.session.commit()
-    #这里可以不发送通知给指挥中心,因为上面审批通过的时候已经发过了
-    return jsonify({'message': '提交指挥中⼼成功!'}), 200
+    return _transition_response(current_user, 'command_center_submit', incident_id)
 """
 tags:
   - 事件管理
@@ -246,25 +303,7 @@ def command_center_resolve_incident(current_user, incident_id):
         '404':
           description: 事件不存在
     """
-    data = request.get_json()
-    resolution_measures = data.get('resolution_measures')
-    incident_info = data.get('incident_info')  # 获取新的事件内容
-    if not resolution_measures:
-         return jsonify({'message': '请填写解决措施!'}), 400
-    incident = Incident.query.get_or_404(incident_id)
-    if incident.status != IncidentStatus.PENDING_COMMAND_CENTER:
-      return jsonify({'message': '当前状态⽆法解决!'}), 400
-    if not can_modify_incident(current_user, incident):
-        return jsonify({'message': '⽆权限执⾏此操作'}), 403
-    incident.status = IncidentStatus.COMMAND_CENTER_PROCESSED
-    incident.resolution_measures = resolution_measures
-    # 如果incident_info不为空， 则更新事件内容
-    if incident_info:
-        #  使用 bleach 进行编码转义  对数据库中的数据进行清洗
-        cleaned_incident_info = clean_html(incident_info)
-        incident.incident_info = cleaned_incident_info
-    db.session.commit()
-    return jsonify({'message': '指挥中⼼处理完成!'}), 200
+    return _transition_response(current_user, 'command_center_resolve', incident_id)
 """
 tags:
   - 事件管理
@@ -306,14 +345,7 @@ def issue_emergency_team(current_user, incident_id):
         '404':
           description: 事件不存在
     """
-    incident = Incident.query.get_or_404(incident_id)
-    if incident.status != IncidentStatus.COMMAND_CENTER_PROCESSED:
-        return jsonify({'message': '当前状态⽆法下发应急⼩组!'}), 400
-    if not can_modify_incident(current_user, incident):
-        return jsonify({'message': '⽆权限执⾏此操作'}), 403
-    incident.status = IncidentStatus.ISSUED_EMERGENCY_TEAM
-    db.session.commit()
-    return jsonify({'message': '已下发应急⼩组!'}), 200
+    return _transition_response(current_user, 'issue_emergency_team', incident_id)
 """
 tags:
   - 事件管理
@@ -355,16 +387,7 @@ def resolve_incident(current_user, incident_id):
         '404':
           description: 事件不存在
     """
-    incident = Incident.query.get_or_404(incident_id)
-    # 只有在下发应急⼩组后才能完结
-    if incident.status != IncidentStatus.ISSUED_EMERGENCY_TEAM:
-        return jsonify({'message': '当前状态⽆法完结!'}), 400
-    if not can_modify_incident(current_user, incident):
-         return jsonify({'message': '⽆权限执⾏此操作'}), 403
-    incident.status = IncidentStatus.RESOLVED
-    incident.resolved_at = datetime.utcnow()
-    db.session.commit()
-    return jsonify({'message': '事件已完结!'}), 200
+    return _transition_response(current_user, 'resolve', incident_id)
 """
 tags:
   - 事件管理
@@ -406,15 +429,480 @@ def close_incident(current_user, incident_id):
         '404':
           description: 事件不存在
     """
-    incident = Incident.query.get_or_404(incident_id)
-    if incident.status != IncidentStatus.RESOLVED:
-        return jsonify({'message': '当前状态⽆法关闭!'}), 400
-    if not can_modify_incident(current_user, incident):
-        return jsonify({'message': '⽆权限执⾏此操作'}), 403
-    incident.status = IncidentStatus.CLOSED
-    incident.closed_at = datetime.utcnow() #记录关闭时间
-    db.session.commit()
-    return jsonify({'message': '事件已关闭!'}), 200
+    return _transition_response(current_user, 'close', incident_id)
+# 列表接口可选择返回的字段
+INCIDENT_LIST_FIELDS = (
+    'incident_id', 'incident_info', 'process_status', 'response_log', 'incident_level', 'is_aviation',
+    'event_type_id', 'attachment_url', 'submitted_by_user_id', 'status', 'rejection_reason',
+    'resolution_measures', 'created_at', 'closed_at', 'resolved_at',
+)
+# 未指定 fields 时返回的字段 (不含大文本列)
+DEFAULT_INCIDENT_LIST_FIELDS = (
+    'incident_id', 'incident_level', 'is_aviation', 'event_type_id', 'submitted_by_user_id', 'status', 'created_at',
+)
+def _json_value(value):
+    """枚举返回名称, 时间返回 ISO 格式"""
+    if isinstance(value, IncidentStatus):
+        return value.name
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+"""
+tags:
+  - 事件管理
+"""
+@incident.route('/incidents', methods=['GET'])
+@token_required
+def list_incidents(current_user):
+    """
+    openapi:
+      summary: 查询事件列表
+      description: 按条件过滤事件, 按事件ID倒序键集分页, 下一页游标通过响应头 X-Next-Cursor 返回。
+      security:
+        - bearerAuth: []
+      parameters:
+        - name: status
+          in: query
+          required: false
+          description: 事件状态名称, 多个用逗号分隔 (如 PENDING_COMMAND_CENTER,COMMAND_CENTER_PROCESSED)
+          schema:
+            type: string
+        - name: incident_level
+          in: query
+          required: false
+          schema:
+            type: integer
+        - name: event_type_id
+          in: query
+          required: false
+          schema:
+            type: integer
+        - name: is_aviation
+          in: query
+          required: false
+          schema:
+            type: boolean
+        - name: submitted_by
+          in: query
+          required: false
+          description: 提交人ID
+          schema:
+            type: integer
+        - name: department_id
+          in: query
+          required: false
+          description: 涉及的部门ID
+          schema:
+            type: integer
+        - name: created_from
+          in: query
+          required: false
+          description: 创建时间下限 (ISO 格式, 包含)
+          schema:
+            type: string
+            format: date-time
+        - name: created_to
+          in: query
+          required: false
+          description: 创建时间上限 (ISO 格式, 不包含)
+          schema:
+            type: string
+            format: date-time
+        - name: fields
+          in: query
+          required: false
+          description: 返回的字段, 逗号分隔 (incident_id 总是返回)
+          schema:
+            type: string
+        - name: cursor
+          in: query
+          required: false
+          description: 上一页返回的 X-Next-Cursor
+          schema:
+            type: string
+        - name: limit
+          in: query
+          required: false
+          description: 每页条数 (默认 50, 最大 200)
+          schema:
+            type: integer
+      responses:
+        '200':
+          description: 成功返回事件列表
+          headers:
+            X-Next-Cursor:
+              description: 下一页游标
+              schema:
+                type: string
+          content:
+            application/json:
+              schema:
+                type: array
+                items:
+                  type: object
+        '400':
+          description: 参数错误
+        '401':
+          description: 未授权
+    """
+    args = request.args
+    fields = args.get('fields')
+    fields = [f for f in fields.split(',') if f] if fields else list(DEFAULT_INCIDENT_LIST_FIELDS)
+    invalid = [f for f in fields if f not in INCIDENT_LIST_FIELDS]
+    if invalid:
+        return jsonify({'message': f'不支持的字段: {",".join(invalid)}'}), 400
+    if 'incident_id' not in fields:
+        fields.insert(0, 'incident_id')
+    query = db.session.query(*[getattr(Incident, f) for f in fields])
+
+    try:
+        status = args.get('status')
+        if status:
+            statuses = [IncidentStatus[name] for name in status.split(',') if name]
+            query = query.filter(Incident.status.in_(statuses) if len(statuses) > 1 else Incident.status == statuses[0])
+        created_from = _parse_datetime(args.get('created_from'))
+        created_to = _parse_datetime(args.get('created_to'))
+        cursor = args.get('cursor')
+        last_id = decode_cursor(cursor, (int,))[0] if cursor else None
+    except KeyError as e:
+        return jsonify({'message': f'事件状态无效: {e.args[0]}'}), 400
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    except ValueError:
+        return jsonify({'message': '时间格式无效, 请使用 ISO 格式!'}), 400
+
+    for name, column in (('incident_level', Incident.incident_level),
+                         ('event_type_id', Incident.event_type_id),
+                         ('submitted_by', Incident.submitted_by_user_id)):
+        value = args.get(name, type=int)
+        if value is not None:
+            query = query.filter(column == value)
+    if args.get('is_aviation') is not None:
+        query = query.filter(Incident.is_aviation == parse_bool(args.get('is_aviation')))
+    # 排序/分页键: 按部门过滤时改用关联表上的 incident_id, 使排序可以直接走 (department_id, incident_id) 索引
+    order_key = Incident.incident_id
+    department_id = args.get('department_id', type=int)
+    if department_id is not None:
+        query = query.join(incident_departments, incident_departments.c.incident_id == Incident.incident_id) \
+            .filter(incident_departments.c.department_id == department_id)
+        order_key = incident_departments.c.incident_id
+    if created_from:
+        query = query.filter(Incident.created_at >= created_from)
+    if created_to:
+        query = query.filter(Incident.created_at < created_to)
+    if last_id is not None:
+        query = query.filter(order_key < last_id)
+
+    limit = page_size(args.get('limit'))
+    rows = query.order_by(order_key.desc()).limit(limit + 1).all()
+    incident_list = [{f: _json_value(v) for f, v in zip(fields, row)} for row in rows[:limit]]
+    response = jsonify(incident_list)
+    if len(rows) > limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(rows[limit - 1].incident_id)
+    return response, 200
+"""
+tags:
+  - 事件管理
+"""
+@incident.route('/incidents/search', methods=['GET'])
+@token_required
+def search_incidents(current_user):
+    """
+    openapi:
+      summary: 全文检索事件
+      description: 检索事件信息、解决措施和驳回原因, 所有关键词都需命中, 按相关度排序。总命中数通过响应头 X-Total-Count 返回。
+      security:
+        - bearerAuth: []
+      parameters:
+        - name: q
+          in: query
+          required: true
+          description: 检索关键词
+          schema:
+            type: string
+        - name: page
+          in: query
+          required: false
+          description: 页码 (从 1 开始)
+          schema:
+            type: integer
+        - name: limit
+          in: query
+          required: false
+          description: 每页条数 (默认 50, 最大 200)
+          schema:
+            type: integer
+      responses:
+        '200':
+          description: 成功返回检索结果
+          headers:
+            X-Total-Count:
+              description: 命中总数
+              schema:
+                type: integer
+          content:
+            application/json:
+              schema:
+                type: array
+                items:
+                  type: object
+        '400':
+          description: 缺少检索关键词
+        '401':
+          description: 未授权
+    """
+    query_text = request.args.get('q', '').strip()
+    if not query_text:
+        return jsonify({'message': '请输入检索关键词!'}), 400
+    limit = page_size(request.args.get('limit'))
+    page = max(request.args.get('page', 1, type=int), 1)
+    total, hits = get_search_index().search(query_text, offset=(page - 1) * limit, limit=limit)
+    rows = {}
+    if hits:
+        fields = ('incident_id', 'incident_info', 'incident_level', 'event_type_id', 'status', 'created_at')
+        rows = {row.incident_id: row for row in db.session.query(*[getattr(Incident, f) for f in fields])
+                .filter(Incident.incident_id.in_([incident_id for incident_id, _ in hits]))}
+    results = []
+    for incident_id, score in hits:
+        row = rows.get(incident_id)
+        if row is None:  # 索引中残留的已删除事件
+            continue
+        item = {f: _json_value(v) for f, v in row._mapping.items()}
+        item['score'] = round(score, 4)
+        results.append(item)
+    response = jsonify(results)
+    response.headers['X-Total-Count'] = str(total)
+    return response, 200
+
+def _iter_search_documents(batch_size=1000):
+    """按主键顺序流式读取全部事件的检索字段"""
+    columns = [Incident.incident_id] + [getattr(Incident, f) for f in SEARCH_FIELDS]
+    for row in db.session.query(*columns).order_by(Incident.incident_id).yield_per(batch_size):
+        yield row.incident_id, {f: getattr(row, f) for f in SEARCH_FIELDS}
+
+@incident.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """重建事件全文检索索引: flask incident rebuild-search-index"""
+    count = get_search_index().rebuild(_iter_search_documents())
+    print(f'检索索引已重建, 共 {count} 个事件')
+"""
+tags:
+  - 事件管理
+"""
+@incident.route('/incidents/stats', methods=['GET'])
+@token_required
+def incident_stats(current_user):
+    """
+    openapi:
+      summary: 事件统计
+      description: 按状态、等级、事件类型汇总事件数, 读取随状态流转实时维护的计数表。
+      security:
+        - bearerAuth: []
+      parameters:
+        - name: group_by
+          in: query
+          required: false
+          description: 分组维度, 多个用逗号分隔, 可选 status, incident_level, event_type_id (默认全部)
+          schema:
+            type: string
+      responses:
+        '200':
+          description: 统计结果
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  total:
+                    type: integer
+                  stats:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        status:
+                          type: string
+                        incident_level:
+                          type: integer
+                          nullable: true
+                        event_type_id:
+                          type: integer
+                        count:
+                          type: integer
+        '400':
+          description: 分组维度无效
+        '401':
+          description: 未授权
+    """
+    group_by = request.args.get('group_by')
+    group_by = tuple(name.strip() for name in group_by.split(',') if name.strip()) if group_by else tuple(STAT_DIMENSIONS)
+    if any(name not in STAT_DIMENSIONS for name in group_by):
+        return jsonify({'message': f'无效的分组维度, 可选: {", ".join(STAT_DIMENSIONS)}'}), 400
+    stats = query_stats(group_by)
+    return jsonify({'total': sum(item['count'] for item in stats), 'stats': stats}), 200
+
+@incident.cli.command('reconcile-stats')
+@click.option('--fix', is_flag=True, help='用实际统计覆盖计数表')
+def reconcile_stats_command(fix):
+    """核对事件统计计数: flask incident reconcile-stats [--fix]"""
+    drift = reconcile_stats(fix=fix)
+    for (status, level, event_type_id), stored, actual in drift:
+        print(f'{status.name} 等级={level} 类型={event_type_id}: 计数表 {stored}, 实际 {actual}')
+    if not drift:
+        print('统计计数与事件表一致')
+    elif fix:
+        print(f'已修复 {len(drift)} 项不一致')
+    else:
+        print(f'共 {len(drift)} 项不一致, 使用 --fix 修复')
+"""
+tags:
+  - 事件管理
+"""
+@incident.route('/incidents/analytics/stage-durations', methods=['GET'])
+@token_required
+@role_required([0, 1])  # 领导小组和指挥中心可以访问
+def stage_duration_analytics(current_user):
+    """
+    openapi:
+      summary: 事件各阶段停留时长分位数
+      description: 根据状态流转记录计算各阶段 (流转前状态) 的停留时长, 按阶段、事件类型、等级分组返回 P50/P90/P99 (秒)。
+      security:
+        - bearerAuth: []
+      parameters:
+        - name: from
+          in: query
+          required: false
+          description: 只统计该时间之后完成的阶段 (ISO 8601)
+          schema:
+            type: string
+            format: date-time
+        - name: to
+          in: query
+          required: false
+          description: 只统计该时间之前完成的阶段 (ISO 8601)
+          schema:
+            type: string
+            format: date-time
+        - name: event_type_id
+          in: query
+          required: false
+          schema:
+            type: integer
+        - name: incident_level
+          in: query
+          required: false
+          schema:
+            type: integer
+      responses:
+        '200':
+          description: 统计结果
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  percentiles:
+                    type: array
+                    items:
+                      type: integer
+                  stats:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        stage:
+                          type: string
+                        event_type_id:
+                          type: integer
+                        incident_level:
+                          type: integer
+                          nullable: true
+                        count:
+                          type: integer
+                        mean:
+                          type: number
+                        p50:
+                          type: number
+                        p90:
+                          type: number
+                        p99:
+                          type: number
+        '400':
+          description: 时间格式错误
+        '401':
+          description: 未授权
+        '403':
+          description: 权限不足
+    """
+    try:
+        start = _parse_datetime(request.args.get('from'))
+        end = _parse_datetime(request.args.get('to'))
+    except ValueError:
+        return jsonify({'message': '时间格式错误, 请使用 ISO 8601 格式!'}), 400
+    stats = stage_duration_stats(start, end, request.args.get('event_type_id', type=int),
+                                 request.args.get('incident_level', type=int))
+    return jsonify({'percentiles': list(PERCENTILES), 'stats': stats}), 200
+"""
+tags:
+  - 事件管理
+"""
+@incident.route('/incidents/<int:incident_id>/history', methods=['GET'])
+@token_required
+def get_incident_history(current_user, incident_id):
+    """
+    openapi:
+      summary: 获取事件状态流转记录
+      security:
+        - bearerAuth: []
+      parameters:
+        - name: incident_id
+          in: path
+          required: true
+          description: 事件ID
+          schema:
+            type: integer
+      responses:
+        '200':
+          description: 按时间顺序的流转记录
+          content:
+            application/json:
+              schema:
+                type: array
+                items:
+                  type: object
+                  properties:
+                    from_status:
+                      type: string
+                    to_status:
+                      type: string
+                    actor_id:
+                      type: integer
+                    actor_name:
+                      type: string
+                    transitioned_at:
+                      type: string
+                      format: date-time
+        '401':
+          description: 未授权
+        '404':
+          description: 事件不存在
+    """
+    if db.session.get(Incident, incident_id) is None:
+        return jsonify({'message': '事件不存在!'}), 404
+    rows = db.session.query(IncidentStatusTransition.from_status, IncidentStatusTransition.to_status,
+                            IncidentStatusTransition.actor_id, User.username, IncidentStatusTransition.transitioned_at) \
+        .join(User, User.user_id == IncidentStatusTransition.actor_id) \
+        .filter(IncidentStatusTransition.incident_id == incident_id) \
+        .order_by(IncidentStatusTransition.transitioned_at, IncidentStatusTransition.transition_id).all()
+    return jsonify([{
+        'from_status': row.from_status.name,
+        'to_status': row.to_status.name,
+        'actor_id': row.actor_id,
+        'actor_name': row.username,
+        'transitioned_at': row.transitioned_at.isoformat(),
+    } for row in rows]), 200
 """
 tags:
   - 事件管理
@@ -425,6 +913,7 @@ def get_incident(current_user, incident_id):
     """
     openapi:
       summary: 获取事件详情
+      description: 响应携带由行版本号生成的 ETag, 请求头 If-None-Match 命中时返回 304。
       security:
         - bearerAuth: []
       parameters:
@@ -441,27 +930,21 @@ def get_incident(current_user, incident_id):
             application/json:
               schema:
                 $ref: '#/components/schemas/Incident'
+        '304':
+          description: 内容未变化 (If-None-Match / If-Modified-Since 命中)
         '401':
           description: 未授权
         '404':
           description: 事件不存在
     """
+    # 先只查询版本号, 客户端缓存有效时不加载整行
+    version = db.session.query(Incident.version).filter(Incident.incident_id == incident_id).scalar()
+    if version is None:
+        return jsonify({'message': '事件不存在!'}), 404
+    etag = make_etag('incident', incident_id, version)
+    if is_not_modified(etag):
+        return not_modified(etag)
     incident = Incident.query.get_or_404(incident_id)
     #只要登录了， 就可以查看事件
-    incident_data = {
-      'incident_id': incident.incident_id,
-      'incident_info': incident.incident_info,
-      'process_status': incident.process_status,
-      'response_log':incident.response_log,
-      'incident_level': incident.incident_level,
-      'is_aviation': incident.is_aviation,
-      'event_type_id': incident.event_type_id,
-      'attachment_url': incident.attachment_url,
-      'submitted_by_user_id': incident.submitted_by_user_id,
-      'status': incident.status.name, # 返回枚举名称
-      'rejection_reason': incident.rejection_reason,
-      'resolution_measures': incident.resolution_measures,
-      'closed_at': incident.closed_at.isoformat() if incident.closed_at else None,
-      'resolved_at': incident.resolved_at.isoformat() if incident.resolved_at else None,
-    }
-    return jsonify(incident_data), 200
+    return set_validators(json_response(INCIDENT_SERIALIZER.to_dict(incident)),
+                          make_etag('incident', incident_id, incident.version)), 200
@@ -1,8 +1,35 @@
-from flask import Blueprint, request, jsonify
-from models import db, Message, User
-from utils.jwt_utils import token_required, role_required
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from datetime import datetime
+import time
+from models import db, Message, MessageUnreadCounter, User
+from utils.jwt_utils import token_required, role_required, load_principal
+from utils.pagination import encode_cursor, decode_cursor, page_size, parse_bool, InvalidCursor, MAX_PAGE_SIZE
+from utils.pubsub import message_hub
+from utils.serializers import ModelSerializer, isoformat, dumps, json_response
 
 message = Blueprint('message', __name__)
+# IN 查询 / 批量写入每批的行数上限
+RECIPIENT_CHUNK_SIZE = 500
+def _is_int(value):
+    """JSON 中的整数 (true/false 在 Python 中也是 int, 不算)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _inbox_query(user_id):
+    """收件箱查询: 只查询需要的列, 发送者姓名在同一条 SQL 中关联获取"""
+    return db.session.query(
+        Message.message_id, Message.sender_id, User.username, Message.incident_id,
+        Message.content, Message.is_read, Message.sent_at
+    ).join(User, User.user_id == Message.sender_id) \
+        .filter(Message.recipient_id == user_id)
+
+# 收件箱中单条消息的返回格式 (_inbox_query 的查询结果)
+MESSAGE_SERIALIZER = ModelSerializer(
+    'message_id', 'sender_id',
+    ('sender_name', 'username'),  # 发送者姓名/用户名
+    'incident_id', 'content', 'is_read',
+    ('sent_at', isoformat('sent_at')),
+)
+
 """
 tags:
   - 消息
@@ -14,34 +41,179 @@ def get_my_messages(current_user):
     """
     openapi:
       summary: 获取当前用户的收件箱
+      description: 按发送时间倒序分页返回, 下一页游标通过响应头 X-Next-Cursor 返回 (没有更多数据时不返回该响应头)。
       security:
         - bearerAuth: []
+      parameters:
+        - name: cursor
+          in: query
+          required: false
+          description: 上一页返回的 X-Next-Cursor
+          schema:
+            type: string
+        - name: limit
+          in: query
+          required: false
+          description: 每页条数 (默认 50, 最大 200)
+          schema:
+            type: integer
+        - name: unread_only
+          in: query
+          required: false
+          description: 只返回未读消息
+          schema:
+            type: boolean
+        - name: incident_id
+          in: query
+          required: false
+          description: 只返回关联指定事件的消息
+          schema:
+            type: integer
       responses:
         '200':
           description: 成功返回消息列表
+          headers:
+            X-Next-Cursor:
+              description: 下一页游标
+              schema:
+                type: string
           content:
             application/json:
               schema:
                 type: array
                 items:
                   $ref: '#/components/schemas/Message'
+        '400':
+          description: 游标无效
         '401':
           description: 未授权
     """
-    messages = Message.query.filter_by(recipient_id=current_user.user_id).order_by(Message.sent_at.desc()).all()
-    message_list = []
-    for msg in messages:
-        message_data = {
-             'message_id': msg.message_id,
-            'sender_id': msg.sender_id,
-            'sender_name': msg.sender.username, # 发送者姓名/用户名
-            'incident_id': msg.incident_id,
-            'content': msg.content,
-            'is_read': msg.is_read,
-            'sent_at': msg.sent_at.isoformat()
-        }
-        message_list.append(message_data)
-    return jsonify(message_list), 200
+    limit = page_size(request.args.get('limit'))
+    query = _inbox_query(current_user.user_id)
+    if parse_bool(request.args.get('unread_only')):
+        query = query.filter(Message.is_read == False)
+    incident_id = request.args.get('incident_id', type=int)
+    if incident_id is not None:
+        query = query.filter(Message.incident_id == incident_id)
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            sent_at, message_id = decode_cursor(cursor, (datetime, int))
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
+        query = query.filter(db.or_(
+            Message.sent_at < sent_at,
+            db.and_(Message.sent_at == sent_at, Message.message_id < message_id)
+        ))
+    rows = query.order_by(Message.sent_at.desc(), Message.message_id.desc()).limit(limit + 1).all()
+
+    response = json_response(MESSAGE_SERIALIZER.many(rows[:limit]))
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        response.headers['X-Next-Cursor'] = encode_cursor(last.sent_at, last.message_id)
+    return response, 200
+"""
+tags:
+  - 消息
+"""
+# 新消息推送 (Server-Sent Events)
+@message.route('/messages/stream', methods=['GET'])
+@token_required
+def stream_messages(current_user):
+    """
+    openapi:
+      summary: 订阅新消息推送 (SSE)
+      description: |
+        以 text/event-stream 推送当前用户的新消息, 每条事件的 id 即收件箱游标。
+        断线重连时通过 Last-Event-ID 请求头 (或 cursor 参数) 续传, 服务端会先补发游标之后的消息;
+        其他 worker 进程发出的消息在下一次心跳 (SSE_HEARTBEAT_INTERVAL 秒) 时从数据库补发;
+        不带游标时只推送连接建立之后的新消息。连接保持 SSE_MAX_DURATION 秒后由服务端关闭, 客户端自动重连即可。
+      security:
+        - bearerAuth: []
+      parameters:
+        - name: cursor
+          in: query
+          required: false
+          description: 续传游标 (与 Last-Event-ID 等价)
+          schema:
+            type: string
+      responses:
+        '200':
+          description: 事件流
+          content:
+            text/event-stream:
+              schema:
+                type: string
+        '400':
+          description: 游标无效
+        '401':
+          description: 未授权
+    """
+    config = current_app.config
+    user_id = current_user.user_id
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+    if cursor:
+        try:
+            last_key = tuple(decode_cursor(cursor, (datetime, int)))
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
+    # 先订阅再确定起点, 避免两者之间到达的消息被漏掉
+    subscription = message_hub.subscribe(user_id, config.get('SSE_BUFFER_SIZE', 100))
+    if not cursor:
+        newest = db.session.query(Message.sent_at, Message.message_id) \
+            .filter(Message.recipient_id == user_id) \
+            .order_by(Message.sent_at.desc(), Message.message_id.desc()).first()
+        last_key = tuple(newest) if newest else (datetime.min, 0)
+    db.session.rollback()  # 长连接期间不占用数据库连接
+    heartbeat = config.get('SSE_HEARTBEAT_INTERVAL', 15)
+    max_duration = config.get('SSE_MAX_DURATION', 300)
+
+    def format_event(key, data):
+        return f'id: {encode_cursor(*key)}\nevent: message\ndata: {dumps(data).decode()}\n\n'
+
+    def catch_up():
+        """从数据库补发游标之后的消息 (续传、心跳、缓冲区溢出或批量发送时使用)"""
+        nonlocal last_key
+        while True:
+            rows = _inbox_query(user_id).filter(db.or_(
+                Message.sent_at > last_key[0],
+                db.and_(Message.sent_at == last_key[0], Message.message_id > last_key[1])
+            )).order_by(Message.sent_at, Message.message_id).limit(MAX_PAGE_SIZE).all()
+            db.session.rollback()
+            for row in rows:
+                last_key = (row.sent_at, row.message_id)
+                yield format_event(last_key, MESSAGE_SERIALIZER.to_dict(row))
+            if len(rows) < MAX_PAGE_SIZE:
+                return
+
+    def generate():
+        nonlocal last_key
+        try:
+            yield f'retry: {int(heartbeat * 1000)}\n\n'
+            if cursor:
+                yield from catch_up()
+            deadline = time.monotonic() + max_duration
+            while time.monotonic() < deadline:
+                events, overflowed = subscription.drain(timeout=heartbeat)
+                if not events:
+                    # 进程内推送只覆盖本 worker 发出的消息, 其他 worker 进程发出的消息以数据库为准, 每次心跳补齐
+                    yield from catch_up()
+                    yield ': heartbeat\n\n'
+                    continue
+                # None 表示批量发送的通知, 事件本身不带内容, 需要从数据库补齐
+                if overflowed or any(event is None for event in events):
+                    yield from catch_up()
+                    continue
+                for key, data in events:
+                    if key <= last_key:
+                        continue
+                    last_key = key
+                    yield format_event(key, data)
+        finally:
+            subscription.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 """
 tags:
   - 消息
@@ -85,13 +257,297 @@ def mark_message_as_read(current_user, message_id):
          return jsonify({'message': '未找到该消息!'}),404
     if message.recipient_id != current_user.user_id:
         return jsonify({'message': '您无权操作此消息!'}),403
-    message.is_read = True
+    # 条件更新: 只有原本未读的消息才扣减未读计数, 并发重复标记不会重复扣减
+    updated = db.session.execute(
+        db.update(Message).where(Message.message_id == message_id, Message.is_read == False)
+        .values(is_read=True).execution_options(synchronize_session=False)
+    ).rowcount
+    if updated:
+        decrement_unread(current_user.user_id, updated)
     db.session.commit()
     return jsonify({'message': '消息已标记为已读!'}), 200
+"""
+tags:
+  - 消息
+"""
+# 批量标记为已读
+@message.route('/messages/read-all', methods=['POST'])
+@token_required
+def mark_all_messages_as_read(current_user):
+    """
+    openapi:
+      summary: 将收件箱中的消息全部标记为已读
+      security:
+        - bearerAuth: []
+      parameters:
+        - name: incident_id
+          in: query
+          required: false
+          description: 只标记关联指定事件的消息
+          schema:
+            type: integer
+      responses:
+        '200':
+          description: 消息已全部标记为已读
+          content:
+              application/json:
+                schema:
+                  type: object
+                  properties:
+                    message:
+                      type: string
+                      example: 消息已全部标记为已读!
+                    updated:
+                      type: integer
+                      description: 本次标记的消息数
+        '401':
+          description: 未授权
+    """
+    query = db.update(Message).where(Message.recipient_id == current_user.user_id, Message.is_read == False)
+    incident_id = request.args.get('incident_id', type=int)
+    if incident_id is not None:
+        query = query.where(Message.incident_id == incident_id)
+    updated = db.session.execute(
+        query.values(is_read=True).execution_options(synchronize_session=False)
+    ).rowcount
+    if updated:
+        decrement_unread(current_user.user_id, updated)
+    db.session.commit()
+    return jsonify({'message': '消息已全部标记为已读!', 'updated': updated}), 200
+"""
+tags:
+  - 消息
+"""
+# 未读消息数 (客户端角标轮询)
+@message.route('/messages/unread-count', methods=['GET'])
+@token_required
+def get_unread_count(current_user):
+    """
+    openapi:
+      summary: 获取当前用户的未读消息数
+      description: 读取按用户维护的未读计数, 只做一次主键查询。
+      security:
+        - bearerAuth: []
+      responses:
+        '200':
+          description: 成功返回未读消息数
+          content:
+              application/json:
+                schema:
+                  type: object
+                  properties:
+                    unread_count:
+                      type: integer
+                      description: 未读消息数
+        '401':
+          description: 未授权
+    """
+    counter = db.session.get(MessageUnreadCounter, current_user.user_id)
+    return jsonify({'unread_count': counter.unread_count if counter else 0}), 200
+
+# 未读计数维护 (在调用方的事务内执行, 由调用方提交)
+def increment_unread(counts):
+    """
+    增加未读计数, 计数行不存在时自动创建
+    :param counts: user_id -> 增加的条数
+    """
+    if not counts:
+        return
+    table = MessageUnreadCounter.__table__
+    rows = [{'user_id': user_id, 'unread_count': n} for user_id, n in counts.items()]
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update(unread_count=table.c.unread_count + stmt.inserted.unread_count)
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=['user_id'],
+                                          set_={'unread_count': table.c.unread_count + stmt.excluded.unread_count})
+    else:
+        # 其他数据库: 先更新已有计数行, 再插入缺失的行
+        existing = set()
+        for row in rows:
+            if db.session.execute(table.update().where(table.c.user_id == row['user_id'])
+                                  .values(unread_count=table.c.unread_count + row['unread_count'])).rowcount:
+                existing.add(row['user_id'])
+        rows = [row for row in rows if row['user_id'] not in existing]
+        stmt = table.insert()
+    for i in range(0, len(rows), RECIPIENT_CHUNK_SIZE):
+        db.session.execute(stmt, rows[i:i + RECIPIENT_CHUNK_SIZE])
+
+def decrement_unread(user_id, n):
+    """扣减未读计数 (不会小于 0)"""
+    table = MessageUnreadCounter.__table__
+    db.session.execute(table.update().where(table.c.user_id == user_id)
+                       .values(unread_count=db.case((table.c.unread_count > n, table.c.unread_count - n), else_=0)))
+
+def rebuild_unread_counters():
+    """根据 messages 表重新计算全部未读计数 (修复计数漂移), 返回有未读消息的用户数"""
+    table = MessageUnreadCounter.__table__
+    db.session.execute(table.delete())
+    unread = db.select(Message.recipient_id, db.func.count()) \
+        .where(Message.is_read == False).group_by(Message.recipient_id)
+    result = db.session.execute(table.insert().from_select(['user_id', 'unread_count'], unread))
+    db.session.commit()
+    return result.rowcount
+
+@message.cli.command('rebuild-unread-counters')
+def rebuild_unread_counters_command():
+    """重建未读消息计数: flask message rebuild-unread-counters"""
+    count = rebuild_unread_counters()
+    print(f'未读计数已重建, 共 {count} 个用户有未读消息')
 
 # 发送消息 (内部函数，不直接暴露为 API 接口)
 def send_message(sender_id, recipient_id, incident_id, content):
     new_message = Message(sender_id=sender_id, recipient_id=recipient_id, incident_id=incident_id, content=content)
     db.session.add(new_message)
+    increment_unread({recipient_id: 1})
+    db.session.commit()
+    # 推送给在线的收件人
+    if message_hub.subscriber_count(recipient_id):
+        sender = load_principal(sender_id)
+        message_hub.publish(recipient_id, ((new_message.sent_at, new_message.message_id), {
+            'message_id': new_message.message_id,
+            'sender_id': sender_id,
+            'sender_name': sender.username if sender else None,
+            'incident_id': incident_id,
+            'content': content,
+            'is_read': False,
+            'sent_at': new_message.sent_at.isoformat()
+        }))
+    return new_message
+
+def resolve_recipients(recipient_ids=None, role_level=None, department_id=None):
+    """
+    解析收件人集合 (三种方式可组合, 取并集), 只返回有效用户
+    按角色和部门的解析分别走 (role_level, is_active) 和 department_id 索引
+    :param recipient_ids: 整数 user_id 列表 (由调用方校验)
+    :return: 排序后的 user_id 列表
+    """
+    active = User.is_active == True  # is_active 不为空 (见 flask user backfill-active), 只比较取值以便走索引
+    resolved = set()
+    if recipient_ids:
+        recipient_ids = sorted(set(recipient_ids))
+        for i in range(0, len(recipient_ids), RECIPIENT_CHUNK_SIZE):
+            chunk = recipient_ids[i:i + RECIPIENT_CHUNK_SIZE]
+            resolved.update(uid for (uid,) in db.session.query(User.user_id)
+                            .filter(User.user_id.in_(chunk), active))
+    if role_level is not None:
+        resolved.update(uid for (uid,) in db.session.query(User.user_id)
+                        .filter(User.role_level == role_level, active))
+    if department_id is not None:
+        resolved.update(uid for (uid,) in db.session.query(User.user_id)
+                        .filter(User.department_id == department_id, active))
+    return sorted(resolved)
+
+# 群发消息 (内部函数): 一次批量插入、一次提交
+def send_message_bulk(sender_id, content, incident_id=None, recipient_ids=None, role_level=None, department_id=None):
+    """
+    向一组收件人发送同一条消息
+    :return: 实际发送的消息条数
+    """
+    recipients = resolve_recipients(recipient_ids, role_level, department_id)
+    if not recipients:
+        return 0
+    sent_at = datetime.utcnow()
+    rows = [{
+        'sender_id': sender_id,
+        'recipient_id': recipient_id,
+        'incident_id': incident_id,
+        'content': content,
+        'is_read': False,
+        'sent_at': sent_at,
+    } for recipient_id in recipients]
+    db.session.execute(Message.__table__.insert(), rows)
+    increment_unread({recipient_id: 1 for recipient_id in recipients})
     db.session.commit()
-    return new_message
\ No newline at end of file
+    # 批量插入拿不到消息ID, 只通知在线收件人从数据库补齐
+    for recipient_id in recipients:
+        message_hub.publish(recipient_id, None)
+    return len(rows)
+
+"""
+tags:
+  - 消息
+"""
+# 群发消息
+@message.route('/messages/broadcast', methods=['POST'])
+@token_required
+@role_required([0, 1, 2])  # 领导小组、指挥中心、部门领导 (管理员默认放行)
+def broadcast_message(current_user):
+    """
+    openapi:
+      summary: 群发消息
+      description: 按用户ID列表、角色级别或部门向多个用户发送同一条消息, 三种方式可组合 (取并集)。
+      security:
+        - bearerAuth: []
+      requestBody:
+        required: true
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                content:
+                  type: string
+                  description: 消息内容
+                incident_id:
+                  type: integer
+                  description: 关联的事件ID (可选)
+                recipient_ids:
+                  type: array
+                  items:
+                    type: integer
+                  description: 收件人ID列表
+                role_level:
+                  type: integer
+                  description: 按角色级别群发
+                department_id:
+                  type: integer
+                  description: 按部门群发
+              required:
+                - content
+      responses:
+        '201':
+          description: 消息已发送
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  message:
+                    type: string
+                    example: 消息已发送!
+                  recipient_count:
+                    type: integer
+                    description: 实际收件人数
+        '400':
+          description: 缺少消息内容或收件人, 或参数类型错误
+        '401':
+          description: 未授权
+        '403':
+          description: 权限不足
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'message': '请求体必须是 JSON 对象!'}), 400
+    content = data.get('content')
+    recipient_ids = data.get('recipient_ids')
+    role_level = data.get('role_level')
+    department_id = data.get('department_id')
+    incident_id = data.get('incident_id')
+    if not content:
+        return jsonify({'message': '请填写消息内容!'}), 400
+    if recipient_ids is not None and (not isinstance(recipient_ids, list)
+                                      or not all(_is_int(x) for x in recipient_ids)):
+        return jsonify({'message': 'recipient_ids 必须是整数数组!'}), 400
+    for name, value in (('role_level', role_level), ('department_id', department_id), ('incident_id', incident_id)):
+        if value is not None and not _is_int(value):
+            return jsonify({'message': f'{name} 必须是整数!'}), 400
+    if not recipient_ids and role_level is None and department_id is None:
+        return jsonify({'message': '请指定收件人!'}), 400
+    count = send_message_bulk(current_user.user_id, content, incident_id,
+                              recipient_ids=recipient_ids, role_level=role_level, department_id=department_id)
+    return jsonify({'message': '消息已发送!', 'recipient_count': count}), 201
\ No newline at end of file
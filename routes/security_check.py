@@ -1,28 +1,12 @@
 # /www/wwwroot/air_emergency_response/routes/security_check.py
 from flask import Blueprint, request, jsonify, current_app
 from models.security_check import SecurityCheck
-from functools import wraps
-from models.user import User
-from utils.jwt_utils import decode_jwt_token
+from utils.jwt_utils import token_required
+from utils.conditional import make_etag, is_not_modified, not_modified, set_validators
 from models import db
 
 security_check = Blueprint('security_check', __name__)
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'message': '缺少Token!'}), 401
-        user_id = decode_jwt_token(token, current_app.config['JWT_SECRET_KEY'])
-        if isinstance(user_id, str):
-            return jsonify({'message': user_id}), 401
-        current_user = User.query.filter_by(user_id=user_id).first()
-        if not current_user:
-            return jsonify({'message': '用户不存在!'}), 401
-        return f(current_user, *args, **kwargs)
-    return decorated
-
 """
   tags:
     - 安全检查
@@ -76,6 +60,7 @@ def get_security_check(current_user, check_id):
     """
     openapi:
       summary: 获取安全检查记录
+      description: 响应携带 ETag 和 Last-Modified, 条件请求命中时返回 304。
       security:
         - bearerAuth: []
       parameters:
@@ -92,18 +77,27 @@ def get_security_check(current_user, check_id):
             application/json:
               schema:
                 $ref: '#/components/schemas/SecurityCheck'
+        '304':
+          description: 内容未变化 (If-None-Match / If-Modified-Since 命中)
         '401':
           description: 未授权
         '404':
           description: 安全检查记录不存在
     """
+    # 先只查询修改时间, 客户端缓存有效时不加载整行
+    row = db.session.query(SecurityCheck.updated_at).filter(SecurityCheck.check_id == check_id).first()
+    if not row:
+        return jsonify({'message': '安全检查记录不存在!'}), 404
+    etag = make_etag('security-check', check_id, row.updated_at)
+    if is_not_modified(etag, row.updated_at):
+        return not_modified(etag, row.updated_at)
     check = SecurityCheck.query.filter_by(check_id=check_id).first()
     if not check:
         return jsonify({'message': '安全检查记录不存在!'}), 404
-    return jsonify({
+    return set_validators(jsonify({
         'check_id': check.check_id,
         'check_record': check.check_record,
         'issue_tracking': check.issue_tracking,
         'improvement_status': check.improvement_status,
         'evaluation_report': check.evaluation_report
-    }), 200
\ No newline at end of file
+    }), make_etag('security-check', check_id, check.updated_at), check.updated_at), 200
\ No newline at end of file
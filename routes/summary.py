@@ -1,7 +1,8 @@
 # routes/summary.py
 from flask import Blueprint, request, jsonify
-from models import db, Summary, Incident, User
+from models import db, Summary, Incident, User, load_encrypted_columns
 from utils.jwt_utils import token_required, role_required
+from utils.conditional import make_etag, is_not_modified, not_modified, set_validators
 
 summary = Blueprint('summary', __name__)
 
@@ -81,6 +82,7 @@ def get_summary(current_user, incident_id):
     """
     openapi:
       summary: 获取事件总结
+      description: 响应携带 ETag 和 Last-Modified, 条件请求命中时返回 304 (不读取和解密正文)。
       security:
         - bearerAuth: []
       parameters:
@@ -97,12 +99,23 @@ def get_summary(current_user, incident_id):
             application/json:
               schema:
                 $ref: '#/components/schemas/Summary'
+        '304':
+          description: 内容未变化 (If-None-Match / If-Modified-Since 命中)
         '401':
           description: 未授权
         '404':
           description: 未找到事件总结
     """
-    summary = Summary.query.filter_by(incident_id=incident_id).first()
+    # 先只查询主键和修改时间, 客户端缓存有效时不读取密文, 也不做 SM4 解密
+    row = db.session.query(Summary.summary_id, Summary.updated_at).filter(Summary.incident_id == incident_id) \
+        .order_by(Summary.summary_id).first()
+    if not row:
+        return jsonify({'message': '未找到事件总结!'}), 404
+    etag = make_etag('summary', row.summary_id, row.updated_at)
+    if is_not_modified(etag, row.updated_at):
+        return not_modified(etag, row.updated_at)
+    # 需要返回正文, 在同一次查询中加载加密列
+    summary = Summary.query.options(load_encrypted_columns()).filter_by(summary_id=row.summary_id).first()
     if not summary:
         return jsonify({'message': '未找到事件总结!'}), 404
     summary_data = {
@@ -113,7 +126,8 @@ def get_summary(current_user, incident_id):
           'event_type': summary.event_type,
           'security_level':summary.security_level
        }
-    return jsonify(summary_data), 200
+    return set_validators(jsonify(summary_data), make_etag('summary', summary.summary_id, summary.updated_at),
+                          summary.updated_at), 200
 """
 tags:
   - 事件总结
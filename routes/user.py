@@ -1,14 +1,17 @@
 # routes/user.py
 from flask import Blueprint, request, jsonify, current_app, render_template_string, url_for
 from models import db, User
-from utils.jwt_utils import generate_jwt_token, decode_jwt_token, token_required, role_required # 导入之前编写的文件
+from utils.jwt_utils import generate_jwt_token, decode_jwt_token, token_required, role_required, invalidate_principal # 导入之前编写的文件
 from utils.sm_utils import encrypt_sm3, generate_salt # 导入加密函数
 from utils.email import send_email  # 导入邮件发送函数
+from utils.serializers import ModelSerializer, json_response, stream_json_array, STREAM_CHUNK_SIZE
 from forms import RegistrationForm, CreateUserForm,ResetPasswordRequestForm, ResetPasswordForm, UpdateUserForm # 导入表单
 from itsdangerous import URLSafeTimedSerializer as Serializer # 用于生成用户token
 from itsdangerous import BadSignature, SignatureExpired # 用于处理异常情况
 
 user = Blueprint('user', __name__)
+# 用户信息的返回格式
+USER_SERIALIZER = ModelSerializer('user_id', 'username', 'email', 'role_level', 'is_active')
 
 """
 tags:
@@ -128,6 +131,8 @@ def get_all_users(current_user):
     """
     openapi:
       summary: 获取所有用户 (管理员)
+      description: 以分块传输流式返回 JSON 数组, 服务端不在内存中拼出完整响应。
+        若中途读取失败, 响应以一个 error 对象结束且数组不闭合 (不是合法 JSON), 客户端应视为失败。
       security:
         - bearerAuth: []
       responses:
@@ -145,18 +150,9 @@ def get_all_users(current_user):
             description: "权限不足"
 
     """
-    users = User.query.all()
-    users_list = []
-    for user in users:
-        user_data = {
-            'user_id': user.user_id,
-            'username': user.username,
-            'email': user.email,
-            'role_level': user.role_level,
-            'is_active': user.is_active
-        }
-        users_list.append(user_data)
-    return jsonify(users_list), 200
+    columns = [getattr(User, key) for key in USER_SERIALIZER.keys]
+    users = db.session.query(*columns).order_by(User.user_id).yield_per(STREAM_CHUNK_SIZE)
+    return stream_json_array(USER_SERIALIZER, users), 200
 
 """
 tags:
@@ -200,14 +196,7 @@ def get_user(current_user, user_id):
     if not user:
         return jsonify({'message': '用户不存在!'}), 404
 
-    user_data = {
-        'user_id': user.user_id,
-        'username': user.username,
-        'email': user.email,
-        'role_level': user.role_level,
-        'is_active': user.is_active
-    }
-    return jsonify(user_data), 200
+    return json_response(USER_SERIALIZER.to_dict(user)), 200
 
 """
 tags:
@@ -262,6 +251,7 @@ def update_user(current_user, user_id):
       user.email = form.email.data
       user.role_level = form.role_level.data
       db.session.commit()
+      invalidate_principal(user.user_id)
       return jsonify({'message':'更新成功'}),200
    #表单验证失败
     return jsonify({'message':"表单验证失败",'error': form.errors}),400
@@ -314,6 +304,7 @@ def delete_user(current_user, user_id):
     # 逻辑删除
     user.is_active = False
     db.session.commit()
+    invalidate_principal(user.user_id)
     return jsonify({'message': '删除成功'}), 200
 """
 tags:
@@ -444,5 +435,12 @@ def reset_password(token):
         user.hashed_password = hashed_password
         user.salt = salt
         db.session.commit()
+        invalidate_principal(user.user_id)
         return jsonify({'message': '密码已成功重置!'}), 200
-    return jsonify({'message': '密码重置失败', 'error': form.errors}), 400
\ No newline at end of file
+    return jsonify({'message': '密码重置失败', 'error': form.errors}), 400
+@user.cli.command('backfill-active')
+def backfill_active_command():
+    """把 is_active 为空的旧用户回填为有效: flask user backfill-active (升级到 is_active 非空之前执行)"""
+    count = User.query.filter(User.is_active.is_(None)).update({'is_active': True}, synchronize_session=False)
+    db.session.commit()
+    print(f'已回填 {count} 个用户的 is_active')
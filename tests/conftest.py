@@ -0,0 +1,95 @@
+# tests/conftest.py
+"""
+测试夹具
+必需的环境变量在导入 app 之前设置; 数据库固定为临时目录下的 SQLite 文件 (多线程测试需要文件库, 不会连到真实库)
+运行: python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+TMP_DIR = tempfile.mkdtemp(prefix='air_emergency_tests_')
+for key, value in {
+    'JWT_SECRET_KEY': 'test-jwt-secret',
+    'SM2_PRIVATE_KEY': 'test-sm2-key',
+    'SECRET_KEY': 'test-secret-key',
+    'MAIL_SERVER': '127.0.0.1',
+    'MAIL_PORT': '2525',
+    'MAIL_USERNAME': 'test',
+    'MAIL_PASSWORD': 'test',
+    'MAIL_DEFAULT_SENDER': 'noreply@example.com',
+    'MAIL_USE_TLS': 'false',
+}.items():
+    os.environ.setdefault(key, value)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP_DIR, 'test.db')
+os.environ['SEARCH_INDEX_PATH'] = os.path.join(TMP_DIR, 'incident_search.db')
+os.environ['MAIL_DEAD_LETTER_FILE'] = os.path.join(TMP_DIR, 'mail_dead_letter.jsonl')
+
+import pytest
+from flask import g, request_started
+from app import app as flask_app
+from models import db, User, EventType
+from utils import jwt_utils, login_guard, search
+from utils.audit import audit_writer
+from utils.event_type_catalog import event_type_catalog
+from utils.sm_utils import encrypt_sm3, generate_salt
+
+PASSWORD = 'password123'
+# 用户名 -> 角色级别, 创建顺序即 user_id (1..5)
+USERS = (('admin', -1), ('leader', 0), ('center', 1), ('dept', 2), ('normal', 3))
+
+def _reset_process_state():
+    """清空进程级缓存, 避免上一个用例的数据影响当前用例"""
+    jwt_utils._token_cache = None
+    jwt_utils._principal_cache = None
+    login_guard._tracker = None
+    search._search_index = None
+    if os.path.exists(os.environ['SEARCH_INDEX_PATH']):
+        os.remove(os.environ['SEARCH_INDEX_PATH'])
+    event_type_catalog.invalidate()
+
+def _clear_request_state(sender, **extra):
+    """
+    app 夹具在整个用例期间保持一个应用上下文, 测试客户端的请求会复用它 (g 也随之共享);
+    每个请求开始时清掉上一个请求留在 g 上的认证结果, 与生产环境每个请求独立的应用上下文一致
+    """
+    g.pop('auth_context', None)
+request_started.connect(_clear_request_state, flask_app)
+
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    audit_writer.synchronous = True
+    audit_writer.flush_interval = 0.1  # 缩短后台线程停止时的等待
+    _reset_process_state()
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        for name, role_level in USERS:
+            salt = generate_salt()
+            db.session.add(User(username=name, email=f'{name}@example.com', salt=salt,
+                                hashed_password=encrypt_sm3(PASSWORD, salt), role_level=role_level))
+        db.session.add(EventType(type_name='鸟击', is_aviation=True))
+        db.session.commit()
+        yield flask_app
+        audit_writer.shutdown()  # 异步模式下排队的审计记录写入本用例的库, 不留给下一个用例
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def auth_headers(client):
+    """按用户名登录并返回 Authorization 请求头"""
+    tokens = {}
+
+    def headers(username):
+        if username not in tokens:
+            response = client.post('/login', json={'username': username, 'password': PASSWORD})
+            assert response.status_code == 200, response.get_json()
+            tokens[username] = response.get_json()['token']
+        return {'Authorization': tokens[username]}
+    return headers
@@ -0,0 +1,112 @@
+# tests/test_audit.py
+import datetime
+import time
+import pytest
+from flask import Flask
+from models import db, LoginAttempt
+from utils import audit
+from utils.audit import AuditWriter
+
+@pytest.fixture
+def writer(app):
+    """绑定到测试应用的独立写入器 (不经过 init_app, 不在测试应用上重复注册钩子)"""
+    writer = AuditWriter()
+    writer.app = app
+    writer.flush_interval = 0.1
+    writer.retry_delay = 0
+    yield writer
+    writer.shutdown(timeout=2)
+
+def _row(user_id=5, success=True):
+    return {'user_id': user_id, 'success': success, 'ip_address': '10.0.0.1',
+            'attempt_time': datetime.datetime.utcnow()}
+
+def _stored():
+    db.session.rollback()  # 结束当前读事务, 以便看到写入器写入的数据
+    return LoginAttempt.query.count()
+
+def _wait(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+def test_synchronous_mode_writes_before_returning(writer):
+    writer.synchronous = True
+    assert writer.submit(LoginAttempt.__table__, _row())
+    assert _stored() == 1
+    stats = writer.stats()
+    assert (stats['written'], stats['batches'], stats['enqueued']) == (1, 1, 0)
+    assert writer._thread is None  # 同步模式不启动后台线程
+
+def test_batch_is_written_when_full(writer):
+    writer.batch_size, writer.flush_interval = 5, 30  # 只有攒满才会在用例时限内写出
+    for _ in range(5):
+        writer.submit(LoginAttempt.__table__, _row())
+    assert _wait(lambda: writer.stats()['written'] == 5)
+    assert writer.stats()['batches'] == 1
+    assert _stored() == 5
+
+def test_partial_batch_is_written_after_flush_interval(writer):
+    writer.batch_size, writer.flush_interval = 100, 0.2
+    for _ in range(3):
+        writer.submit(LoginAttempt.__table__, _row())
+    start = time.monotonic()
+    assert _wait(lambda: writer.stats()['written'] == 3)
+    assert time.monotonic() - start < 2
+    assert writer.stats()['batches'] == 1
+
+def test_shutdown_writes_the_batch_being_collected(writer):
+    writer.batch_size, writer.flush_interval = 100, 30  # 后台线程正在攒批, 30 秒内不会自行写出
+    for _ in range(3):
+        writer.submit(LoginAttempt.__table__, _row())
+    assert _wait(lambda: writer._queue.qsize() == 0)  # 已被后台线程取走
+    start = time.monotonic()
+    writer.shutdown(timeout=5)
+    assert time.monotonic() - start < 2
+    assert not writer._thread.is_alive()
+    assert _stored() == 3
+
+def test_full_queue_drops_and_counts(writer, monkeypatch):
+    monkeypatch.setattr(writer, '_ensure_worker', lambda: None)  # 没有消费者, 队列只进不出
+    writer.enqueue_timeout = 0.01
+    writer._queue.maxsize = 2
+    results = [writer.submit(LoginAttempt.__table__, _row()) for _ in range(3)]
+    assert results == [True, True, False]
+    stats = writer.stats()
+    assert (stats['enqueued'], stats['blocked'], stats['dropped']) == (2, 1, 1)
+    assert (stats['high_watermark'], stats['queue_depth'], stats['queue_capacity']) == (2, 2, 2)
+    writer.flush()
+    stats = writer.stats()
+    assert (stats['written'], stats['batches'], stats['queue_depth']) == (2, 1, 0)
+
+def test_transient_failure_is_retried(writer, monkeypatch):
+    insert, calls = writer._insert, []
+
+    def flaky(grouped):
+        calls.append(grouped)
+        if len(calls) == 1:
+            raise RuntimeError('database is locked')
+        insert(grouped)
+    monkeypatch.setattr(writer, '_insert', flaky)
+    writer.synchronous = True
+    writer.submit(LoginAttempt.__table__, _row())
+    assert len(calls) == 2 and _stored() == 1
+    stats = writer.stats()
+    assert (stats['retried'], stats['written'], stats['failed']) == (1, 1, 0)
+
+def test_failed_batch_falls_back_to_row_by_row(writer):
+    writer._write([(LoginAttempt.__table__, _row()),
+                   (LoginAttempt.__table__, _row(user_id=None)),  # 违反非空约束, 整批写入失败
+                   (LoginAttempt.__table__, _row(success=False))])
+    assert _stored() == 2
+    stats = writer.stats()
+    assert (stats['retried'], stats['written'], stats['failed']) == (1, 2, 1)
+
+def test_atexit_is_registered_once(monkeypatch):
+    registered = []
+    monkeypatch.setattr(audit.atexit, 'register', registered.append)
+    writer = AuditWriter()
+    for _ in range(3):
+        writer.init_app(Flask(__name__))
+    assert registered == [writer.shutdown]
@@ -0,0 +1,78 @@
+# tests/test_auth.py
+import threading
+import time
+import pytest
+from sqlalchemy import event
+from models import db, LoginAttempt, User
+from utils import jwt_utils
+from utils.audit import audit_writer
+from utils.cache import LRUCache
+
+@pytest.fixture
+def request_statements(app):
+    """记录当前线程 (即处理请求的线程) 执行的 SQL, 审计写入器后台线程的写库不计入"""
+    statements = []
+    ident = threading.get_ident()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == ident:
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+def _wait_for_attempts(count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        audit_writer.flush()
+        db.session.rollback()  # 结束当前读事务, 以便看到后台线程写入的数据
+        if LoginAttempt.query.count() >= count:
+            break
+        time.sleep(0.05)
+    return LoginAttempt.query.order_by(LoginAttempt.id).all()
+
+@pytest.mark.parametrize('username, password, status_code', [
+    ('normal', 'password123', 200),
+    ('normal', 'wrong-password', 401),
+    ('ghost', 'wrong-password', 404),
+])
+def test_login_issues_one_statement(app, client, request_statements, username, password, status_code):
+    audit_writer.synchronous = False  # AUDIT_SYNC 关闭: 登录尝试由后台线程写库
+    # 登录失败追踪器在进程内首次使用时从 login_attempts 加载一次近期失败记录, 不计入单次登录
+    assert client.post('/login', json={'username': 'leader', 'password': 'password123'}).status_code == 200
+    request_statements.clear()
+    response = client.post('/login', json={'username': username, 'password': password})
+    assert response.status_code == status_code
+    assert len(request_statements) == 1, "\n".join(request_statements)
+    assert request_statements[0].lstrip().upper().startswith('SELECT')
+
+def test_login_attempts_are_still_recorded(app, client):
+    audit_writer.synchronous = False
+    assert client.post('/login', json={'username': 'normal', 'password': 'wrong-password'}).status_code == 401
+    assert client.post('/login', json={'username': 'normal', 'password': 'password123'}).status_code == 200
+    attempts = _wait_for_attempts(2)
+    # 后台线程与 flush 可能交错写入, 不比较顺序
+    assert sorted((a.user_id, a.success) for a in attempts) == [(5, False), (5, True)]
+
+def test_principal_cache_staleness_is_bounded_by_ttl(app, client, auth_headers):
+    now = [0.0]
+    ttl = app.config['PRINCIPAL_CACHE_TTL']
+    jwt_utils._principal_cache = LRUCache(ttl=ttl, timer=lambda: now[0])
+    headers = auth_headers('normal')
+    assert client.get('/users/5', headers=headers).status_code == 200
+    # 模拟其他进程停用账户: 只改库, 不调用本进程的 invalidate_principal
+    db.session.query(User).filter_by(user_id=5).update({'is_active': False})
+    db.session.commit()
+    now[0] = ttl - 1
+    assert client.get('/users/5', headers=headers).status_code == 200
+    now[0] = ttl
+    assert client.get('/users/5', headers=headers).status_code == 401
+
+def test_deactivated_account_is_rejected_by_token_check(app, client, auth_headers):
+    headers = auth_headers('normal')
+    assert client.delete('/users/5', headers=auth_headers('admin')).status_code == 200
+    # 登录流程不单独检查停用状态, 统一由 token_required 返回 401
+    assert client.get('/users/5', headers=headers).status_code == 401
+    response = client.post('/login', json={'username': 'normal', 'password': 'password123'})
+    assert client.get('/users/5', headers={'Authorization': response.get_json()['token']}) \
+        .status_code == 401
@@ -0,0 +1,28 @@
+# tests/test_conditional.py
+import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateTable
+from models import db, EmergencyPlan, SecurityCheck, Summary
+
+@pytest.mark.parametrize('model', [Summary, EmergencyPlan, SecurityCheck])
+def test_updated_at_keeps_microseconds_on_mysql(model):
+    ddl = str(CreateTable(model.__table__).compile(dialect=mysql.dialect()))
+    assert 'updated_at DATETIME(6)' in ddl
+
+def test_etag_changes_for_writes_within_one_second(client, auth_headers):
+    headers = auth_headers('normal')
+    check = SecurityCheck(check_record='跑道巡检', issue_tracking='无', improvement_status=0)
+    db.session.add(check)
+    db.session.commit()
+    response = client.get(f'/security-checks/{check.check_id}', headers=headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert client.get(f'/security-checks/{check.check_id}', headers={**headers, 'If-None-Match': etag}) \
+        .status_code == 304
+
+    check.issue_tracking = '已整改'  # 与上一次写入间隔远小于一秒
+    db.session.commit()
+    response = client.get(f'/security-checks/{check.check_id}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['issue_tracking'] == '已整改'
@@ -0,0 +1,93 @@
+# tests/test_event_type_catalog.py
+import io
+import threading
+import pytest
+from sqlalchemy import event
+from models import db, EventType, Incident
+from utils.event_type_catalog import EventTypeCatalog, event_type_catalog
+from utils.importer import run_import
+from utils.serializers import dumps
+
+@pytest.fixture
+def request_statements(app):
+    """记录当前线程执行的 SQL"""
+    statements = []
+    ident = threading.get_ident()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == ident:
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+def _list(client, headers, etag=None):
+    if etag is not None:
+        headers = {**headers, 'If-None-Match': f'"{etag}"'}
+    return client.get('/admin/event-types', headers=headers)
+
+def test_if_none_match_returns_304_without_sql(client, auth_headers, request_statements):
+    headers = auth_headers('leader')
+    response = _list(client, headers)  # 首次请求加载目录和当前用户
+    assert response.status_code == 200
+    assert response.get_json() == [{'type_id': 1, 'type_name': '鸟击', 'is_aviation': True}]
+    etag = response.get_etag()[0]
+    request_statements.clear()
+
+    response = _list(client, headers, etag)
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.get_etag()[0] == etag
+    assert request_statements == []
+
+    response = _list(client, headers, 'stale')
+    assert response.status_code == 200
+    assert response.get_json()[0]['type_name'] == '鸟击'
+    assert request_statements == []
+
+@pytest.mark.parametrize('method, path, data, expected', [
+    ('post', '/admin/event-types/create', {'type_name': '跑道侵入', 'is_aviation': True},
+     [{'type_id': 1, 'type_name': '鸟击', 'is_aviation': True},
+      {'type_id': 2, 'type_name': '跑道侵入', 'is_aviation': True}]),
+    ('post', '/admin/event-types/1/update', {'type_name': '鸟击(更新)'},
+     [{'type_id': 1, 'type_name': '鸟击(更新)', 'is_aviation': False}]),
+    ('post', '/admin/event-types/1/delete', None, []),
+])
+def test_changes_bump_version_and_etag(client, auth_headers, method, path, data, expected):
+    headers = auth_headers('leader')
+    etag = _list(client, headers).get_etag()[0]
+    version = event_type_catalog.version
+    response = getattr(client, method)(path, headers=headers, json=data)
+    assert response.status_code in (200, 201), response.get_json()
+    assert event_type_catalog.version == version + 1
+
+    response = _list(client, headers, etag)
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+    assert response.get_json() == expected
+
+def test_catalog_reloads_after_ttl(app):
+    now = [0.0]
+    catalog = EventTypeCatalog(timer=lambda: now[0])
+    ttl = app.config.get('EVENT_TYPE_CACHE_TTL', 300)
+    first = catalog.snapshot()
+    db.session.add(EventType(type_name='跑道侵入', is_aviation=True))  # 模拟其他进程的修改: 不调用 invalidate
+    db.session.commit()
+    now[0] = ttl - 1
+    assert catalog.snapshot() is first
+    now[0] = ttl
+    assert sorted(catalog.snapshot().by_id) == [1, 2]
+    assert catalog.loads == 2
+
+def test_importer_looks_up_event_types_in_snapshot(app, request_statements):
+    event_type_catalog.snapshot()
+    loads = event_type_catalog.loads
+    rows = [{'incident_info': '按ID', 'event_type_id': 1, 'submitted_by_user_id': 5},
+            {'incident_info': '按名称', 'event_type_id': '鸟击', 'submitted_by_user_id': 5},
+            {'incident_info': '不存在', 'event_type_id': 99, 'submitted_by_user_id': 5}]
+    request_statements.clear()
+    report = run_import('incidents', io.BytesIO(b''.join(dumps(row) + b'\n' for row in rows)))
+    assert (report.imported, report.failed) == (2, 1)
+    assert event_type_catalog.loads == loads
+    assert not [s for s in request_statements if 'FROM event_types' in s]
+    assert [i.event_type_id for i in Incident.query.order_by(Incident.incident_id)] == [1, 1]
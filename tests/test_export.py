@@ -0,0 +1,98 @@
+# tests/test_export.py
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from models import db, Incident, IncidentStatus, Summary
+from utils import sm_utils
+from utils.export import export_stream
+
+T0 = datetime(2024, 3, 1, 8, 0, 0)
+
+@pytest.fixture
+def incidents(app):
+    """5 条事件, 创建时间间隔 1 小时; 每条一份总结"""
+    for i in range(5):
+        incident = Incident(incident_info=f'事件{i}, 含逗号', event_type_id=1, submitted_by_user_id=5, incident_level=i,
+                            status=IncidentStatus.DRAFT, created_at=T0 + timedelta(hours=i))
+        db.session.add(incident)
+        db.session.flush()
+        db.session.add(Summary(incident_id=incident.incident_id, user_id=5, event_type='鸟击', security_level='一般',
+                               content=f'总结正文{i}', created_at=T0 + timedelta(hours=i)))
+    db.session.commit()
+
+def _ndjson(data):
+    return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+def test_ndjson(incidents):
+    rows = _ndjson(b''.join(export_stream('incidents', chunk_size=2)))
+    assert [row['incident_id'] for row in rows] == [1, 2, 3, 4, 5]
+    assert rows[1]['incident_info'] == '事件1, 含逗号'
+    assert rows[1]['status'] == 'DRAFT'
+    assert rows[1]['created_at'] == '2024-03-01T09:00:00'
+    assert rows[0]['resolved_at'] is None
+
+def test_csv_has_bom_and_header(incidents):
+    data = b''.join(export_stream('incidents', 'csv', chunk_size=2))
+    assert data.startswith(b'\xef\xbb\xbf')  # UTF-8 BOM
+    header, *rows = csv.reader(io.StringIO(data.decode('utf-8-sig')))
+    assert header[:3] == ['incident_id', 'incident_info', 'process_status']
+    assert len(rows) == 5 and all(len(row) == len(header) for row in rows)
+    assert dict(zip(header, rows[1]))['incident_info'] == '事件1, 含逗号'
+
+def test_csv_without_rows_still_has_header(app):
+    data = b''.join(export_stream('security-checks', 'csv'))
+    assert data.decode('utf-8-sig').splitlines() == \
+        ['check_id,check_record,issue_tracking,improvement_status,evaluation_report,updated_at']
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'csv'])
+def test_gzip_round_trip(incidents, fmt):
+    plain = b''.join(export_stream('incidents', fmt, chunk_size=2))
+    assert gzip.decompress(b''.join(export_stream('incidents', fmt, compress=True, chunk_size=2))) == plain
+
+def test_summaries_are_decrypted_per_chunk(incidents, monkeypatch):
+    content_type = Summary.__table__.c.content.type
+    decrypt_many, batches = content_type.decrypt_many, []
+
+    def spy(values):
+        batches.append(len(values))
+        return decrypt_many(values)
+    monkeypatch.setattr(content_type, 'decrypt_many', spy)
+    monkeypatch.setattr(sm_utils, 'decrypt_sm4', None)  # 逐行解密 (process_result_value) 不应被调用
+    rows = _ndjson(b''.join(export_stream('summaries', chunk_size=2)))
+    assert [row['content'] for row in rows] == [f'总结正文{i}' for i in range(5)]
+    assert batches == [2, 2, 1]
+
+def test_time_range(incidents):
+    rows = _ndjson(b''.join(export_stream('incidents', start=T0 + timedelta(hours=1), end=T0 + timedelta(hours=3))))
+    assert [row['incident_id'] for row in rows] == [2, 3]
+
+@pytest.mark.parametrize('username, status_code', [
+    ('admin', 200), ('leader', 200), ('center', 403), ('dept', 403), ('normal', 403),
+])
+def test_export_roles(client, auth_headers, incidents, username, status_code):
+    assert client.get('/exports/incidents', headers=auth_headers(username)).status_code == status_code
+
+def test_export_endpoint(client, auth_headers, incidents):
+    headers = auth_headers('leader')
+    response = client.get('/exports/summaries?format=csv&gzip=true&from=2024-03-01T10:00:00', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/gzip'
+    assert response.headers['Content-Disposition'].endswith('.csv.gz')
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.get_data()).decode('utf-8-sig'))))
+    assert [row['content'] for row in rows] == ['总结正文2', '总结正文3', '总结正文4']
+
+    response = client.get('/exports/incidents', headers=headers)
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(_ndjson(response.get_data())) == 5
+
+@pytest.mark.parametrize('path, status_code', [
+    ('/exports/users', 404),
+    ('/exports/incidents?format=xml', 400),
+    ('/exports/incidents?from=yesterday', 400),
+    ('/exports/security-checks?from=2024-03-01', 400),
+])
+def test_export_rejects_bad_requests(client, auth_headers, path, status_code):
+    assert client.get(path, headers=auth_headers('leader')).status_code == status_code
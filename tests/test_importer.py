@@ -0,0 +1,61 @@
+# tests/test_importer.py
+import io
+from datetime import datetime
+from models import db, Department, Incident, IncidentStatus, User
+from utils.importer import run_import
+from utils.search import get_search_index
+from utils.serializers import dumps
+from utils.sm_utils import encrypt_sm3, generate_salt
+
+def _ndjson(rows):
+    return io.BytesIO(b''.join(dumps(row) + b'\n' for row in rows))
+
+def test_user_role_level_defaults_to_registration_level(app):
+    report = run_import('users', _ndjson([
+        {'username': 'importer1', 'email': 'importer1@example.com', 'password': 'password123'},
+        {'username': 'importer2', 'email': 'importer2@example.com', 'password': 'password123', 'role_level': 1},
+        {'username': 'importer3', 'email': 'importer3@example.com', 'password': 'password123', 'role_level': 7},
+    ]))
+    assert (report.imported, report.failed) == (2, 1)
+    users = {user.username: user for user in User.query.filter(User.username.like('importer%'))}
+    assert users['importer1'].role_level == 3
+    assert users['importer2'].role_level == 1
+    assert users['importer1'].hashed_password == encrypt_sm3('password123', users['importer1'].salt)
+
+def test_user_role_level_defaults_in_csv(app):
+    data = 'username,email,password,role_level\nimporter4,importer4@example.com,password123,\n'
+    report = run_import('users', io.BytesIO(data.encode('utf-8')), 'csv')
+    assert report.imported == 1
+    assert User.query.filter_by(username='importer4').one().role_level == 3
+
+def test_incident_columns_round_trip(app):
+    """导入时参数直接交给驱动, 枚举、布尔、时间、部门关联和检索索引应与 ORM 写入一致"""
+    db.session.add_all([Department(department_name='机务'), Department(department_name='运控')])
+    db.session.commit()
+    report = run_import('incidents', _ndjson([
+        {'incident_info': '跑道鸟击', 'event_type_id': '鸟击', 'submitted_by_user_id': 5, 'status': 'resolved',
+         'is_aviation': 'false', 'incident_level': '2', 'created_at': '2024-03-01T16:00:00+08:00',
+         'department_ids': ['机务', 2]},
+        {'incident_info': '滑行道异物', 'event_type_id': 1, 'submitted_by_user_id': 5},
+    ]), chunk_size=1)
+    assert (report.imported, report.failed) == (2, 0)
+    first, second = Incident.query.order_by(Incident.incident_id).all()
+    assert (first.status, first.is_aviation, first.incident_level, first.version) == \
+        (IncidentStatus.RESOLVED, False, 2, 1)
+    assert first.created_at == datetime(2024, 3, 1, 8, 0)
+    assert sorted(d.department_name for d in first.departments) == ['机务', '运控']
+    assert (second.status, second.is_aviation, second.departments) == (IncidentStatus.DRAFT, False, [])
+    assert second.created_at is not None
+    assert Incident.query.filter(Incident.created_at < datetime(2024, 3, 2)).count() == 1  # 按时间比较
+    assert get_search_index().search('鸟击')[1][0][0] == first.incident_id
+
+def test_user_with_precomputed_hash(app):
+    salt = generate_salt()
+    report = run_import('users', _ndjson([
+        {'username': 'migrated', 'email': 'migrated@example.com', 'hashed_password': encrypt_sm3('secret-pass', salt),
+         'salt': salt, 'is_active': True},
+    ]))
+    assert report.imported == 1
+    user = User.query.filter_by(username='migrated').one()
+    assert user.hashed_password == encrypt_sm3('secret-pass', user.salt)
+    assert user.is_active is True and user.created_at is not None
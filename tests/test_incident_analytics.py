@@ -0,0 +1,93 @@
+# tests/test_incident_analytics.py
+from datetime import datetime, timedelta
+import pytest
+from models import db, EventType, Incident, IncidentStatus, IncidentStatusTransition
+from utils.incident_analytics import stage_duration_stats
+
+S = IncidentStatus
+T0 = datetime(2024, 3, 1, 8, 0, 0)
+# 事件: (事件类型, 等级, [(流转前状态, 流转后状态, 距创建的秒数)]), 均在 T0 创建
+HISTORIES = {
+    'A': (1, 1, [(S.DRAFT, S.SUBMITTED_DEPARTMENT_REVIEW, 60),
+                 (S.SUBMITTED_DEPARTMENT_REVIEW, S.DEPARTMENT_APPROVED, 660),
+                 (S.DEPARTMENT_APPROVED, S.PENDING_COMMAND_CENTER, 780)]),
+    'B': (1, 1, [(S.DRAFT, S.SUBMITTED_DEPARTMENT_REVIEW, 30),
+                 (S.SUBMITTED_DEPARTMENT_REVIEW, S.DEPARTMENT_APPROVED, 1830)]),  # 仍停留在 DEPARTMENT_APPROVED
+    'C': (1, 1, [(S.DRAFT, S.SUBMITTED_DEPARTMENT_REVIEW, 90)]),  # 仍停留在审核阶段
+    'D': (2, None, [(S.DRAFT, S.SUBMITTED_DEPARTMENT_REVIEW, 300),
+                    (S.SUBMITTED_DEPARTMENT_REVIEW, S.DEPARTMENT_REJECTED, 400)]),
+    'E': (1, 2, [(S.DRAFT, S.SUBMITTED_DEPARTMENT_REVIEW, 10)]),
+}
+
+@pytest.fixture
+def incidents(app):
+    db.session.add(EventType(type_name='跑道侵入', is_aviation=True))
+    ids = {}
+    for name, (event_type_id, level, history) in HISTORIES.items():
+        incident = Incident(incident_info=f'事件{name}', event_type_id=event_type_id, incident_level=level,
+                            submitted_by_user_id=5, status=history[-1][1], created_at=T0)
+        db.session.add(incident)
+        db.session.flush()
+        ids[name] = incident.incident_id
+        # 倒序插入, 验证按流转时间而不是插入顺序计算
+        for source, target, seconds in reversed(history):
+            db.session.add(IncidentStatusTransition(incident_id=incident.incident_id, from_status=source,
+                                                    to_status=target, actor_id=4,
+                                                    transitioned_at=T0 + timedelta(seconds=seconds)))
+    db.session.commit()
+    return ids
+
+def _group(stage, event_type_id, level, count, mean, p50, p90, p99):
+    return {'stage': stage.name, 'event_type_id': event_type_id, 'incident_level': level, 'count': count,
+            'mean': mean, 'p50': p50, 'p90': p90, 'p99': p99}
+
+def test_stage_duration_percentiles(incidents):
+    assert stage_duration_stats() == [
+        # DRAFT 1/1: A 60, B 30, C 90 (线性插值: p90 = 60 + 0.8 * 30)
+        _group(S.DRAFT, 1, 1, 3, 60.0, 60.0, 84.0, 89.4),
+        _group(S.DRAFT, 1, 2, 1, 10.0, 10.0, 10.0, 10.0),
+        _group(S.DRAFT, 2, None, 1, 300.0, 300.0, 300.0, 300.0),
+        # 审核阶段 1/1: A 600, B 1800; C 仍在审核中, 不计入
+        _group(S.SUBMITTED_DEPARTMENT_REVIEW, 1, 1, 2, 1200.0, 1200.0, 1680.0, 1788.0),
+        _group(S.SUBMITTED_DEPARTMENT_REVIEW, 2, None, 1, 100.0, 100.0, 100.0, 100.0),
+        # 部门已批准 1/1: A 120; B 仍停留在该阶段, 不计入
+        _group(S.DEPARTMENT_APPROVED, 1, 1, 1, 120.0, 120.0, 120.0, 120.0),
+    ]
+
+def test_window_uses_history_before_start(incidents):
+    # 只统计在窗口内结束的阶段, 阶段开始时间仍取窗口之前的上一次流转
+    stats = stage_duration_stats(start=T0 + timedelta(seconds=500), end=T0 + timedelta(seconds=2000))
+    assert stats == [
+        _group(S.SUBMITTED_DEPARTMENT_REVIEW, 1, 1, 2, 1200.0, 1200.0, 1680.0, 1788.0),
+        _group(S.DEPARTMENT_APPROVED, 1, 1, 1, 120.0, 120.0, 120.0, 120.0),
+    ]
+    assert [item['count'] for item in stage_duration_stats(end=T0 + timedelta(seconds=100))] == [3, 1]
+
+def test_filters(incidents):
+    assert [(item['stage'], item['count']) for item in stage_duration_stats(event_type_id=2)] == \
+        [(S.DRAFT.name, 1), (S.SUBMITTED_DEPARTMENT_REVIEW.name, 1)]
+    assert [item['incident_level'] for item in stage_duration_stats(incident_level=2)] == [2]
+    assert stage_duration_stats(event_type_id=99) == []
+
+def test_stage_durations_endpoint(client, auth_headers, incidents):
+    response = client.get('/incidents/analytics/stage-durations?from=2024-03-01T08:08:20&event_type_id=1',
+                          headers=auth_headers('center'))
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert body['percentiles'] == [50, 90, 99]
+    assert [(item['stage'], item['p50']) for item in body['stats']] == \
+        [(S.SUBMITTED_DEPARTMENT_REVIEW.name, 1200.0), (S.DEPARTMENT_APPROVED.name, 120.0)]
+    assert client.get('/incidents/analytics/stage-durations?from=bad', headers=auth_headers('center')) \
+        .status_code == 400
+    assert client.get('/incidents/analytics/stage-durations', headers=auth_headers('normal')).status_code == 403
+
+def test_history_endpoint(client, auth_headers, incidents):
+    response = client.get(f'/incidents/{incidents["A"]}/history', headers=auth_headers('normal'))
+    assert response.status_code == 200
+    assert [(item['from_status'], item['to_status'], item['actor_name'], item['transitioned_at'])
+            for item in response.get_json()] == [
+        (S.DRAFT.name, S.SUBMITTED_DEPARTMENT_REVIEW.name, 'dept', '2024-03-01T08:01:00'),
+        (S.SUBMITTED_DEPARTMENT_REVIEW.name, S.DEPARTMENT_APPROVED.name, 'dept', '2024-03-01T08:11:00'),
+        (S.DEPARTMENT_APPROVED.name, S.PENDING_COMMAND_CENTER.name, 'dept', '2024-03-01T08:13:00'),
+    ]
+    assert client.get('/incidents/9999/history', headers=auth_headers('normal')).status_code == 404
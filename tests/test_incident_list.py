@@ -0,0 +1,72 @@
+# tests/test_incident_list.py
+import threading
+import pytest
+from sqlalchemy import event
+from models import db, Department, Incident, IncidentStatus, incident_departments
+
+@pytest.fixture
+def incidents(app):
+    """两种事件状态、两个部门的 120 条事件"""
+    db.session.add_all([Department(department_name='机务'), Department(department_name='运控')])
+    db.session.flush()
+    for i in range(120):
+        incident = Incident(incident_info=f'事件{i}', event_type_id=1, submitted_by_user_id=5, incident_level=i % 3,
+                            status=IncidentStatus.SUBMITTED_DEPARTMENT_REVIEW if i % 2 else IncidentStatus.DRAFT)
+        db.session.add(incident)
+        db.session.flush()
+        db.session.execute(incident_departments.insert().values(incident_id=incident.incident_id,
+                                                                department_id=1 + i % 2))
+    db.session.commit()
+
+@pytest.fixture
+def request_statements(app):
+    """记录当前线程执行的 SQL 及参数"""
+    statements = []
+    ident = threading.get_ident()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == ident:
+            statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+def _list_query_plan(client, headers, statements, query_string):
+    """请求列表接口, 对其中的事件查询执行 EXPLAIN QUERY PLAN, 返回计划的各行描述"""
+    statements.clear()
+    response = client.get('/incidents?' + query_string, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    [(statement, parameters)] = [(s, p) for s, p in statements if 'FROM incidents' in s and 'ORDER BY' in s]
+    statements.clear()
+    plan = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    return [row[-1] for row in plan]
+
+@pytest.mark.parametrize('query_string, index', [
+    ('status=DRAFT', 'ix_incidents_status_id'),
+    ('status=DRAFT&event_type_id=1', 'ix_incidents_event_type_status_id'),
+    ('status=DRAFT&incident_level=1', 'ix_incidents_level_status_id'),
+    ('status=DRAFT&submitted_by=5', 'ix_incidents_submitter_status_id'),
+    ('department_id=2', 'ix_incident_departments_department'),
+    ('limit=10&cursor=', 'INTEGER PRIMARY KEY'),  # 无过滤条件: 从游标位置按主键倒序读取
+])
+def test_list_uses_index_for_filter_and_order(client, auth_headers, incidents, request_statements,
+                                              query_string, index):
+    headers = auth_headers('normal')
+    if query_string.endswith('cursor='):
+        query_string += client.get('/incidents?limit=10', headers=headers).headers['X-Next-Cursor']
+    plan = _list_query_plan(client, headers, request_statements, query_string)
+    assert not any('TEMP B-TREE' in detail for detail in plan), plan  # 排序直接由索引顺序完成
+    assert any(index in detail for detail in plan), plan
+
+def test_statement_count_does_not_depend_on_page_size(client, auth_headers, incidents, request_statements):
+    headers = auth_headers('normal')
+    client.get('/incidents?limit=1', headers=headers)  # 首个请求会加载并缓存当前用户, 不计入
+    counts = {}
+    for limit in (5, 50, 200):
+        request_statements.clear()
+        response = client.get(f'/incidents?limit={limit}&department_id=1', headers=headers)
+        assert response.status_code == 200
+        assert len(response.get_json()) == min(limit, 60)
+        counts[limit] = len(request_statements)
+    # 一页只执行一条查询, 与页大小无关 (没有逐行的关联查询)
+    assert counts == {5: 1, 50: 1, 200: 1}, counts
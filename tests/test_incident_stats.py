@@ -0,0 +1,109 @@
+# tests/test_incident_stats.py
+import io
+import pytest
+from models import db, EventType, Incident, IncidentStatus, IncidentStatCounter
+from utils import incident_workflow
+from utils.importer import run_import
+from utils.incident_stats import compute_stats, stored_stats, NO_LEVEL
+from utils.incident_workflow import run_transitions
+from utils.jwt_utils import load_principal
+from utils.serializers import dumps
+
+REVIEW, APPROVED = IncidentStatus.SUBMITTED_DEPARTMENT_REVIEW, IncidentStatus.DEPARTMENT_APPROVED
+
+@pytest.fixture
+def incidents(app):
+    """通过导入创建事件 (导入时同步写入计数): 两种事件类型、三种等级 (含未定级)"""
+    db.session.add(EventType(type_name='跑道侵入', is_aviation=True))
+    db.session.commit()
+    rows = [{'incident_info': f'事件{i}', 'event_type_id': 1 + i % 2, 'submitted_by_user_id': 5,
+             'status': REVIEW.name, 'incident_level': (None, 1, 2)[i % 3]} for i in range(12)]
+    report = run_import('incidents', io.BytesIO(b''.join(dumps(row) + b'\n' for row in rows)))
+    assert report.imported == 12
+    return {i.incident_id: i for i in Incident.query}
+
+def _bucket(incident, status):
+    level = NO_LEVEL if incident.incident_level is None else incident.incident_level
+    return status, level, incident.event_type_id
+
+def test_import_adds_one_count_per_incident(incidents):
+    stored = stored_stats()
+    assert stored == compute_stats()
+    assert sum(stored.values()) == 12
+    assert stored[(REVIEW, NO_LEVEL, 1)] == 2  # i = 0, 6
+    assert stored[(REVIEW, 1, 2)] == 2  # i = 1, 7
+
+def test_import_dry_run_leaves_counters_unchanged(incidents):
+    before = stored_stats()
+    row = {'incident_info': '试运行', 'event_type_id': 1, 'submitted_by_user_id': 5, 'status': REVIEW.name}
+    report = run_import('incidents', io.BytesIO(dumps(row) + b'\n'), dry_run=True)
+    assert report.imported == 0
+    assert stored_stats() == before
+
+def test_transition_moves_exactly_one_count(app, incidents):
+    before = stored_stats()
+    incident = next(iter(incidents.values()))
+    [result] = run_transitions(load_principal(4), 'department_approve', [incident.incident_id])
+    assert result.ok
+    after = stored_stats()
+    source, target = _bucket(incident, REVIEW), _bucket(incident, APPROVED)
+    assert after[source] == before[source] - 1
+    assert after[target] == before.get(target, 0) + 1
+    assert {k: v for k, v in after.items() if k not in (source, target)} == \
+        {k: v for k, v in before.items() if k not in (source, target)}
+    assert after == compute_stats()
+
+def test_batch_transition_moves_one_count_per_incident(client, auth_headers, incidents):
+    ids = sorted(incidents)[:5]
+    response = client.post('/incidents/transitions', headers=auth_headers('dept'),
+                           json={'transition': 'department_approve', 'incident_ids': ids + ids[:1]})
+    assert response.status_code == 200, response.get_json()
+    stored = stored_stats()
+    assert sum(n for (status, _, _), n in stored.items() if status == APPROVED) == 5
+    assert sum(stored.values()) == 12
+    assert stored == compute_stats()
+
+def test_failed_transition_rolls_back_counters(incidents, monkeypatch):
+    before = stored_stats()
+    incident_id = next(iter(incidents))
+
+    def fail(*args):
+        raise RuntimeError('写入流转记录失败')
+    monkeypatch.setattr(incident_workflow, '_log_transitions', fail)  # 计数已更新, 提交之前失败
+    with pytest.raises(RuntimeError):
+        run_transitions(load_principal(4), 'department_approve', [incident_id])
+    db.session.rollback()
+    assert stored_stats() == before
+    assert db.session.get(Incident, incident_id).status == REVIEW
+
+def test_stats_endpoint(client, auth_headers, incidents):
+    response = client.get('/incidents/stats?group_by=status,event_type_id', headers=auth_headers('normal'))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['total'] == 12
+    assert body['stats'] == [{'status': REVIEW.name, 'event_type_id': 1, 'count': 6},
+                             {'status': REVIEW.name, 'event_type_id': 2, 'count': 6}]
+    response = client.get('/incidents/stats?group_by=incident_level', headers=auth_headers('normal'))
+    assert {item['incident_level']: item['count'] for item in response.get_json()['stats']} == {None: 4, 1: 4, 2: 4}
+    assert client.get('/incidents/stats?group_by=submitted_by', headers=auth_headers('normal')).status_code == 400
+
+def test_reconcile_reports_and_fixes_drift(app, incidents):
+    table = IncidentStatCounter.__table__
+    db.session.execute(table.update().where(table.c.status == REVIEW, table.c.level_key == NO_LEVEL,
+                                            table.c.event_type_id == 1).values(incident_count=5))
+    db.session.execute(table.delete().where(table.c.status == REVIEW, table.c.level_key == 2,
+                                            table.c.event_type_id == 2))
+    db.session.commit()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['incident', 'reconcile-stats'])
+    assert result.exit_code == 0, result.output
+    assert f'{REVIEW.name} 等级=-1 类型=1: 计数表 5, 实际 2' in result.output
+    assert f'{REVIEW.name} 等级=2 类型=2: 计数表 0, 实际 2' in result.output
+    assert '共 2 项不一致' in result.output
+    assert stored_stats() != compute_stats()  # 不带 --fix 时只报告
+
+    result = runner.invoke(args=['incident', 'reconcile-stats', '--fix'])
+    assert '已修复 2 项不一致' in result.output
+    assert stored_stats() == compute_stats()
+    assert '一致' in runner.invoke(args=['incident', 'reconcile-stats']).output
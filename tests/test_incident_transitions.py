@@ -0,0 +1,86 @@
+# tests/test_incident_transitions.py
+import collections
+import threading
+import pytest
+from models import db, Incident, IncidentStatus, IncidentStatusTransition
+
+INCIDENTS = 20
+THREADS = 8
+
+@pytest.fixture
+def wal(app):
+    """并发写入使用 WAL 模式 (读写互不阻塞), 用例结束后切回默认模式"""
+    db.session.execute(db.text('PRAGMA journal_mode=WAL'))
+    yield
+    db.session.remove()
+    db.engine.dispose()  # 切回 DELETE 模式要求没有其他打开的连接
+    db.session.execute(db.text('PRAGMA journal_mode=DELETE'))
+
+def test_concurrent_approve_and_reject_have_one_winner(app, wal, auth_headers):
+    for i in range(INCIDENTS):
+        db.session.add(Incident(incident_info=f'事件{i}', event_type_id=1, submitted_by_user_id=5,
+                                status=IncidentStatus.SUBMITTED_DEPARTMENT_REVIEW))
+    db.session.commit()
+    incident_ids = [incident.incident_id for incident in Incident.query]
+    headers = auth_headers('dept')
+    results = collections.defaultdict(list)  # incident_id -> [(流转, 状态码)]
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+
+    def worker(action):
+        client = app.test_client()  # 每个线程的请求使用各自的应用上下文和数据库会话
+        barrier.wait()
+        for incident_id in incident_ids:
+            response = client.post(f'/incidents/{incident_id}/department-{action}', headers=headers,
+                                   json={'rejection_reason': '材料不全'})
+            with lock:
+                results[incident_id].append((action, response.status_code))
+
+    threads = [threading.Thread(target=worker, args=(('approve', 'reject')[i % 2],)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.session.expire_all()
+    transitions = collections.Counter(t.incident_id for t in IncidentStatusTransition.query)
+    for incident_id in incident_ids:
+        codes = [code for _, code in results[incident_id]]
+        assert len(codes) == THREADS
+        assert codes.count(200) == 1, results[incident_id]
+        assert codes.count(400) == THREADS - 1  # 其余请求看到的是已变更的状态
+        [winner] = [action for action, code in results[incident_id] if code == 200]
+        incident = db.session.get(Incident, incident_id)
+        assert incident.version == 2
+        assert incident.status == (IncidentStatus.DEPARTMENT_APPROVED if winner == 'approve'
+                                   else IncidentStatus.DEPARTMENT_REJECTED)
+        assert transitions[incident_id] == 1
+
+# 与原接口 (role_required + can_modify_incident) 的实际权限一致, 管理员 (admin) 始终可以执行
+PERMISSIONS = {
+    'department_approve': ('department-approve', IncidentStatus.SUBMITTED_DEPARTMENT_REVIEW, {'admin', 'dept'}),
+    'department_reject': ('department-reject', IncidentStatus.SUBMITTED_DEPARTMENT_REVIEW, {'admin', 'dept'}),
+    'command_center_submit': ('command-center-submit', IncidentStatus.DEPARTMENT_APPROVED, {'admin'}),
+    'command_center_resolve': ('command-center-resolve', IncidentStatus.PENDING_COMMAND_CENTER, {'admin', 'center'}),
+    'issue_emergency_team': ('issue-emergency-team', IncidentStatus.COMMAND_CENTER_PROCESSED, {'admin'}),
+    'resolve': ('resolve', IncidentStatus.ISSUED_EMERGENCY_TEAM, {'admin'}),
+    'close': ('close', IncidentStatus.RESOLVED, {'admin', 'leader'}),
+}
+PAYLOAD = {'rejection_reason': '材料不全', 'resolution_measures': '已处置'}
+
+@pytest.mark.parametrize('name', PERMISSIONS)
+@pytest.mark.parametrize('username', ['admin', 'leader', 'center', 'dept', 'normal'])
+def test_transition_permissions_match_original_routes(client, auth_headers, name, username):
+    path, source, allowed = PERMISSIONS[name]
+    incidents = [Incident(incident_info=name, event_type_id=1, submitted_by_user_id=5, status=source) for _ in range(2)]
+    db.session.add_all(incidents)
+    db.session.commit()
+    headers = auth_headers(username)
+    expected = 200 if username in allowed else 403
+    response = client.post(f'/incidents/{incidents[0].incident_id}/{path}', headers=headers, json=PAYLOAD)
+    assert response.status_code == expected, response.get_json()
+    response = client.post('/incidents/transitions', headers=headers,
+                           json={'transition': name, 'incident_ids': [incidents[1].incident_id], 'payload': PAYLOAD})
+    assert response.status_code == expected, response.get_json()
+    if expected == 200:
+        assert response.get_json()['succeeded'] == 1
@@ -0,0 +1,217 @@
+# tests/test_mail_dispatcher.py
+"""邮件异步投递: 使用本地 SMTP 桩服务器, 不依赖外部邮件服务"""
+import email
+import json
+import socketserver
+import threading
+import time
+import pytest
+from flask import Flask
+from flask_mail import Mail, Message
+from utils.email import MailDispatcher
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """
+    最小 SMTP 服务器
+    :param mail_failures: 前 N 个 MAIL FROM 返回 mail_code (451 为临时错误)
+    :param rcpt_code: RCPT TO 的响应码 (550 为永久错误)
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, mail_failures=0, mail_code=451, rcpt_code=250):
+        super().__init__(('127.0.0.1', 0), SMTPStubHandler)
+        self.mail_failures = mail_failures
+        self.mail_code = mail_code
+        self.rcpt_code = rcpt_code
+        self.lock = threading.Lock()
+        self.messages = []  # (发件人, [收件人], 正文)
+        self.connections = 0
+        self.mail_commands = 0
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        sender, recipients = None, []
+        self.reply('220 stub ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 stub')
+            elif verb == 'MAIL':
+                with server.lock:
+                    server.mail_commands += 1
+                    fail = server.mail_failures > 0
+                    server.mail_failures -= fail
+                if fail:
+                    self.reply(f'{server.mail_code} try again later')
+                else:
+                    sender, recipients = command.split(':', 1)[1].strip(), []
+                    self.reply('250 ok')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip())
+                self.reply(f'{server.rcpt_code} ' + ('ok' if server.rcpt_code < 400 else 'no such user'))
+            elif verb == 'DATA':
+                self.reply('354 end with .')
+                data = b''
+                while not data.endswith(b'\r\n.\r\n'):
+                    chunk = self.rfile.readline()
+                    if not chunk:
+                        return
+                    data += chunk
+                with server.lock:
+                    server.messages.append((sender, recipients, data))
+                self.reply('250 queued')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 ok')
+            elif verb == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('502 not implemented')
+
+@pytest.fixture
+def smtp_stub():
+    servers = []
+
+    def start(**kwargs):
+        server = SMTPStub(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def make_dispatcher(tmp_path):
+    """创建绑定到独立 Flask 应用的投递器, 用例结束时停止"""
+    dispatchers = []
+
+    def make(server, **config):
+        app = Flask(__name__)
+        app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=server.server_address[1], MAIL_USE_TLS=False,
+                          MAIL_DEFAULT_SENDER='noreply@example.com', MAIL_WORKERS=2, MAIL_RETRY_BACKOFF=0.01,
+                          MAIL_DEAD_LETTER_FILE=str(tmp_path / 'dead_letter.jsonl'), SECRET_KEY='test-secret-key')
+        app.config.update(config)
+        Mail(app)
+        dispatcher = MailDispatcher()
+        dispatcher.init_app(app)
+        dispatchers.append(dispatcher)
+        return app, dispatcher
+    yield make
+    for dispatcher in dispatchers:
+        dispatcher.shutdown(timeout=1)
+
+def _send(app, dispatcher, to, subject, body='正文'):
+    with app.app_context():
+        return dispatcher.dispatch(Message(subject, recipients=[to], body=body))
+
+def _dead_letters(dispatcher):
+    try:
+        with open(dispatcher.dead_letter_file, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+    except FileNotFoundError:
+        return []
+
+def _wait(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+def test_delivers_over_reused_connections(smtp_stub, make_dispatcher):
+    server = smtp_stub()
+    app, dispatcher = make_dispatcher(server)
+    for i in range(10):
+        assert _send(app, dispatcher, f'user{i}@example.com', f'通知 {i}')
+    assert _wait(lambda: dispatcher.stats()['sent'] == 10)
+    assert sorted(recipients[0] for _, recipients, _ in server.messages) == \
+        sorted(f'<user{i}@example.com>' for i in range(10))
+    assert server.connections <= dispatcher.workers  # 每个 worker 复用一个连接
+    assert _dead_letters(dispatcher) == []
+
+def test_temporary_failures_are_retried(smtp_stub, make_dispatcher):
+    server = smtp_stub(mail_failures=2)
+    app, dispatcher = make_dispatcher(server, MAIL_WORKERS=1, MAIL_MAX_RETRIES=3)
+    assert _send(app, dispatcher, 'user@example.com', '重试')
+    assert _wait(lambda: dispatcher.stats()['sent'] == 1)
+    stats = dispatcher.stats()
+    assert stats['retried'] == 2 and stats['dead_lettered'] == 0
+    assert len(server.messages) == 1
+
+def test_permanent_failure_goes_to_dead_letter(smtp_stub, make_dispatcher):
+    server = smtp_stub(rcpt_code=550)
+    app, dispatcher = make_dispatcher(server)
+    assert _send(app, dispatcher, 'nobody@example.com', '永久失败')
+    assert _wait(lambda: dispatcher.stats()['dead_lettered'] == 1)
+    [record] = _dead_letters(dispatcher)
+    assert record['to'] == ['nobody@example.com']
+    assert record['subject'] == '永久失败'
+    assert record['attempts'] == 1  # 永久错误不重试
+    assert 'SMTPRecipientsRefused' in record['error']
+    assert dispatcher.stats()['retried'] == 0
+
+def test_retries_exhausted_go_to_dead_letter(smtp_stub, make_dispatcher):
+    server = smtp_stub(mail_failures=100)
+    app, dispatcher = make_dispatcher(server, MAIL_WORKERS=1, MAIL_MAX_RETRIES=2)
+    assert _send(app, dispatcher, 'user@example.com', '重试耗尽')
+    assert _wait(lambda: dispatcher.stats()['dead_lettered'] == 1)
+    [record] = _dead_letters(dispatcher)
+    assert record['attempts'] == 3 and server.mail_commands == 3
+
+def test_shutdown_dead_letters_mail_waiting_for_retry(smtp_stub, make_dispatcher):
+    server = smtp_stub(mail_failures=100)
+    app, dispatcher = make_dispatcher(server, MAIL_WORKERS=1, MAIL_MAX_RETRIES=5, MAIL_RETRY_BACKOFF=60)
+    assert _send(app, dispatcher, 'user@example.com', '退避中')
+    assert _wait(lambda: dispatcher.stats()['retried'] == 1)  # worker 正在退避等待
+    threads = list(dispatcher._threads)
+    start = time.monotonic()
+    dispatcher.shutdown(timeout=2)
+    assert time.monotonic() - start < 2  # 退避等待被停止通知打断, 不等满 60 秒
+    assert not any(thread.is_alive() for thread in threads)
+    [record] = _dead_letters(dispatcher)
+    assert record['subject'] == '退避中' and record['attempts'] == 1
+
+def test_shutdown_dead_letters_undelivered_queue(smtp_stub, make_dispatcher):
+    server = smtp_stub(mail_failures=100)
+    app, dispatcher = make_dispatcher(server, MAIL_WORKERS=1, MAIL_MAX_RETRIES=5, MAIL_RETRY_BACKOFF=60)
+    for i in range(3):
+        assert _send(app, dispatcher, f'user{i}@example.com', f'排队 {i}')
+    assert _wait(lambda: dispatcher.stats()['retried'] == 1)
+    dispatcher.shutdown(timeout=0.5)  # 队列排不空, 超时后剩余邮件全部写入死信
+    assert sorted(record['subject'] for record in _dead_letters(dispatcher)) == ['排队 0', '排队 1', '排队 2']
+
+RESET_LINK = 'https://example.com/reset_password/eyJhbGciOiJIUzI1NiJ9.secret-reset-token'
+
+def test_dead_letter_body_is_encrypted(smtp_stub, make_dispatcher):
+    server = smtp_stub(rcpt_code=550)
+    app, dispatcher = make_dispatcher(server)
+    assert _send(app, dispatcher, 'nobody@example.com', '重置密码', f'点击链接重置密码: {RESET_LINK}')
+    assert _wait(lambda: dispatcher.stats()['dead_lettered'] == 1)
+    with open(dispatcher.dead_letter_file, encoding='utf-8') as f:
+        stored = f.read()
+    [record] = _dead_letters(dispatcher)
+    message = email.message_from_bytes(dispatcher.dead_letter_data(record))  # 解密得到可直接重投的 MIME 原文
+    assert RESET_LINK in message.get_payload(decode=True).decode('utf-8')
+    assert 'secret-reset-token' not in stored and message.get_payload() not in stored  # 明文和传输编码后的正文都不落盘
+    assert record['subject'] == '重置密码' and record['to'] == ['nobody@example.com']
+
+def test_dead_letter_without_secret_key_drops_body(smtp_stub, make_dispatcher):
+    server = smtp_stub(rcpt_code=550)
+    app, dispatcher = make_dispatcher(server, SECRET_KEY=None)
+    assert _send(app, dispatcher, 'nobody@example.com', '重置密码', RESET_LINK)
+    assert _wait(lambda: dispatcher.stats()['dead_lettered'] == 1)
+    [record] = _dead_letters(dispatcher)
+    assert record['data'] is None and dispatcher.dead_letter_data(record) is None
+    assert record['subject'] == '重置密码'
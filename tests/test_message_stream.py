@@ -0,0 +1,82 @@
+# tests/test_message_stream.py
+from datetime import datetime, timedelta, timezone
+import pytest
+from models import db, Message
+from routes.message import send_message
+from utils.pagination import encode_cursor, decode_cursor
+
+@pytest.fixture
+def sse_config(app):
+    """缩短心跳与连接时长, 让事件流在用例内自然结束"""
+    config = {key: app.config.get(key) for key in ('SSE_HEARTBEAT_INTERVAL', 'SSE_MAX_DURATION', 'SSE_BUFFER_SIZE')}
+    app.config.update(SSE_HEARTBEAT_INTERVAL=0.05, SSE_MAX_DURATION=0.2, SSE_BUFFER_SIZE=2)
+    yield app.config
+    app.config.update(config)
+
+def _events(body):
+    """解析事件流, 返回各 message 事件的 (id, data 原文)"""
+    events = []
+    for block in body.decode('utf-8').split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if ': ' in line and not line.startswith(':'))
+        if fields.get('event') == 'message':
+            events.append((fields['id'], fields['data']))
+    return events
+
+def _message_ids(events):
+    return [decode_cursor(event_id, (datetime, int))[1] for event_id, _ in events]
+
+def _send(n, content='通知'):
+    """leader (2) 给 normal (5) 发 n 条消息, 返回消息ID列表"""
+    return [send_message(2, 5, None, f'{content}{i}').message_id for i in range(n)]
+
+def test_resume_from_cursor(client, auth_headers, sse_config):
+    first, *rest = _send(3)
+    sent_at = db.session.get(Message, first).sent_at
+    response = client.get('/messages/stream', headers={**auth_headers('normal'),
+                                                       'Last-Event-ID': encode_cursor(sent_at, first)})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert _message_ids(_events(response.get_data())) == rest
+
+def test_resume_from_timezone_aware_cursor(client, auth_headers, sse_config):
+    first, *rest = _send(2)
+    sent_at = db.session.get(Message, first).sent_at.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=8)))
+    response = client.get('/messages/stream?cursor=' + encode_cursor(sent_at, first), headers=auth_headers('normal'))
+    assert response.status_code == 200
+    assert _message_ids(_events(response.get_data())) == rest
+
+def test_without_cursor_only_new_messages(client, auth_headers, sse_config):
+    _send(2)
+    response = client.get('/messages/stream', headers=auth_headers('normal'))
+    new = _send(1, '新消息')  # 连接建立后由本进程发出, 经进程内推送到达
+    assert _message_ids(_events(response.get_data())) == new
+
+def test_buffer_overflow_falls_back_to_catch_up(client, auth_headers, sse_config):
+    response = client.get('/messages/stream', headers=auth_headers('normal'))
+    # 缓冲区只有 2 条, 只保留最后两条消息; 若不从数据库补齐, 推送最新消息后游标越过前三条, 心跳补齐也找不回
+    sent = _send(5)
+    events = _events(response.get_data())
+    assert _message_ids(events) == sent
+    assert [data for _, data in events][-1].count('通知4') == 1
+
+def test_messages_from_other_workers_arrive_on_heartbeat(client, auth_headers, sse_config):
+    response = client.get('/messages/stream', headers=auth_headers('normal'))
+    # 直接写库而不经过进程内推送, 相当于另一个 worker 进程发出的消息
+    message = Message(sender_id=2, recipient_id=5, content='其他进程')
+    db.session.add(message)
+    db.session.commit()
+    assert _message_ids(_events(response.get_data())) == [message.message_id]
+
+@pytest.mark.parametrize('cursor', [
+    'not-a-cursor',
+    encode_cursor(1),
+    encode_cursor('2024-01-01', 1),
+    encode_cursor(datetime(2024, 1, 1), '1'),
+    encode_cursor(datetime(2024, 1, 1), True),
+    encode_cursor(datetime(2024, 1, 1), 1.5),
+    encode_cursor(1, 2),
+])
+def test_malformed_cursor_is_rejected(client, auth_headers, sse_config, cursor):
+    headers = auth_headers('normal')
+    assert client.get('/messages/stream', headers={**headers, 'Last-Event-ID': cursor}).status_code == 400
+    assert client.get('/messages?cursor=' + cursor, headers=headers).status_code == 400
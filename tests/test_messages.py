@@ -0,0 +1,67 @@
+# tests/test_messages.py
+import importlib
+import pytest
+from sqlalchemy import event
+from models import db, Message, User
+
+message_routes = importlib.import_module('routes.message')  # routes 包中的 message 属性是蓝图, 按模块名取模块
+
+@pytest.mark.parametrize('payload', [
+    {'content': '通知', 'recipient_ids': ['a']},
+    {'content': '通知', 'recipient_ids': 5},
+    {'content': '通知', 'recipient_ids': '5'},
+    {'content': '通知', 'recipient_ids': [1, True]},
+    {'content': '通知', 'recipient_ids': [1, None]},
+    {'content': '通知', 'role_level': '1'},
+    {'content': '通知', 'role_level': 1.5},
+    {'content': '通知', 'department_id': [1]},
+    {'content': '通知', 'role_level': 1, 'incident_id': 'x'},
+    {'content': '通知'},
+    {'recipient_ids': [2]},
+    ['not', 'an', 'object'],
+])
+def test_broadcast_rejects_invalid_payload(client, auth_headers, payload):
+    response = client.post('/messages/broadcast', json=payload, headers=auth_headers('leader'))
+    assert response.status_code == 400, response.get_json()
+    assert Message.query.count() == 0
+
+def test_broadcast_by_ids_and_role(client, auth_headers):
+    db.session.add(User(username='center2', email='center2@example.com', salt='-', hashed_password='-',
+                        role_level=1, is_active=False))
+    db.session.commit()
+    response = client.post('/messages/broadcast', headers=auth_headers('leader'),
+                           json={'content': '请审批', 'recipient_ids': [5, 5, 999], 'role_level': 1})
+    assert response.status_code == 201, response.get_json()
+    # center (role 1) 与 normal (id 5) 取并集; 不存在的用户和停用用户不发送
+    assert response.get_json()['recipient_count'] == 2
+    assert sorted(m.recipient_id for m in Message.query) == [3, 5]
+    response = client.get('/messages/unread-count', headers=auth_headers('center'))
+    assert response.get_json()['unread_count'] == 1
+
+def test_broadcast_requires_manager_role(client, auth_headers):
+    response = client.post('/messages/broadcast', json={'content': '通知', 'role_level': 1},
+                           headers=auth_headers('normal'))
+    assert response.status_code == 403
+
+def test_role_recipients_use_role_active_index(app):
+    db.session.add(User(username='center3', email='center3@example.com', salt='-', hashed_password='-', role_level=1))
+    db.session.commit()
+    assert User.query.filter_by(username='center3').one().is_active is True  # 未指定时为有效
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        assert message_routes.resolve_recipients(role_level=1) == [3, 6]
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    [(statement, parameters)] = statements
+    assert 'IS NULL' not in statement.upper()
+    plan = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    assert 'ix_users_role_level_is_active' in ' '.join(row[-1] for row in plan)
+
+def test_backfill_active_command(app):
+    result = app.test_cli_runner().invoke(args=['user', 'backfill-active'])
+    assert result.exit_code == 0, result.output
+    assert '已回填 0 个用户' in result.output
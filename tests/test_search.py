@@ -0,0 +1,49 @@
+# tests/test_search.py
+import pytest
+from utils.search import FTS5Index, MemoryIndex, tokenize
+
+DOCUMENTS = {
+    1: {'incident_info': '跑道发现鸟击痕迹'},
+    2: {'incident_info': '航班起飞时撞鸟', 'resolution_measures': '检查发动机'},
+    3: {'incident_info': '鸟', 'rejection_reason': '信息不全'},
+    4: {'incident_info': '行李传送带故障 CA1234'},
+}
+
+@pytest.fixture(params=['fts5', 'memory'])
+def index(request, tmp_path):
+    if request.param == 'fts5':
+        index = FTS5Index(str(tmp_path / 'search.db'))
+    else:
+        index = MemoryIndex(None)
+    index.add_many(DOCUMENTS.items())
+    return index
+
+def _ids(index, query):
+    total, hits = index.search(query)
+    assert total == len(hits)
+    return sorted(incident_id for incident_id, _ in hits)
+
+def test_tokenize():
+    assert tokenize('鸟击痕迹') == ['鸟击', '击痕', '痕迹', '迹']
+    assert tokenize('鸟击痕迹', query=True) == ['鸟击', '击痕', '痕迹']
+    assert tokenize('<p>CA1234 鸟</p>', query=True) == ['ca1234', '鸟']
+
+@pytest.mark.parametrize('query, expected', [
+    ('鸟', [1, 2, 3]),  # 单字: 词首 (鸟击)、段末 (撞鸟) 和单字段都能命中
+    ('击', [1]),
+    ('鸟击', [1]),
+    ('撞鸟', [2]),
+    ('鸟 发动机', [2]),
+    ('故障 ca1234', [4]),
+    ('发', [1, 2]),
+    ('鸡', []),
+    ('!!', []),
+])
+def test_search(index, query, expected):
+    assert _ids(index, query) == expected
+
+def test_single_character_query_follows_updates(index):
+    index.update(1, incident_info='跑道异物')
+    index.delete(3)
+    assert _ids(index, '鸟') == [2]
+    assert _ids(index, '物') == [1]
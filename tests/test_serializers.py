@@ -0,0 +1,105 @@
+# tests/test_serializers.py
+import importlib
+import json
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+import pytest
+from models import User
+from utils import serializers
+from utils.serializers import ModelSerializer, dumps, enum_name, isoformat, stream_json_array
+
+user_routes = importlib.import_module('routes.user')  # routes 包中的 user 属性是蓝图, 按模块名取模块
+
+Row = namedtuple('Row', ['row_id', 'name', 'level', 'created_at'])
+SERIALIZER = ModelSerializer('row_id', ('title', 'name'), ('level', enum_name('level')),
+                             ('created', isoformat('created_at')), ('length', lambda row: len(row.name)))
+
+@pytest.fixture(params=['orjson', 'json'])
+def backend(request, monkeypatch):
+    """分别在 orjson 和标准库 json 下运行"""
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(serializers, 'orjson', None)
+    return request.param
+
+def _rows(n):
+    return [Row(i, f'行{i}', None, datetime(2024, 1, 1) + timedelta(seconds=i)) for i in range(n)]
+
+def test_model_serializer_fields(app):
+    user = User.query.filter_by(username='normal').one()
+    row = Row(1, '鸟击', type('Level', (), {'name': 'HIGH'})(), None)
+    assert SERIALIZER.keys == ['row_id', 'title', 'level', 'created', 'length']
+    assert SERIALIZER.to_dict(row) == {'row_id': 1, 'title': '鸟击', 'level': 'HIGH', 'created': None, 'length': 2}
+    assert SERIALIZER.many([row, row]) == [SERIALIZER.to_dict(row)] * 2
+    # ORM 对象和只查询部分列的 Row 输出一致
+    serializer = ModelSerializer('user_id', 'username', 'role_level')
+    partial = User.query.with_entities(User.user_id, User.username, User.role_level) \
+        .filter_by(username='normal').one()
+    assert serializer.to_dict(user) == serializer.to_dict(partial) == \
+        {'user_id': 5, 'username': 'normal', 'role_level': 3}
+
+@pytest.mark.parametrize('value, expected', [
+    ({'名称': '鸟击', 'n': [1, 2.5, None, True]}, '{"名称":"鸟击","n":[1,2.5,null,true]}'),
+    (datetime(2024, 3, 1, 8, 0, 0), '"2024-03-01T08:00:00"'),
+    (datetime(2024, 3, 1, 8, 0, 0, 123456), '"2024-03-01T08:00:00.123456"'),
+    (datetime(2024, 3, 1, 8, 0, tzinfo=timezone(timedelta(hours=8))), '"2024-03-01T08:00:00+08:00"'),
+    (date(2024, 3, 1), '"2024-03-01"'),
+    (Decimal('12.3400'), '"12.3400"'),
+    ([Decimal('0.1'), Decimal('-1E+2')], '["0.1","-1E+2"]'),
+])
+def test_dumps_is_identical_across_backends(backend, value, expected):
+    assert dumps(value) == expected.encode('utf-8')
+    assert serializers.loads(dumps(value)) == json.loads(expected)
+
+def test_dumps_rejects_unknown_types(backend):
+    with pytest.raises(TypeError):
+        dumps({'value': object()})
+
+@pytest.mark.parametrize('n', [0, 1, 2, 3, 7, 9])
+def test_iter_json_across_chunk_boundaries(backend, n):
+    rows = _rows(n)
+    chunks = list(SERIALIZER.iter_json(iter(rows), chunk_size=3))
+    assert chunks[0] == b'[' and chunks[-1] == b']'
+    assert len(chunks) == 2 + (n + 2) // 3  # 每 3 条一块, 末尾不足一块的单独输出
+    assert json.loads(b''.join(chunks)) == json.loads(dumps(SERIALIZER.many(rows)))
+
+def test_stream_json_array_response(app, backend):
+    with app.test_request_context():
+        response = stream_json_array(SERIALIZER, iter(_rows(5)), chunk_size=2)
+        assert response.is_streamed
+        assert response.mimetype == 'application/json'
+        assert [item['row_id'] for item in json.loads(response.get_data())] == [0, 1, 2, 3, 4]
+
+def test_iter_json_error_leaves_array_unclosed(app, caplog):
+    def rows():
+        yield from _rows(5)
+        raise RuntimeError('数据库连接断开')
+    body = b''.join(SERIALIZER.iter_json(rows(), chunk_size=2))
+    assert body.startswith(b'[{"row_id":0,')
+    assert not body.endswith(b']')
+    with pytest.raises(ValueError):
+        json.loads(body)
+    assert json.loads(body.rsplit(b'\n', 1)[1]) == {'error': '数据读取失败, 响应不完整'}
+    assert '数据库连接断开' in caplog.text
+
+def test_users_stream(client, auth_headers):
+    response = client.get('/users', headers=auth_headers('admin'))
+    assert response.status_code == 200
+    assert [(u['user_id'], u['username']) for u in response.get_json()] == \
+        [(1, 'admin'), (2, 'leader'), (3, 'center'), (4, 'dept'), (5, 'normal')]
+
+def test_users_stream_failure_is_detectable(client, auth_headers, monkeypatch, caplog):
+    def username(row):
+        if row.user_id == 3:
+            raise RuntimeError('读取用户失败')
+        return row.username
+    monkeypatch.setattr(user_routes, 'USER_SERIALIZER', ModelSerializer('user_id', ('username', username)))
+    response = client.get('/users', headers=auth_headers('admin'))
+    assert response.status_code == 200  # 响应头已发出
+    body = response.get_data()
+    with pytest.raises(ValueError):
+        json.loads(body)
+    assert body.endswith(dumps({'error': '数据读取失败, 响应不完整'}))
+    assert '读取用户失败' in caplog.text
@@ -0,0 +1,241 @@
+# utils/audit.py
+"""
+审计日志异步批量写入 (write-behind)
+LoginAttempt、SystemLog 等审计记录先进入进程内有界队列, 由后台线程按数量或时间批量 executemany 写库,
+请求内不再同步提交; 进程退出时会把队列中剩余的记录全部写完
+整批写入失败 (如 SQLite 短暂锁表) 时等待 AUDIT_RETRY_DELAY 秒重试一次, 仍失败则逐行写入, 只丢弃写不进去的记录
+配置项:
+    AUDIT_SYNC             同步模式, 提交即写库 (测试时使用)
+    AUDIT_QUEUE_SIZE       队列容量
+    AUDIT_BATCH_SIZE       单批最大行数
+    AUDIT_FLUSH_INTERVAL   最长攒批时间 (秒)
+    AUDIT_ENQUEUE_TIMEOUT  队列满时最多等待的秒数, 超时则丢弃并计数
+    AUDIT_RETRY_DELAY      整批写入失败后重试前等待的秒数
+    AUDIT_LOG_OPERATIONS   是否把每个已认证请求记录到 system_logs
+"""
+import atexit
+import datetime
+import os
+import queue
+import threading
+import time
+from flask import g, request
+from models import db, LoginAttempt, SystemLog
+
+# system_logs.operation_type 取值
+OPERATION_TYPES = {'GET': 1, 'POST': 2, 'PUT': 3, 'PATCH': 3, 'DELETE': 4}
+# 停止时放入队列, 唤醒正在攒批等待的后台线程
+_STOP = object()
+
+class AuditWriter:
+    """审计记录写入器, 通过 init_app 绑定 Flask 应用"""
+    def __init__(self):
+        self.app = None
+        self.synchronous = False
+        self.batch_size = 500
+        self.flush_interval = 1.0
+        self.enqueue_timeout = 0.05
+        self.retry_delay = 0.1
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'retried': 0,
+                       'batches': 0, 'blocked': 0, 'high_watermark': 0}
+
+    def init_app(self, app):
+        config = app.config
+        self.app = app
+        self.synchronous = config.get('AUDIT_SYNC', False)
+        self.batch_size = config.get('AUDIT_BATCH_SIZE', 500)
+        self.flush_interval = config.get('AUDIT_FLUSH_INTERVAL', 1.0)
+        self.enqueue_timeout = config.get('AUDIT_ENQUEUE_TIMEOUT', 0.05)
+        self.retry_delay = config.get('AUDIT_RETRY_DELAY', 0.1)
+        self._queue = queue.Queue(maxsize=config.get('AUDIT_QUEUE_SIZE', 10000))
+        if config.get('AUDIT_LOG_OPERATIONS', False):
+            app.after_request(self._log_operation)
+        if not self._atexit_registered:  # 多次 init_app 时只注册一次
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def submit(self, table, row):
+        """
+        提交一条审计记录
+        :param table: 目标表 (如 LoginAttempt.__table__)
+        :param row: 列名 -> 值 的字典
+        :return: 是否已接收 (队列满且等待超时时返回 False)
+        """
+        if self.synchronous:
+            self._write([(table, row)])
+            return True
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((table, row))
+        except queue.Full:
+            self._count('blocked')
+            try:
+                self._queue.put((table, row), timeout=self.enqueue_timeout)
+            except queue.Full:
+                self._count('dropped')
+                return False
+        self._count('enqueued')
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            if depth > self._stats['high_watermark']:
+                self._stats['high_watermark'] = depth
+        return True
+
+    def _ensure_worker(self):
+        # 后台线程按进程懒启动, 兼容 gunicorn 预加载后 fork 出的 worker
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._stopping.clear()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def _collect(self):
+        """攒批: 满 batch_size 条、距第一条超过 flush_interval 秒或收到停止通知即返回"""
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        if item is _STOP:
+            return []
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                break
+            batch.append(item)
+        return batch
+
+    def _insert(self, grouped):
+        """按表分组写入, 每张表一次 executemany, 整批一个事务"""
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                for table, rows in grouped.items():
+                    conn.execute(table.insert(), rows)
+
+    def _write(self, batch):
+        grouped = {}
+        for table, row in batch:
+            grouped.setdefault(table, []).append(row)
+        for attempt in range(2):
+            try:
+                self._insert(grouped)
+            except Exception as e:
+                error = e
+                if attempt == 0:
+                    self._count('retried')
+                    time.sleep(self.retry_delay)
+                continue
+            self._count('written', len(batch))
+            self._count('batches')
+            return
+        # 重试仍失败: 逐行写入, 只丢弃本身无法写入的记录
+        self.app.logger.warning(f"审计记录批量写入失败 ({len(batch)} 条), 改为逐行写入: {error}")
+        failed = 0
+        for table, row in batch:
+            try:
+                self._insert({table: [row]})
+            except Exception as e:
+                failed += 1
+                self.app.logger.error(f"审计记录写入失败, 已丢弃: {e}")
+        self._count('written', len(batch) - failed)
+        self._count('failed', failed)
+
+    def flush(self):
+        """同步写出队列中现有的全部记录"""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def shutdown(self, timeout=5):
+        """停止后台线程并写出剩余记录 (进程退出时自动调用)"""
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and self._pid == os.getpid():
+            try:
+                self._queue.put_nowait(_STOP)  # 后台线程正在攒批时立即写出, 不等满 flush_interval
+            except queue.Full:
+                pass  # 队列已满时后台线程不会阻塞在等待上
+            thread.join(timeout)
+        if self.app is not None:
+            self.flush()
+
+    def stats(self):
+        """返回队列深度、丢弃数、写入数等背压指标"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_capacity'] = self._queue.maxsize
+        return stats
+
+    def _log_operation(self, response):
+        """after_request 钩子: 把已认证请求记录为系统日志"""
+        ctx = g.get('auth_context')
+        if ctx is not None and ctx.ok:
+            record_operation(
+                operator_id=ctx.current_user.user_id,
+                operation_type=OPERATION_TYPES.get(request.method, 0),
+                operation_content=f'{request.method} {request.path}',
+                operation_result=1 if response.status_code < 400 else 0,
+                ip_address=request.remote_addr or '',
+            )
+        return response
+
+audit_writer = AuditWriter()
+
+def record_login_attempt(user_id, ip_address, success):
+    """异步记录登录尝试"""
+    return audit_writer.submit(LoginAttempt.__table__, {
+        'user_id': user_id,
+        'success': success,
+        'ip_address': ip_address,
+        'attempt_time': datetime.datetime.utcnow(),
+    })
+
+def record_operation(operator_id, operation_type, operation_content, operation_result, ip_address):
+    """异步记录系统操作日志"""
+    return audit_writer.submit(SystemLog.__table__, {
+        'operator_id': operator_id,
+        'operation_type': operation_type,
+        'operation_content': operation_content,
+        'operation_result': operation_result,
+        'ip_address': ip_address,
+        'operation_time': datetime.datetime.utcnow(),
+    })
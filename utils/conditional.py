@@ -0,0 +1,44 @@
+# utils/conditional.py
+"""
+条件请求 (HTTP 304)
+详情接口先只查询行版本号或修改时间生成强 ETag, 客户端缓存仍有效时直接返回 304,
+不再加载整行、序列化或解密。
+    etag = make_etag('incident', incident_id, version)
+    if is_not_modified(etag):
+        return not_modified(etag)
+    ...
+    return set_validators(jsonify(data), etag), 200
+"""
+from datetime import datetime, timezone
+from flask import current_app, request
+
+def make_etag(*parts):
+    """由资源类型、主键和版本号/修改时间拼接强 ETag"""
+    return '-'.join(part.strftime('%Y%m%d%H%M%S%f') if isinstance(part, datetime) else str(part) for part in parts)
+
+def _http_date(value):
+    """HTTP 日期只精确到秒, 数据库中的时间视为 UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+def is_not_modified(etag, last_modified=None):
+    """
+    判断客户端缓存是否仍然有效
+    同时携带 If-None-Match 和 If-Modified-Since 时只看前者 (RFC 7232)
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return _http_date(last_modified) <= request.if_modified_since
+    return False
+
+def set_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _http_date(last_modified)
+    response.headers['Cache-Control'] = 'private, no-cache'  # 需要登录, 客户端每次重新验证
+    return response
+
+def not_modified(etag, last_modified=None):
+    return set_validators(current_app.response_class(status=304), etag, last_modified)
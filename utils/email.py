@@ -1,19 +1,265 @@
 # utils/email.py
-from flask_mail import Mail, Message
+"""
+邮件异步发送
+send_email 只负责在请求内组装邮件并放入队列, 由后台 worker 线程负责投递:
+    * 每个 worker 复用一个 SMTP 连接, 空闲超过 MAIL_IDLE_TIMEOUT 秒后关闭
+    * 临时性错误 (连接断开、4xx 响应等) 按指数退避重试 MAIL_MAX_RETRIES 次
+    * 永久性错误 (5xx 响应、收件人被拒等) 或重试耗尽的邮件写入死信文件 MAIL_DEAD_LETTER_FILE
+    * 进程退出时等待 worker 完成当前投递, 超时仍未发出的邮件 (含退避等待中的重试) 同样写入死信
+死信文件只明文保存信封信息 (发件人、收件人、主题、错误); 正文可能含密码重置链接等凭据,
+以 SM4 加密保存 (密钥由 SECRET_KEY 派生), 需要重投时用 dead_letter_data() 解密; 未配置 SECRET_KEY 时不保存正文
+"""
+import atexit
+import datetime
+import hashlib
+import json
+import os
+import queue
+import smtplib
+import threading
+import time
 from flask import current_app
+from flask_mail import Mail, Message, Connection, email_dispatched, sanitize_address, sanitize_addresses
+from utils.sm_utils import encrypt_sm4, decrypt_sm4
+
+class PermanentMailError(Exception):
+    """不应重试的投递错误"""
+
+def _is_permanent(error):
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPAuthenticationError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+class MailDispatcher:
+    """邮件投递器, 通过 init_app 绑定 Flask 应用"""
+    def __init__(self):
+        self.app = None
+        self.workers = 2
+        self.max_retries = 3
+        self.retry_backoff = 2.0
+        self.idle_timeout = 30
+        self.dead_letter_file = None
+        self._queue = queue.Queue(maxsize=1000)
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._in_flight = {}  # worker 线程 ident -> 正在投递的邮件
+        self._in_flight_lock = threading.Lock()
+        self._dead_letter_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {'queued': 0, 'sent': 0, 'retried': 0, 'dead_lettered': 0, 'rejected': 0}
+
+    def init_app(self, app):
+        config = app.config
+        self.app = app
+        self.workers = config.get('MAIL_WORKERS', 2)
+        self.max_retries = config.get('MAIL_MAX_RETRIES', 3)
+        self.retry_backoff = config.get('MAIL_RETRY_BACKOFF', 2.0)
+        self.idle_timeout = config.get('MAIL_IDLE_TIMEOUT', 30)
+        self.dead_letter_file = config.get('MAIL_DEAD_LETTER_FILE') or \
+            os.path.join(app.instance_path, 'mail_dead_letter.jsonl')
+        self._queue = queue.Queue(maxsize=config.get('MAIL_QUEUE_SIZE', 1000))
+        atexit.register(self.shutdown)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+    def dispatch(self, msg):
+        """
+        放入投递队列 (需在应用上下文中调用, 邮件内容在此处序列化)
+        :return: 是否已接收
+        """
+        state = current_app.extensions.get('mail') or Mail(current_app).state
+        assert msg.send_to, "No recipients have been added"
+        if msg.date is None:
+            msg.date = time.time()
+        if state.suppress:
+            # 测试模式: 不实际投递, 仍然发出 email_dispatched 信号, 兼容 mail.record_messages()
+            email_dispatched.send(msg, app=current_app._get_current_object())
+            return True
+        envelope = {
+            'from': sanitize_address(msg.sender),
+            'to': list(sanitize_addresses(msg.send_to)),
+            'subject': msg.subject,
+            'data': msg.as_bytes(),
+            'mail_options': msg.mail_options,
+            'rcpt_options': msg.rcpt_options,
+            'attempts': 0,
+        }
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait(envelope)
+        except queue.Full:
+            self._count('rejected')
+            current_app.logger.error(f"邮件队列已满, 邮件未发送: {msg.subject}")
+            return False
+        self._count('queued')
+        return True
+
+    def _ensure_workers(self):
+        # worker 线程按进程懒启动, 兼容 gunicorn 预加载后 fork 出的 worker
+        if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._threads = []
+                self._pid = os.getpid()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            self._stopping.clear()
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f'mail-worker-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        with self.app.app_context():
+            state = self.app.extensions['mail']
+            host = None
+            while not self._stopping.is_set():
+                try:
+                    envelope = self._queue.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    host = self._close(host)  # 空闲过久, 主动释放连接
+                    continue
+                if envelope is None:  # shutdown 放入的唤醒标记
+                    break
+                with self._in_flight_lock:
+                    self._in_flight[threading.get_ident()] = envelope
+                host = self._deliver(state, host, envelope)
+            self._close(host)
+
+    def _claim(self):
+        """取回本线程正在投递的邮件; 已被 shutdown 写入死信时返回 None"""
+        with self._in_flight_lock:
+            return self._in_flight.pop(threading.get_ident(), None)
+
+    def _deliver(self, state, host, envelope):
+        """投递一封邮件, 返回 (可能重建后的) 连接"""
+        while True:
+            envelope['attempts'] += 1
+            try:
+                if host is None:
+                    host = Connection(state).configure_host()
+                host.sendmail(envelope['from'], envelope['to'], envelope['data'],
+                              envelope['mail_options'], envelope['rcpt_options'])
+                self._claim()
+                self._count('sent')
+                return host
+            except Exception as e:
+                host = self._close(host)
+                if _is_permanent(e) or envelope['attempts'] > self.max_retries:
+                    if self._claim() is not None:
+                        self._dead_letter(envelope, e)
+                    return host
+                self._count('retried')
+                # 退避期间收到停止通知则不再重试, 直接写入死信
+                if self._stopping.wait(self.retry_backoff * 2 ** (envelope['attempts'] - 1)):
+                    if self._claim() is not None:
+                        self._dead_letter(envelope, e)
+                    return host
+
+    @staticmethod
+    def _close(host):
+        if host is not None:
+            try:
+                host.quit()
+            except Exception:
+                pass
+        return None
+
+    def _dead_letter_key(self):
+        """死信正文的 SM4 密钥, 未配置 SECRET_KEY 时返回 None"""
+        secret = self.app.config.get('SECRET_KEY')
+        if not secret:
+            return None
+        return hashlib.md5(f'mail-dead-letter:{secret}'.encode('utf-8')).hexdigest()[:16]
+
+    def dead_letter_data(self, record):
+        """解密死信记录中的邮件原文 (MIME 字节串), 用于重投; 未保存正文时返回 None"""
+        key = self._dead_letter_key()
+        if key is None or not record.get('data'):
+            return None
+        return decrypt_sm4(key, record['data'], record['iv']).encode('latin-1')
+
+    def _dead_letter(self, envelope, error):
+        """投递失败的邮件追加写入死信文件, 便于人工排查或重投"""
+        self._count('dead_lettered')
+        self.app.logger.error(f"邮件发送失败, 已写入死信: {envelope['subject']} -> {envelope['to']}: {error}")
+        record = {
+            'failed_at': datetime.datetime.utcnow().isoformat(),
+            'from': envelope['from'],
+            'to': envelope['to'],
+            'subject': envelope['subject'],
+            'attempts': envelope['attempts'],
+            'error': repr(error),
+            'data': None,
+            'iv': None,
+        }
+        key = self._dead_letter_key()
+        if key is not None:
+            # 正文可能含密码重置令牌等凭据, 不以明文落盘; latin-1 保证任意字节都能原样还原
+            record['iv'] = os.urandom(8).hex()
+            record['data'] = encrypt_sm4(key, envelope['data'].decode('latin-1'), record['iv'])
+        with self._dead_letter_lock:
+            os.makedirs(os.path.dirname(self.dead_letter_file) or '.', exist_ok=True)
+            with open(self.dead_letter_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def shutdown(self, timeout=10):
+        """
+        停止 worker (进程退出时自动调用)
+        先等待队列排空, 再通知 worker 退出并等待其完成当前投递, 总共最多等待 timeout 秒;
+        仍在投递中或仍在队列中的邮件写入死信, 不随进程退出丢失
+        """
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stopping.set()
+        for _ in self._threads:  # 唤醒阻塞在 queue.get 上的空闲 worker
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0.1))
+        with self._in_flight_lock:
+            pending, self._in_flight = list(self._in_flight.values()), {}
+        while True:
+            try:
+                envelope = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if envelope is not None:
+                pending.append(envelope)
+        for envelope in pending:
+            self._dead_letter(envelope, RuntimeError('进程退出时邮件仍未投递'))
+        self._threads = [t for t in self._threads if t.is_alive()]
+
+mail_dispatcher = MailDispatcher()
 
 def send_email(to, subject, body):
     """
-    发送邮件
+    发送邮件 (异步, 立即返回)
     :param to: 收件人邮箱地址
     :param subject: 邮件主题
     :param body: 邮件正文 (可以是 HTML)
+    :return: 是否已放入发送队列
     """
-    mail = Mail(current_app)
     msg = Message(subject, recipients=[to], html=body)
     try:
-        mail.send(msg)
-        return True  # 发送成功
+        return mail_dispatcher.dispatch(msg)
     except Exception as e:
-        print(f"邮件发送失败: {e}")  # 记录错误日志
+        current_app.logger.error(f"邮件发送失败: {e}")  # 记录错误日志
         return False  # 发送失败
@@ -0,0 +1,69 @@
+# utils/event_type_catalog.py
+"""
+事件类型目录缓存
+事件类型极少变更, 每个进程在内存中保存一份完整目录 (含序列化好的 JSON 和 ETag):
+    * 列表接口直接返回缓存的响应体, If-None-Match 命中时返回 304, 不访问数据库
+    * 事件校验时按 ID 查询类型也从同一份目录读取
+    * 本进程内的增删改调用 invalidate() 使版本号递增, 下次读取时重新加载;
+      其他进程最多在 EVENT_TYPE_CACHE_TTL 秒后重新加载
+ETag 由目录内容计算, 多个进程加载到相同数据时 ETag 一致
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from models import db, EventType
+
+CatalogSnapshot = namedtuple('CatalogSnapshot', ['version', 'etag', 'body', 'by_id'])
+
+class EventTypeCatalog:
+    def __init__(self, timer=time.monotonic):
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._version = 0  # 每次失效递增
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self.loads = 0
+
+    def _ttl(self):
+        return current_app.config.get('EVENT_TYPE_CACHE_TTL', 300)
+
+    def _load(self, version):
+        rows = db.session.query(EventType.type_id, EventType.type_name, EventType.is_aviation) \
+            .order_by(EventType.type_id).all()
+        items = [{'type_id': row.type_id, 'type_name': row.type_name, 'is_aviation': row.is_aviation} for row in rows]
+        body = json.dumps(items, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.loads += 1
+        return CatalogSnapshot(version, hashlib.sha1(body).hexdigest(), body,
+                               {item['type_id']: item for item in items})
+
+    def snapshot(self):
+        """返回当前目录, 已失效或超过 TTL 时重新加载"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._version \
+                and self._timer() - self._loaded_at < self._ttl():
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != self._version \
+                    or self._timer() - self._loaded_at >= self._ttl():
+                snapshot = self._load(self._version)
+                self._snapshot, self._loaded_at = snapshot, self._timer()
+            return snapshot
+
+    def get(self, type_id):
+        """按 ID 查询事件类型, 不存在时返回 None"""
+        return self.snapshot().by_id.get(type_id)
+
+    def invalidate(self):
+        """事件类型变更 (提交后) 调用"""
+        with self._lock:
+            self._version += 1
+
+    @property
+    def version(self):
+        return self._version
+
+event_type_catalog = EventTypeCatalog()
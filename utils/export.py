@@ -0,0 +1,148 @@
+# utils/export.py
+"""
+批量导出
+按主键顺序流式读取 (yield_per, MySQL 下为服务端游标), 逐块转换为 NDJSON 或 CSV, 可选 gzip 压缩。
+内存中只保留一块数据, 与总行数无关; 事件总结的密文按块批量解密。
+接口见 routes/export.py, 命令行: flask export dump incidents --format csv --gzip -o incidents.csv.gz
+运行 python -m utils.export --rows 1000000 可进行导出基准测试
+"""
+import csv
+import io
+import zlib
+from collections import namedtuple
+from datetime import datetime
+from models import db, Incident, Summary, SecurityCheck
+from models.summary import StringEncoded
+from utils.serializers import dumps
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+# 每块读取和编码的行数
+EXPORT_CHUNK_SIZE = 2000
+
+# name: 数据集名称; key: 排序主键; columns: 导出列; time_column: 按时间范围过滤的列 (None 表示不支持)
+# encrypted: 需要批量解密的加密列
+Dataset = namedtuple('Dataset', ['name', 'model', 'key', 'columns', 'time_column', 'encrypted'])
+
+DATASETS = {d.name: d for d in (
+    Dataset('incidents', Incident, 'incident_id', (
+        'incident_id', 'incident_info', 'process_status', 'response_log', 'incident_level', 'is_aviation',
+        'event_type_id', 'attachment_url', 'submitted_by_user_id', 'status', 'rejection_reason',
+        'resolution_measures', 'created_at', 'resolved_at', 'closed_at',
+    ), 'created_at', ()),
+    Dataset('summaries', Summary, 'summary_id', (
+        'summary_id', 'incident_id', 'user_id', 'event_type', 'security_level', 'summary_status',
+        'created_at', 'updated_at', 'content',
+    ), 'created_at', ('content',)),
+    Dataset('security-checks', SecurityCheck, 'check_id', (
+        'check_id', 'check_record', 'issue_tracking', 'improvement_status', 'evaluation_report', 'updated_at',
+    ), None, ()),
+)}
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+def iter_chunks(dataset, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """按主键顺序逐块读取, 每块为一个列表, 每行是与 dataset.columns 顺序一致的值列表"""
+    table = dataset.model.__table__
+    columns = []
+    for name in dataset.columns:
+        column = table.c[name]
+        if name in dataset.encrypted:  # 按密文读取 (不经过逐行解密), 每块读完后批量解密
+            column = db.type_coerce(column, StringEncoded()).label(name)
+        elif isinstance(column.type, db.Enum):  # 数据库中存的就是枚举名称, 直接按字符串读取
+            column = db.type_coerce(column, db.String).label(name)
+        columns.append(column)
+    timestamps = [index for index, name in enumerate(dataset.columns) if isinstance(table.c[name].type, db.DateTime)]
+    query = db.select(*columns).order_by(table.c[dataset.key])
+    if start is not None:
+        query = query.where(table.c[dataset.time_column] >= start)
+    if end is not None:
+        query = query.where(table.c[dataset.time_column] < end)
+    result = db.session.execute(query.execution_options(yield_per=chunk_size))
+    decrypt = {index: table.c[name].type.decrypt_many for index, name in enumerate(dataset.columns)
+               if name in dataset.encrypted}
+    for partition in result.partitions():
+        rows = [list(row) for row in partition]
+        for index in timestamps:
+            for row in rows:
+                row[index] = _isoformat(row[index])
+        for index, decrypt_many in decrypt.items():
+            for row, plaintext in zip(rows, decrypt_many([row[index] for row in rows])):
+                row[index] = plaintext
+        yield rows
+
+def iter_ndjson(dataset, chunks):
+    for rows in chunks:
+        yield b''.join(dumps(dict(zip(dataset.columns, row))) + b'\n' for row in rows)
+
+def iter_csv(dataset, chunks):
+    """首行为列名; 带 UTF-8 BOM 以便 Excel 正确识别中文"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('﻿')
+    writer.writerow(dataset.columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # 没有数据时仍输出表头
+        yield buffer.getvalue().encode('utf-8')
+
+def iter_gzip(parts, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip 格式
+    for part in parts:
+        data = compressor.compress(part)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_stream(name, fmt='ndjson', compress=False, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """返回导出内容的字节块生成器"""
+    dataset = DATASETS[name]
+    chunks = iter_chunks(dataset, start, end, chunk_size)
+    parts = iter_csv(dataset, chunks) if fmt == 'csv' else iter_ndjson(dataset, chunks)
+    return iter_gzip(parts) if compress else parts
+
+def export_filename(name, fmt, compress):
+    return f"{name}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{fmt}" + ('.gz' if compress else '')
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import resource
+    import tempfile
+    import time
+    from flask import Flask
+
+    parser = argparse.ArgumentParser(description='批量导出基准测试 (SQLite)')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+    parser.add_argument('--gzip', action='store_true')
+    options = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'export.db')
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        now = datetime.utcnow()
+        rows = ({'incident_id': i, 'incident_info': f'跑道鸟击事件 {i}, 航班延误', 'event_type_id': 1,
+                 'submitted_by_user_id': 1, 'status': 'RESOLVED', 'incident_level': i % 4, 'is_aviation': True,
+                 'created_at': now, 'version': 1} for i in range(1, options.rows + 1))
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == 50000:
+                db.session.execute(Incident.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(Incident.__table__.insert(), batch)
+        db.session.commit()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        size = sum(len(part) for part in export_stream('incidents', options.format, options.gzip))
+        elapsed = time.perf_counter() - start
+        print(f'{options.rows} 行 {options.format}{" gzip" if options.gzip else ""}: {elapsed:.2f}s, '
+              f'{options.rows / elapsed:,.0f} 行/秒, {size / 1024 / 1024:.1f} MiB, '
+              f'峰值内存 {rss_before / 1024:.0f} -> {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB')
@@ -0,0 +1,113 @@
+# utils/incident_stats.py
+"""
+事件统计计数
+incident_stat_counters 按 (状态, 等级, 事件类型) 保存事件数, 状态流转时在同一事务内增减,
+看板查询只需汇总这张小表, 不必对 incidents 全表 GROUP BY。
+计数可能因直接改库等原因漂移, 可用 flask incident reconcile-stats 与 incidents 表对账并修复。
+"""
+from collections import Counter
+from models import db, Incident, IncidentStatCounter
+
+NO_LEVEL = -1  # 未定级事件的 level_key
+# 每条 IN 查询的最大事件ID数
+CHUNK_SIZE = 500
+# 可用于分组的维度: 参数名 -> 计数表的列
+STAT_DIMENSIONS = {
+    'status': IncidentStatCounter.status,
+    'incident_level': IncidentStatCounter.level_key,
+    'event_type_id': IncidentStatCounter.event_type_id,
+}
+
+def level_key(level):
+    return NO_LEVEL if level is None else level
+
+def apply_stat_deltas(deltas):
+    """
+    在当前事务中增减计数, 计数行不存在时自动创建
+    :param deltas: (status, level_key, event_type_id) -> 增减量
+    """
+    rows = [{'status': status, 'level_key': level, 'event_type_id': event_type_id, 'incident_count': n}
+            for (status, level, event_type_id), n in deltas.items() if n]
+    if not rows:
+        return
+    table = IncidentStatCounter.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update(incident_count=table.c.incident_count + stmt.inserted.incident_count)
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=['status', 'level_key', 'event_type_id'],
+                                          set_={'incident_count': table.c.incident_count + stmt.excluded.incident_count})
+    else:
+        # 其他数据库: 先更新已有计数行, 再插入缺失的行
+        missing = []
+        for row in rows:
+            updated = db.session.execute(
+                table.update().where(table.c.status == row['status'], table.c.level_key == row['level_key'],
+                                     table.c.event_type_id == row['event_type_id'])
+                .values(incident_count=table.c.incident_count + row['incident_count'])).rowcount
+            if not updated:
+                missing.append(row)
+        rows = missing
+        stmt = table.insert()
+    if rows:
+        db.session.execute(stmt, rows)
+
+def record_transitions(incident_ids, source, target):
+    """事件从 source 流转到 target 后调用 (与流转在同一事务), 按事件的等级和类型移动计数"""
+    deltas = Counter()
+    for start in range(0, len(incident_ids), CHUNK_SIZE):
+        chunk = incident_ids[start:start + CHUNK_SIZE]
+        for level, event_type_id in db.session.execute(
+                db.select(Incident.incident_level, Incident.event_type_id).where(Incident.incident_id.in_(chunk))):
+            key = (level_key(level), event_type_id)
+            deltas[(source,) + key] -= 1
+            deltas[(target,) + key] += 1
+    apply_stat_deltas(deltas)
+
+def compute_stats():
+    """直接从 incidents 表统计, 返回 (status, level_key, event_type_id) -> 事件数"""
+    query = db.select(Incident.status, Incident.incident_level, Incident.event_type_id, db.func.count()) \
+        .where(Incident.status.isnot(None)).group_by(Incident.status, Incident.incident_level, Incident.event_type_id)
+    return {(status, level_key(level), event_type_id): n
+            for status, level, event_type_id, n in db.session.execute(query)}
+
+def stored_stats():
+    return {(row.status, row.level_key, row.event_type_id): row.incident_count
+            for row in db.session.execute(db.select(IncidentStatCounter)).scalars() if row.incident_count}
+
+def reconcile_stats(fix=False):
+    """
+    对比计数表与 incidents 表的实际统计, 返回不一致的 [(key, 计数表中的值, 实际值)]
+    fix=True 时用实际统计覆盖计数表
+    """
+    actual = compute_stats()
+    stored = stored_stats()
+    drift = [(key, stored.get(key, 0), actual.get(key, 0))
+             for key in sorted(set(actual) | set(stored), key=lambda k: (k[0].value, k[1], k[2]))
+             if stored.get(key, 0) != actual.get(key, 0)]
+    if fix and drift:
+        table = IncidentStatCounter.__table__
+        db.session.execute(table.delete())
+        apply_stat_deltas(actual)
+        db.session.commit()
+    return drift
+
+def query_stats(group_by=tuple(STAT_DIMENSIONS)):
+    """按指定维度汇总计数表, 返回 [{维度...: 值, 'count': 事件数}]"""
+    columns = [STAT_DIMENSIONS[name] for name in group_by]
+    total = db.func.sum(IncidentStatCounter.incident_count)
+    query = db.select(*columns, total).group_by(*columns).having(total != 0).order_by(*columns)
+    results = []
+    for row in db.session.execute(query):
+        item = dict(zip(group_by, row[:-1]))
+        if 'status' in item:
+            item['status'] = item['status'].name
+        if item.get('incident_level') == NO_LEVEL:
+            item['incident_level'] = None
+        item['count'] = int(row[-1])
+        results.append(item)
+    return results
@@ -0,0 +1,131 @@
+# utils/incident_workflow.py
+"""
+事件状态流转
+所有状态变更由 TRANSITIONS 表描述: 允许的源状态、目标状态、可执行的角色、必填参数以及附带的字段修改,
+单个事件的接口和批量接口 (POST /incidents/transitions) 共用同一套执行逻辑。
+"""
+from collections import namedtuple
+from datetime import datetime
+import bleach
+from models import db, Incident, IncidentStatus, IncidentStatusTransition
+from utils.search import index_incident_fields, SEARCH_FIELDS
+from utils.incident_stats import record_transitions
+
+ALLOWED_TAGS = ['b', 'i', 'u', 'strong', 'em', 'a', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'br', 'ul', 'ol', 'li']
+ALLOWED_ATTRIBUTES = {'a': ['href', 'title'], 'abbr': ['title'], 'acronym': ['title']}
+def clean_html(text):
+        return bleach.clean(text, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+
+# name: 流转名称; source: 允许的源状态; target: 目标状态; roles: 可执行的角色 (管理员始终允许)
+# required: 必填参数及缺失时的提示; apply: 根据参数返回除状态外需要同时修改的列
+Transition = namedtuple('Transition', ['name', 'source', 'target', 'roles', 'required', 'apply',
+                                       'status_error', 'success_message'])
+
+class TransitionResult(namedtuple('TransitionResult', ['incident_id', 'status_code', 'message'])):
+    @property
+    def ok(self):
+        return self.status_code == 200
+
+def _reject(payload):
+    return {'rejection_reason': payload['rejection_reason']}  # 记录驳回原因
+
+def _command_center_resolve(payload):
+    values = {'resolution_measures': payload['resolution_measures']}
+    # 如果incident_info不为空， 则更新事件内容 (使用 bleach 清洗)
+    if payload.get('incident_info'):
+        values['incident_info'] = clean_html(payload['incident_info'])
+    return values
+
+def _resolve(payload):
+    return {'resolved_at': datetime.utcnow()}
+
+def _close(payload):
+    return {'closed_at': datetime.utcnow()}  # 记录关闭时间
+
+# roles 与原先各接口的实际权限一致: 接口的 role_required 与 can_modify_incident 同时通过才能执行,
+# 部门领导只能修改待审核的事件, 指挥中心只能修改已批准/待处理的事件, 因此提交指挥中心、下发应急小组、完结只有管理员可以执行
+TRANSITIONS = {t.name: t for t in (
+    Transition('department_approve', IncidentStatus.SUBMITTED_DEPARTMENT_REVIEW, IncidentStatus.DEPARTMENT_APPROVED,
+               (2,), (), None, '事件状态不正确，⽆法批准!', '事件已批准!'),
+    Transition('department_reject', IncidentStatus.SUBMITTED_DEPARTMENT_REVIEW, IncidentStatus.DEPARTMENT_REJECTED,
+               (2,), (('rejection_reason', '请提供驳回原因!'),), _reject, '事件状态不正确，⽆法驳回!', '事件已驳回!'),
+    Transition('command_center_submit', IncidentStatus.DEPARTMENT_APPROVED, IncidentStatus.PENDING_COMMAND_CENTER,
+               (), (), None, '当前状态⽆法提交⾄指挥中⼼', '提交指挥中⼼成功!'),
+    Transition('command_center_resolve', IncidentStatus.PENDING_COMMAND_CENTER, IncidentStatus.COMMAND_CENTER_PROCESSED,
+               (1,), (('resolution_measures', '请填写解决措施!'),), _command_center_resolve, '当前状态⽆法解决!',
+               '指挥中⼼处理完成!'),
+    Transition('issue_emergency_team', IncidentStatus.COMMAND_CENTER_PROCESSED, IncidentStatus.ISSUED_EMERGENCY_TEAM,
+               (), (), None, '当前状态⽆法下发应急⼩组!', '已下发应急⼩组!'),
+    Transition('resolve', IncidentStatus.ISSUED_EMERGENCY_TEAM, IncidentStatus.RESOLVED,
+               (), (), _resolve, '当前状态⽆法完结!', '事件已完结!'),
+    Transition('close', IncidentStatus.RESOLVED, IncidentStatus.CLOSED,
+               (0,), (), _close, '当前状态⽆法关闭!', '事件已关闭!'),
+)}
+
+def role_allowed(user, transition):
+    return user.role_level == -1 or user.role_level in transition.roles
+
+def validate_payload(transition, payload):
+    """检查必填参数, 返回第一条错误提示, 通过则返回 None"""
+    for field, error in transition.required:
+        if not payload.get(field):
+            return error
+    return None
+
+def _compare_and_set(transition, incident_id, values):
+    """
+    一条条件 UPDATE 完成状态检查和修改: 只有当前状态仍为源状态时才会更新 (同时递增 version),
+    并发执行同一流转时只有一个请求能命中。未命中时再查询一次, 区分事件不存在和状态不符
+    """
+    table = Incident.__table__
+    updated = db.session.execute(
+        table.update()
+        .where(table.c.incident_id == incident_id, table.c.status == transition.source)
+        .values(status=transition.target, version=table.c.version + 1, **values)
+    ).rowcount
+    if updated:
+        return TransitionResult(incident_id, 200, transition.success_message)
+    exists = db.session.execute(db.select(table.c.incident_id).where(table.c.incident_id == incident_id)).first()
+    if exists is None:
+        return TransitionResult(incident_id, 404, '事件不存在!')
+    return TransitionResult(incident_id, 400, transition.status_error)
+
+def _log_transitions(user, transition, incident_ids):
+    """追加流转记录 (executemany)"""
+    now = datetime.utcnow()
+    db.session.execute(IncidentStatusTransition.__table__.insert(), [
+        {'incident_id': incident_id, 'from_status': transition.source, 'to_status': transition.target,
+         'actor_id': user.user_id, 'transitioned_at': now}
+        for incident_id in incident_ids
+    ])
+
+def run_transitions(user, name, incident_ids, payload=None):
+    """
+    对多个事件执行同一个流转, 成功的事件连同统计计数和流转记录在同一个事务中提交, 返回与 incident_ids 顺序一致的逐项结果
+    调用方需先检查角色 (role_allowed) 和参数 (validate_payload)
+    """
+    transition = TRANSITIONS[name]
+    values = transition.apply(payload or {}) if transition.apply else {}
+    results = [_compare_and_set(transition, incident_id, values) for incident_id in incident_ids]
+    succeeded = [result.incident_id for result in results if result.ok]
+    if succeeded:
+        record_transitions(succeeded, transition.source, transition.target)
+        _log_transitions(user, transition, succeeded)
+        db.session.commit()
+    else:
+        db.session.rollback()
+    indexed = {field: value for field, value in values.items() if field in SEARCH_FIELDS}
+    if indexed:
+        for incident_id in succeeded:
+            index_incident_fields(incident_id, **indexed)
+    return results
+
+def run_transition(user, name, incident_id, payload=None):
+    """单个事件的流转, 返回 TransitionResult"""
+    transition = TRANSITIONS[name]
+    if not role_allowed(user, transition):
+        return TransitionResult(incident_id, 403, '⽆权限执⾏此操作')
+    error = validate_payload(transition, payload or {})
+    if error:
+        return TransitionResult(incident_id, 400, error)
+    return run_transitions(user, name, [incident_id], payload)[0]
@@ -1,9 +1,20 @@
 # utils/jwt_utils.py
 import jwt
+from collections import namedtuple
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify, current_app
-from models import User  # 导入 User 模型
+from flask import request, jsonify, current_app, g, has_app_context
+from models import db, User  # 导入 User 模型
+from utils.cache import LRUCache
+
+# 已验证 Token 的缓存: (secret_key, token) -> payload, 条目在 Token 自身的 exp 时刻失效
+_token_cache = None
+# 用户身份缓存: user_id -> Principal, 按 PRINCIPAL_CACHE_TTL 过期, 用户信息变更时主动失效
+# 缓存在每个进程内, 失效只作用于当前进程: 其他 worker 进程在 PRINCIPAL_CACHE_TTL (默认 5 秒) 内可能仍使用旧的角色/状态
+_principal_cache = None
+
+# 认证所需的精简用户信息, 作为 current_user 传给各路由 (路由只使用 user_id / role_level)
+Principal = namedtuple('Principal', ['user_id', 'username', 'role_level', 'is_active'])
 
 def generate_jwt_token(user, secret_key):
     """生成 JWT 令牌"""
@@ -16,38 +27,131 @@ def generate_jwt_token(user, secret_key):
     token = jwt.encode(payload, secret_key, algorithm='HS256')
     return token
 
+def _token_cache_config(name, default):
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return default
+
+def get_token_cache():
+    """获取 Token 缓存 (首次使用时按 JWT_CACHE_SIZE 创建)"""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = LRUCache(maxsize=_token_cache_config('JWT_CACHE_SIZE', 4096))
+    return _token_cache
+
+def token_cache_stats():
+    """返回 Token 缓存的命中/未命中统计"""
+    return get_token_cache().stats()
+
+def get_principal_cache():
+    """获取用户身份缓存 (首次使用时按 PRINCIPAL_CACHE_SIZE / PRINCIPAL_CACHE_TTL 创建)"""
+    global _principal_cache
+    if _principal_cache is None:
+        _principal_cache = LRUCache(maxsize=_token_cache_config('PRINCIPAL_CACHE_SIZE', 4096),
+                                    ttl=_token_cache_config('PRINCIPAL_CACHE_TTL', 5))
+    return _principal_cache
+
+def load_principal(user_id):
+    """按 user_id 获取用户身份信息, 优先读缓存, 未命中时只查询必要的列"""
+    user_id = int(user_id)
+    cache = get_principal_cache()
+    principal = cache.get(user_id)
+    if principal is None:
+        row = db.session.query(User.user_id, User.username, User.role_level, User.is_active) \
+            .filter(User.user_id == user_id).first()
+        if row is None:
+            return None
+        principal = Principal(*row)
+        cache.set(user_id, principal)
+    return principal
+
+def invalidate_principal(user_id):
+    """
+    用户角色、状态或密码变更后调用, 使本进程缓存的身份信息立即失效
+    其他 worker 进程的缓存不受影响, 最多在 PRINCIPAL_CACHE_TTL 秒后过期
+    """
+    get_principal_cache().pop(int(user_id))
+
 def decode_jwt_token(token, secret_key):
-    """验证 JWT 令牌"""
+    """验证 JWT 令牌 (已验证过且未过期的 Token 直接从缓存返回)"""
+    use_cache = _token_cache_config('JWT_CACHE_ENABLED', True)
+    if use_cache:
+        cache = get_token_cache()
+        cache_key = (secret_key, token)
+        payload = cache.get(cache_key)
+        if payload is not None:
+            return payload
     try:
         payload = jwt.decode(token, secret_key, algorithms=['HS256'])
-        return payload
     except jwt.ExpiredSignatureError:
         return 'Token 已过期,请重新登录'
     except jwt.InvalidTokenError:
         return 'Token 无效,请重新登录'
+    # 只缓存带 exp 的 Token, 缓存条目随 Token 一起过期
+    if use_cache and isinstance(payload.get('exp'), (int, float)):
+        cache.set(cache_key, payload, expires_at=payload['exp'])
+    return payload
+
+class AuthContext:
+    """
+    请求级认证上下文
+    同一个请求内 Token 只校验一次、用户只加载一次, token_required 与 role_required 共用该结果
+    """
+    __slots__ = ('current_user', 'payload', 'error', 'status_code')
+
+    def __init__(self, current_user=None, payload=None, error=None, status_code=200):
+        self.current_user = current_user
+        self.payload = payload
+        self.error = error  # 认证失败时的提示信息
+        self.status_code = status_code
+
+    @property
+    def ok(self):
+        return self.error is None
+
+def _build_auth_context():
+    """解析请求头中的 Token 并加载当前用户"""
+    token = request.headers.get('Authorization')
+    if not token:
+        return AuthContext(error='缺少 Token!', status_code=401)
+    try:
+        payload = decode_jwt_token(token, current_app.config['JWT_SECRET_KEY'])
+        if isinstance(payload, str): #  token已过期或者⽆效
+            return AuthContext(error=payload, status_code=401)
+
+        current_user = load_principal(payload['user_id'])
+        if not current_user:
+            return AuthContext(payload=payload, error='⽤户不存在!', status_code=401)
+        if current_user.is_active is False:  # 已被逻辑删除/停用的账户
+            return AuthContext(payload=payload, error='账户已停用!', status_code=401)
+    except Exception as e:
+        return AuthContext(error='Token 验证失败!' + str(e), status_code=401)
+    return AuthContext(current_user=current_user, payload=payload)
+
+def get_auth_context():
+    """获取当前请求的认证上下文 (结果缓存在 g 上, 每个请求只计算一次)"""
+    ctx = g.get('auth_context')
+    if ctx is None:
+        ctx = _build_auth_context()
+        g.auth_context = ctx
+    return ctx
+
+def _call_view(f, current_user, args, kwargs):
+    """调用被装饰的函数; 若内层装饰器已负责注入 current_user, 则不重复注入"""
+    if getattr(f, '_injects_current_user', False):
+        return f(*args, **kwargs)
+    return f(current_user, *args, **kwargs)
 
 def token_required(f):
     """Token 验证装饰器"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'message': '缺少 Token!'}), 401
-
-        try:
-            payload = decode_jwt_token(token, current_app.config['JWT_SECRET_KEY'])
-            if isinstance(payload, str): #  token已过期或者⽆效
-                return jsonify({'message': payload}), 401
-
-            user_id = payload['user_id']
-            current_user = User.query.get(user_id)
-            if not current_user:
-                return jsonify({'message': '⽤户不存在!'}), 401
-
-        except Exception as e:
-            return jsonify({'message': 'Token 验证失败!' + str(e) }), 401
+        ctx = get_auth_context()
+        if not ctx.ok:
+            return jsonify({'message': ctx.error}), ctx.status_code
         # 将当前用户传递给被装饰的函数
-        return f(current_user, *args, **kwargs)
+        return _call_view(f, ctx.current_user, args, kwargs)
+    decorated._injects_current_user = True
     return decorated
 
 def role_required(role_levels):
@@ -58,30 +162,31 @@ def role_required(role_levels):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            token = request.headers.get('Authorization')
-            if not token:
-                return jsonify({'message': '缺少Token!'}), 401
-
-            try:
-                payload = decode_jwt_token(token, current_app.config['JWT_SECRET_KEY'])
+            ctx = get_auth_context()
+            if not ctx.ok:
+                return jsonify({'message': ctx.error}), ctx.status_code
 
-                if isinstance(payload, str): # token已过期或者⽆效
-                   return jsonify({'message': payload}), 401
-
-                user_id = payload['user_id']
-                current_user = User.query.get(user_id)
-
-                if not current_user:
-                    return jsonify({'message': '用户不存在!'}), 401
-
-                # 权限检查：管理员直接放⾏，否则检查⻆⾊级别是否在允许的列表中
-                if current_user.role_level != -1 and current_user.role_level not in role_levels:
-                    return jsonify({'message': '权限不⾜!'}), 403
-
-            except Exception as e:
-                return jsonify({'message': 'Token 验证失败!' + str(e)}), 401
+            current_user = ctx.current_user
+            # 权限检查：管理员直接放⾏，否则检查⻆⾊级别是否在允许的列表中
+            if current_user.role_level != -1 and current_user.role_level not in role_levels:
+                return jsonify({'message': '权限不⾜!'}), 403
 
             # 将当前用户传递给被装饰的函数
-            return f(current_user, *args, **kwargs)
+            return _call_view(f, current_user, args, kwargs)
+        decorated_function._injects_current_user = True
         return decorated_function
     return decorator
+
+if __name__ == '__main__':
+    # 微基准: 对比重复 Token 在开启/关闭缓存时的解码耗时 (python -m utils.jwt_utils)
+    import timeit
+    from types import SimpleNamespace
+
+    secret = 'benchmark-secret'
+    sample = generate_jwt_token(SimpleNamespace(user_id=1, role_level=3), secret)
+    rounds = 20000
+    uncached = timeit.timeit(lambda: jwt.decode(sample, secret, algorithms=['HS256']), number=rounds)
+    cached = timeit.timeit(lambda: decode_jwt_token(sample, secret), number=rounds)
+    print(f'未缓存: {uncached / rounds * 1e6:.2f} us/次')
+    print(f'缓存:   {cached / rounds * 1e6:.2f} us/次')
+    print(token_cache_stats())
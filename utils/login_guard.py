@@ -0,0 +1,198 @@
+# utils/login_guard.py
+"""
+登录失败滑动窗口追踪
+按用户名和来源 IP 分别维护长度为阈值的环形缓冲区, 记录最近几次失败的时间戳:
+缓冲区已满且最早一次失败仍在 BAN_DURATION 窗口内即判定为锁定, 判断为 O(1)
+存储可以是进程内存 (默认), 也可以是本机 SQLite 文件 (LOGIN_GUARD_STORE), 供多个 worker 进程共享
+"""
+import calendar
+import datetime
+import sqlite3
+import threading
+import time
+from collections import deque
+from flask import current_app
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+class MemoryStore:
+    """进程内存储"""
+    def __init__(self):
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            ring = self._rings.get(key)
+            return list(ring) if ring else []
+
+    def push(self, key, timestamp, maxlen):
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None or ring.maxlen != maxlen:
+                ring = self._rings[key] = deque(ring or (), maxlen=maxlen)
+            ring.append(timestamp)
+
+    def replace(self, key, timestamps, maxlen):
+        with self._lock:
+            self._rings[key] = deque(timestamps, maxlen=maxlen)
+
+    def prune(self, cutoff):
+        """移除最近一次失败已经超出窗口的键"""
+        with self._lock:
+            for key in [k for k, ring in self._rings.items() if not ring or ring[-1] < cutoff]:
+                del self._rings[key]
+
+    def is_empty(self):
+        return not self._rings
+
+class SQLiteStore:
+    """本机 SQLite 文件存储, 同一台机器上的多个 worker 进程共享锁定状态"""
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS login_failure_rings '
+                         '(ring_key TEXT PRIMARY KEY, stamps TEXT NOT NULL, last_failure REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _decode(stamps):
+        return [float(x) for x in stamps.split(',')] if stamps else []
+
+    def get(self, key):
+        row = self._connect().execute('SELECT stamps FROM login_failure_rings WHERE ring_key = ?', (key,)).fetchone()
+        return self._decode(row[0]) if row else []
+
+    def push(self, key, timestamp, maxlen):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT stamps FROM login_failure_rings WHERE ring_key = ?', (key,)).fetchone()
+            stamps = (self._decode(row[0]) if row else []) + [timestamp]
+            self._write(conn, key, stamps[-maxlen:])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def replace(self, key, timestamps, maxlen):
+        timestamps = list(timestamps)[-maxlen:]
+        if timestamps:
+            self._write(self._connect(), key, timestamps)
+
+    @staticmethod
+    def _write(conn, key, stamps):
+        conn.execute('INSERT OR REPLACE INTO login_failure_rings (ring_key, stamps, last_failure) VALUES (?, ?, ?)',
+                     (key, ','.join(repr(x) for x in stamps), stamps[-1]))
+
+    def prune(self, cutoff):
+        self._connect().execute('DELETE FROM login_failure_rings WHERE last_failure < ?', (cutoff,))
+
+    def is_empty(self):
+        return self._connect().execute('SELECT 1 FROM login_failure_rings LIMIT 1').fetchone() is None
+
+class LoginFailureTracker:
+    """
+    登录失败追踪器
+    :param max_user_failures: 同一用户名在窗口内允许的失败次数
+    :param max_ip_failures: 同一来源 IP 在窗口内允许的失败次数
+    :param window: 滑动窗口长度 (秒), 即 BAN_DURATION
+    """
+    PRUNE_EVERY = 1000  # 每记录多少次失败清理一次过期的键
+
+    def __init__(self, store, max_user_failures, max_ip_failures, window, timer=time.time):
+        self.store = store
+        self.max_user_failures = max_user_failures
+        self.max_ip_failures = max_ip_failures
+        self.window = window
+        self._timer = timer
+        self._records = 0
+
+    @staticmethod
+    def user_key(username):
+        return f'u:{username}'
+
+    @staticmethod
+    def ip_key(ip_address):
+        return f'ip:{ip_address}'
+
+    def _ring_full(self, key, limit, now):
+        stamps = self.store.get(key)
+        # 缓冲区只保留最近 limit 次失败, 满且最早一次仍在窗口内即说明窗口内失败次数已达阈值
+        return len(stamps) >= limit and stamps[-limit] >= now - self.window
+
+    def is_locked(self, username, ip_address=None):
+        """判断用户名或来源 IP 是否处于锁定状态"""
+        now = self._timer()
+        if username and self._ring_full(self.user_key(username), self.max_user_failures, now):
+            return True
+        if ip_address and self._ring_full(self.ip_key(ip_address), self.max_ip_failures, now):
+            return True
+        return False
+
+    def record_failure(self, username, ip_address, timestamp=None):
+        """记录一次登录失败 (用户名不存在时同样计数)"""
+        timestamp = self._timer() if timestamp is None else timestamp
+        if username:
+            self.store.push(self.user_key(username), timestamp, self.max_user_failures)
+        if ip_address:
+            self.store.push(self.ip_key(ip_address), timestamp, self.max_ip_failures)
+        self._records += 1
+        if self._records % self.PRUNE_EVERY == 0:
+            self.store.prune(timestamp - self.window)
+
+    def rebuild(self, failures):
+        """
+        根据历史失败记录重建状态
+        :param failures: 按时间升序的 (username, ip_address, attempt_time) 序列, attempt_time 为 UTC datetime
+        """
+        by_key = {}
+        for username, ip_address, attempt_time in failures:
+            timestamp = calendar.timegm(attempt_time.utctimetuple())
+            if username:
+                by_key.setdefault((self.user_key(username), self.max_user_failures), []).append(timestamp)
+            if ip_address:
+                by_key.setdefault((self.ip_key(ip_address), self.max_ip_failures), []).append(timestamp)
+        for (key, limit), stamps in by_key.items():
+            self.store.replace(key, stamps, limit)
+
+def _load_recent_failures(window):
+    """读取窗口内的失败登录记录 (按时间升序)"""
+    from models import db, User, LoginAttempt
+    cutoff_time = datetime.datetime.utcnow() - datetime.timedelta(seconds=window)
+    return db.session.query(User.username, LoginAttempt.ip_address, LoginAttempt.attempt_time) \
+        .join(User, User.user_id == LoginAttempt.user_id) \
+        .filter(LoginAttempt.success == False, LoginAttempt.attempt_time >= cutoff_time) \
+        .order_by(LoginAttempt.attempt_time).all()
+
+def get_login_tracker():
+    """
+    获取当前进程的登录失败追踪器
+    首次调用时按配置创建, 存储为空时从近期的 LoginAttempt 记录重建 (需在应用上下文中调用)
+    """
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                config = current_app.config
+                path = config.get('LOGIN_GUARD_STORE')
+                store = SQLiteStore(path) if path else MemoryStore()
+                tracker = LoginFailureTracker(
+                    store,
+                    max_user_failures=config.get('MAX_FAILED_ATTEMPTS', 5),
+                    max_ip_failures=config.get('MAX_FAILED_ATTEMPTS_PER_IP', 20),
+                    window=config.get('BAN_DURATION', 300),
+                )
+                if store.is_empty():
+                    tracker.rebuild(_load_recent_failures(tracker.window))
+                _tracker = tracker
+    return _tracker
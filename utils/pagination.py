@@ -0,0 +1,59 @@
+# utils/pagination.py
+"""
+键集 (keyset) 分页工具
+游标是对上一页最后一行排序键的不透明编码, 客户端原样回传即可获取下一页
+"""
+import base64
+import json
+from datetime import datetime, timezone
+
+# 默认/最大每页条数
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+class InvalidCursor(ValueError):
+    """游标格式错误"""
+
+def encode_cursor(*values):
+    """把排序键编码为游标字符串 (datetime 按 ISO 格式保存)"""
+    payload = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _coerce(value, type_):
+    """校验单个排序键的类型, datetime 带时区时转为 UTC 的 naive 时间 (与数据库中的保存方式一致)"""
+    if type_ is int:
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    elif type_ is datetime:
+        if isinstance(value, datetime):
+            return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    raise InvalidCursor('游标无效!')
+
+def decode_cursor(cursor, types):
+    """
+    解码游标
+    :param types: 各排序键的类型 (int 或 datetime), 个数即排序键个数
+    :raises InvalidCursor: 游标无法解析, 或键的个数、类型不符
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('游标无效!')
+    if not isinstance(payload, list) or len(values) != len(types):
+        raise InvalidCursor('游标无效!')
+    return [_coerce(value, type_) for value, type_ in zip(values, types)]
+
+def page_size(value):
+    """解析 limit 参数, 限制在 1 ~ MAX_PAGE_SIZE 之间"""
+    try:
+        value = int(value) if value is not None else DEFAULT_PAGE_SIZE
+    except (TypeError, ValueError):
+        value = DEFAULT_PAGE_SIZE
+    return max(1, min(value, MAX_PAGE_SIZE))
+
+def parse_bool(value):
+    """解析查询参数中的布尔值"""
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
@@ -0,0 +1,79 @@
+# utils/pubsub.py
+"""
+进程内发布/订阅
+每个订阅者持有一个有界缓冲区, 缓冲区满时丢弃最早的事件并标记 overflowed,
+订阅方据此从数据库补齐, 不会丢失数据
+注意: 只在当前进程内广播, 多个 worker 进程之间不共享
+"""
+import threading
+from collections import deque
+
+class Subscription:
+    """单个连接的订阅"""
+    def __init__(self, hub, topic, maxsize):
+        self.hub = hub
+        self.topic = topic
+        self.overflowed = False
+        self._events = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+
+    def put(self, event):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.overflowed = True
+            self._events.append(event)
+            self._cond.notify()
+
+    def drain(self, timeout=None):
+        """
+        取出缓冲区中的全部事件, 没有事件时最多等待 timeout 秒
+        :return: (事件列表, 期间是否发生过溢出)
+        """
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            overflowed, self.overflowed = self.overflowed, False
+        return events, overflowed
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+class Hub:
+    """按主题 (如 user_id) 分发事件"""
+    def __init__(self, buffer_size=100):
+        self.buffer_size = buffer_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic, maxsize=None):
+        subscription = Subscription(self, topic, maxsize or self.buffer_size)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    def publish(self, topic, event):
+        """向主题的全部订阅者投递事件, 返回投递的订阅者数"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+        return len(subscribers)
+
+    def subscriber_count(self, topic=None):
+        with self._lock:
+            if topic is not None:
+                return len(self._subscribers.get(topic, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+# 站内信推送 (主题为收件人 user_id)
+message_hub = Hub()
@@ -0,0 +1,375 @@
+# utils/search.py
+"""
+事件全文检索
+对 incident_info / resolution_measures / rejection_reason 建立增量维护的倒排索引:
+    * 中文按相邻两字 (bigram) 切分, 英文和数字按整词切分, 查询时所有词都需命中 (AND), 按 BM25 排序
+    * 单个汉字的查询词按前缀匹配 (命中以该字开头的所有词); 建索引时每段中文的末字额外保留单字,
+      使任意位置的汉字都是某个词的前缀
+    * fts5:   SQLite FTS5 虚拟表 (默认, 多个 worker 进程共享同一个索引文件)
+    * memory: 进程内倒排索引, 通过 pickle 持久化到磁盘 (适合单进程部署)
+配置项: SEARCH_BACKEND (fts5 / memory), SEARCH_INDEX_PATH, SEARCH_AUTOSAVE_EVERY
+运行 python -m utils.search --docs 1000000 可进行建索引与查询的基准测试
+"""
+import atexit
+import math
+import os
+import pickle
+import re
+import sqlite3
+import threading
+from collections import Counter
+from flask import current_app
+
+# 参与检索的字段
+SEARCH_FIELDS = ('incident_info', 'resolution_measures', 'rejection_reason')
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_TOKEN_RE = re.compile(r'[㐀-䶿一-鿿豈-﫿]+|[0-9a-z]+')
+
+def _is_cjk(ch):
+    return ch >= '㐀'
+
+def tokenize(text, query=False):
+    """
+    切分文本: 中文连续片段切为 bigram (单字片段保留单字), 英文/数字按整词
+    :param query: 切分查询文本; 为 False (建索引) 时多字中文片段的末字额外输出单字
+    """
+    if not text:
+        return []
+    if '<' in text:
+        text = _TAG_RE.sub(' ', text)
+    tokens = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if _is_cjk(run[0]) and len(run) > 1:
+            tokens.extend(map(str.__add__, run, run[1:]))  # 相邻两字
+            if not query:
+                tokens.append(run[-1])
+        else:
+            tokens.append(run)
+    return tokens
+
+def is_prefix_token(token):
+    """单个汉字的查询词按前缀匹配"""
+    return len(token) == 1 and _is_cjk(token)
+
+class FTS5Index:
+    """基于 SQLite FTS5 的索引, 文本预先切分为空格分隔的词再写入"""
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        columns = ', '.join(SEARCH_FIELDS)
+        self._connect().execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS incident_fts USING fts5({columns})')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def update(self, incident_id, **fields):
+        """新增或更新一个事件的部分字段 (未传入的字段保持不变)"""
+        fields = {k: ' '.join(tokenize(v)) for k, v in fields.items() if k in SEARCH_FIELDS}
+        if not fields:
+            return
+        conn = self._connect()
+        assignments = ', '.join(f'{k} = ?' for k in fields)
+        if not conn.execute(f'UPDATE incident_fts SET {assignments} WHERE rowid = ?',
+                            (*fields.values(), incident_id)).rowcount:
+            columns = ', '.join(fields)
+            placeholders = ', '.join('?' for _ in fields)
+            conn.execute(f'INSERT INTO incident_fts (rowid, {columns}) VALUES (?, {placeholders})',
+                         (incident_id, *fields.values()))
+
+    def delete(self, incident_id):
+        self._connect().execute('DELETE FROM incident_fts WHERE rowid = ?', (incident_id,))
+
+    def add_many(self, documents):
+        """
+        在一个事务中写入多个事件 (批量导入新事件时使用), 已存在的同名事件整行替换
+        :param documents: 可迭代的 (incident_id, {字段: 文本}) 序列
+        """
+        columns = ', '.join(SEARCH_FIELDS)
+        placeholders = ', '.join('?' for _ in SEARCH_FIELDS)
+        rows = [(incident_id, *(' '.join(tokenize(fields.get(f))) for f in SEARCH_FIELDS))
+                for incident_id, fields in documents]
+        conn = self._connect()
+        conn.execute('BEGIN')
+        try:
+            conn.executemany(f'INSERT OR REPLACE INTO incident_fts (rowid, {columns}) VALUES (?, {placeholders})', rows)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def search(self, query, offset=0, limit=20):
+        """
+        检索
+        :return: (命中总数, [(incident_id, score), ...]), score 越大越相关
+        """
+        tokens = list(dict.fromkeys(tokenize(query, query=True)))
+        if not tokens:
+            return 0, []
+        expression = ' AND '.join(('"%s"*' if is_prefix_token(t) else '"%s"') % t for t in tokens)
+        conn = self._connect()
+        total = conn.execute('SELECT count(*) FROM incident_fts WHERE incident_fts MATCH ?', (expression,)).fetchone()[0]
+        rows = conn.execute('SELECT rowid, bm25(incident_fts) FROM incident_fts WHERE incident_fts MATCH ? '
+                            'ORDER BY bm25(incident_fts) LIMIT ? OFFSET ?', (expression, limit, offset)).fetchall()
+        return total, [(rowid, -score) for rowid, score in rows]
+
+    def rebuild(self, documents, batch_size=10000):
+        """
+        清空并重建索引
+        :param documents: 可迭代的 (incident_id, {字段: 文本}) 序列
+        :return: 写入的事件数
+        """
+        conn = self._connect()
+        columns = ', '.join(SEARCH_FIELDS)
+        placeholders = ', '.join('?' for _ in SEARCH_FIELDS)
+        sql = f'INSERT INTO incident_fts (rowid, {columns}) VALUES (?, {placeholders})'
+        conn.execute('BEGIN')
+        try:
+            conn.execute('DELETE FROM incident_fts')
+            count, batch = 0, []
+            for incident_id, fields in documents:
+                batch.append((incident_id, *(' '.join(tokenize(fields.get(f))) for f in SEARCH_FIELDS)))
+                if len(batch) >= batch_size:
+                    conn.executemany(sql, batch)
+                    count += len(batch)
+                    batch = []
+            conn.executemany(sql, batch)
+            count += len(batch)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute("INSERT INTO incident_fts (incident_fts) VALUES ('optimize')")
+        return count
+
+    def save(self):
+        """FTS5 每次写入即持久化, 无需额外保存"""
+
+class MemoryIndex:
+    """进程内倒排索引, 按 BM25 排序, 定期及进程退出时持久化到 path"""
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, path=None, autosave_every=1000):
+        self.path = path
+        self.autosave_every = autosave_every
+        self._lock = threading.RLock()
+        self._dirty = 0
+        self.postings = {}  # token -> {incident_id: 词频}
+        self.documents = {}  # incident_id -> {字段: Counter(token)}
+        self.doc_lengths = {}  # incident_id -> 总词数
+        self.total_length = 0
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self.postings, self.documents, self.doc_lengths, self.total_length = pickle.load(f)
+
+    def _prefix_postings(self, prefix):
+        """合并以 prefix 开头的所有词的倒排表 (遍历词表)"""
+        merged = {}
+        for token, docs in self.postings.items():
+            if token.startswith(prefix):
+                for incident_id, n in docs.items():
+                    merged[incident_id] = merged.get(incident_id, 0) + n
+        return merged
+
+    def _remove_terms(self, incident_id, counts):
+        for token, n in counts.items():
+            docs = self.postings[token]
+            remaining = docs[incident_id] - n
+            if remaining:
+                docs[incident_id] = remaining
+            else:
+                del docs[incident_id]
+                if not docs:
+                    del self.postings[token]
+
+    def _add_terms(self, incident_id, counts):
+        for token, n in counts.items():
+            docs = self.postings.setdefault(token, {})
+            docs[incident_id] = docs.get(incident_id, 0) + n
+
+    def update(self, incident_id, **fields):
+        """新增或更新一个事件的部分字段 (未传入的字段保持不变)"""
+        fields = {k: v for k, v in fields.items() if k in SEARCH_FIELDS}
+        if not fields:
+            return
+        with self._lock:
+            stored = self.documents.setdefault(incident_id, {})
+            for field, text in fields.items():
+                old = stored.pop(field, None)
+                if old:
+                    self._remove_terms(incident_id, old)
+                new = Counter(tokenize(text))
+                if new:
+                    stored[field] = new
+                    self._add_terms(incident_id, new)
+            length = sum(sum(c.values()) for c in stored.values())
+            self.total_length += length - self.doc_lengths.get(incident_id, 0)
+            self.doc_lengths[incident_id] = length
+            self._mark_dirty()
+
+    def delete(self, incident_id):
+        with self._lock:
+            stored = self.documents.pop(incident_id, None)
+            if stored is None:
+                return
+            for counts in stored.values():
+                self._remove_terms(incident_id, counts)
+            self.total_length -= self.doc_lengths.pop(incident_id, 0)
+            self._mark_dirty()
+
+    def add_many(self, documents):
+        """写入多个事件, 整批写完后才检查是否需要落盘"""
+        with self._lock:
+            autosave, self.autosave_every = self.autosave_every, 0
+            try:
+                for incident_id, fields in documents:
+                    self.update(incident_id, **fields)
+            finally:
+                self.autosave_every = autosave
+            self._mark_dirty()
+
+    def search(self, query, offset=0, limit=20):
+        """
+        检索
+        :return: (命中总数, [(incident_id, score), ...]), score 越大越相关
+        """
+        tokens = list(dict.fromkeys(tokenize(query, query=True)))
+        if not tokens:
+            return 0, []
+        with self._lock:
+            postings = [self._prefix_postings(t) if is_prefix_token(t) else self.postings.get(t) for t in tokens]
+            if not all(postings):
+                return 0, []
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for docs in postings[1:]:
+                candidates.intersection_update(docs)
+                if not candidates:
+                    return 0, []
+            n = len(self.doc_lengths)
+            avg_length = self.total_length / n if n else 0
+            scores = dict.fromkeys(candidates, 0.0)
+            for docs in postings:
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for incident_id in candidates:
+                    tf = docs[incident_id]
+                    norm = self.K1 * (1 - self.B + self.B * self.doc_lengths[incident_id] / avg_length)
+                    scores[incident_id] += idf * tf * (self.K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return len(ranked), ranked[offset:offset + limit]
+
+    def rebuild(self, documents, batch_size=None):
+        """清空并重建索引, 返回写入的事件数"""
+        with self._lock:
+            self.postings, self.documents, self.doc_lengths, self.total_length = {}, {}, {}, 0
+            autosave, self.autosave_every = self.autosave_every, 0
+            count = 0
+            try:
+                for incident_id, fields in documents:
+                    self.update(incident_id, **fields)
+                    count += 1
+            finally:
+                self.autosave_every = autosave
+            self.save()
+        return count
+
+    def _mark_dirty(self):
+        self._dirty += 1
+        if self.autosave_every and self._dirty >= self.autosave_every:
+            self.save()
+
+    def save(self):
+        """原子地写入磁盘 (先写临时文件再替换)"""
+        if not self.path:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((self.postings, self.documents, self.doc_lengths, self.total_length), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            self._dirty = 0
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+def get_search_index():
+    """获取当前进程的检索索引 (首次调用时按配置创建, 需在应用上下文中调用)"""
+    global _search_index
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                config = current_app.config
+                backend = config.get('SEARCH_BACKEND', 'fts5')
+                path = config.get('SEARCH_INDEX_PATH')
+                if backend == 'fts5':
+                    _search_index = FTS5Index(path or os.path.join(current_app.instance_path, 'incident_search.db'))
+                elif backend == 'memory':
+                    _search_index = MemoryIndex(path or os.path.join(current_app.instance_path, 'incident_search.pickle'),
+                                                autosave_every=config.get('SEARCH_AUTOSAVE_EVERY', 1000))
+                    atexit.register(_search_index.save)
+                else:
+                    raise ValueError(f"未知的检索后端: {backend}")
+    return _search_index
+
+def index_incident_fields(incident_id, **fields):
+    """事件文本变更后更新索引, 索引失败只记录日志, 不影响业务操作"""
+    try:
+        get_search_index().update(incident_id, **fields)
+    except Exception as e:
+        current_app.logger.error(f"事件 {incident_id} 检索索引更新失败: {e}")
+
+def index_incident_documents(documents):
+    """批量写入新事件的索引, 失败只记录日志"""
+    documents = list(documents)
+    try:
+        get_search_index().add_many(documents)
+    except Exception as e:
+        current_app.logger.error(f"{len(documents)} 个事件检索索引写入失败: {e}")
+
+if __name__ == '__main__':
+    import argparse
+    import random
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description='事件全文检索基准测试')
+    parser.add_argument('--docs', type=int, default=100000)
+    parser.add_argument('--backend', choices=['fts5', 'memory'], default='fts5')
+    options = parser.parse_args()
+
+    words = ['跑道', '鸟击', '航班', '延误', '发动机', '故障', '旅客', '行李', '安检', '塔台', '机坪', '除冰',
+             '备降', '火警', '演练', '油料', '泄漏', '通信', '中断', '雷暴', '复飞', '滑行', '冲突', '处置']
+    rng = random.Random(42)
+
+    def generate():
+        for i in range(1, options.docs + 1):
+            yield i, {
+                'incident_info': ''.join(rng.choices(words, k=30)) + f' CA{rng.randint(100, 9999)}',
+                'resolution_measures': ''.join(rng.choices(words, k=10)),
+            }
+
+    directory = tempfile.mkdtemp()
+    if options.backend == 'fts5':
+        index = FTS5Index(os.path.join(directory, 'bench.db'))
+    else:
+        index = MemoryIndex(os.path.join(directory, 'bench.pickle'))
+    started = time.perf_counter()
+    index.rebuild(generate())
+    print(f'建索引 {options.docs} 条: {time.perf_counter() - started:.1f} s')
+    for query in ['鸟', '鸟击', '发动机故障', '雷暴复飞处置', 'ca1234']:
+        started = time.perf_counter()
+        total, hits = index.search(query, limit=20)
+        print(f'{query}: 命中 {total}, 耗时 {(time.perf_counter() - started) * 1000:.1f} ms')
+    started = time.perf_counter()
+    for i in range(1, 1001):
+        index.update(i, rejection_reason='跑道冲突')
+    print(f'增量更新 1000 次: {(time.perf_counter() - started) * 1000:.1f} ms')
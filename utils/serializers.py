@@ -0,0 +1,155 @@
+# utils/serializers.py
+"""
+声明式序列化
+每个模型声明一次返回字段, 路由复用同一个 ModelSerializer:
+    USER_SERIALIZER = ModelSerializer('user_id', 'username', ('created', isoformat('created_at')))
+    json_response(USER_SERIALIZER.many(users))
+    stream_json_array(USER_SERIALIZER, query.yield_per(1000))  # 大集合分块流式输出, 不在内存中拼出完整响应
+安装了 orjson 时使用 orjson 编码, 否则使用标准库 json; 两者对枚举的处理不同, 枚举字段需声明为 enum_name(...)
+时间编码为 ISO 格式, Decimal 编码为字符串 (保留精度), 两种后端输出一致
+流式输出中途出错时记录日志, 以一个错误对象结束且不闭合数组, 客户端解析会失败, 不会把截断的结果当成完整数组
+运行 python -m utils.serializers --rows 100000 可进行序列化基准测试
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from operator import attrgetter
+from flask import current_app, stream_with_context
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+# 流式输出时每次编码的条数
+STREAM_CHUNK_SIZE = 1000
+
+def _default(value):
+    if isinstance(value, (datetime, date)):  # 与 orjson 对时间的默认输出一致
+        return value.isoformat()
+    if isinstance(value, Decimal):  # orjson 和标准库都不能直接编码 Decimal, 转为字符串以免丢失精度
+        return str(value)
+    raise TypeError(f'{type(value).__name__} 类型无法序列化为 JSON')
+
+def dumps(data):
+    """编码为 UTF-8 JSON 字节串"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+def loads(data):
+    """解析 JSON (str 或 bytes)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def isoformat(name):
+    """时间字段: 返回 ISO 格式, 为空时返回 None"""
+    get = attrgetter(name)
+    def convert(obj):
+        value = get(obj)
+        return value.isoformat() if value is not None else None
+    return convert
+
+def enum_name(name):
+    """枚举字段: 返回枚举名称, 为空时返回 None"""
+    get = attrgetter(name)
+    def convert(obj):
+        value = get(obj)
+        return value.name if value is not None else None
+    return convert
+
+class ModelSerializer:
+    """
+    :param fields: 字段名 (同名属性), 或 (返回字段名, 属性名/取值函数)
+    ORM 对象和只查询部分列得到的 Row 都可以序列化
+    """
+    def __init__(self, *fields):
+        self.fields = []
+        for field in fields:
+            key, source = (field, field) if isinstance(field, str) else field
+            self.fields.append((key, attrgetter(source) if isinstance(source, str) else source))
+
+    @property
+    def keys(self):
+        return [key for key, _ in self.fields]
+
+    def to_dict(self, obj):
+        return {key: get(obj) for key, get in self.fields}
+
+    def many(self, objs):
+        fields = self.fields
+        return [{key: get(obj) for key, get in fields} for obj in objs]
+
+    def iter_json(self, objs, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        逐块编码为 JSON 数组 ([, 元素..., ]), 内存中只保留一块数据
+        此时响应头已发出, 中途出错无法再改状态码: 记录日志后输出错误对象并结束, 不输出 ], 使响应不是合法 JSON
+        """
+        yield b'['
+        chunk, first = [], True
+        try:
+            for obj in objs:
+                chunk.append(self.to_dict(obj))
+                if len(chunk) >= chunk_size:
+                    yield (b'' if first else b',') + dumps(chunk)[1:-1]
+                    chunk, first = [], False
+            if chunk:
+                yield (b'' if first else b',') + dumps(chunk)[1:-1]
+        except Exception as e:
+            current_app.logger.exception(f"JSON 数组流式输出中断: {e}")
+            yield b'\n' + dumps({'error': '数据读取失败, 响应不完整'})
+            return
+        yield b']'
+
+def json_response(data, status=200):
+    return current_app.response_class(dumps(data), status=status, mimetype='application/json')
+
+def stream_json_array(serializer, objs, chunk_size=STREAM_CHUNK_SIZE):
+    """以分块传输返回 JSON 数组, objs 可以是 query.yield_per() 等惰性迭代器"""
+    return current_app.response_class(stream_with_context(serializer.iter_json(objs, chunk_size)),
+                                      mimetype='application/json')
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from collections import namedtuple
+
+    parser = argparse.ArgumentParser(description='序列化基准测试')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--stdlib', action='store_true', help='不使用 orjson, 对比标准库 json')
+    options = parser.parse_args()
+    if options.stdlib:
+        orjson = None
+
+    UserRow = namedtuple('UserRow', ['user_id', 'username', 'email', 'role_level', 'is_active'])
+    MessageRow = namedtuple('MessageRow', ['message_id', 'sender_id', 'username', 'incident_id', 'content',
+                                           'is_read', 'sent_at'])
+    now = datetime.utcnow()
+    users = [UserRow(i, f'user{i}', f'user{i}@example.com', i % 4, True) for i in range(options.rows)]
+    messages = [MessageRow(i, i % 100, f'user{i % 100}', i % 50 or None, f'事件 {i} 已下发应急小组, 请及时处理', i % 3 == 0, now)
+                for i in range(options.rows)]
+    user_serializer = ModelSerializer('user_id', 'username', 'email', 'role_level', 'is_active')
+    message_serializer = ModelSerializer('message_id', 'sender_id', ('sender_name', 'username'), 'incident_id',
+                                         'content', 'is_read', ('sent_at', isoformat('sent_at')))
+
+    def manual_users():
+        return json.dumps([{'user_id': u.user_id, 'username': u.username, 'email': u.email,
+                            'role_level': u.role_level, 'is_active': u.is_active} for u in users]).encode()
+
+    def manual_messages():
+        return json.dumps([{'message_id': m.message_id, 'sender_id': m.sender_id, 'sender_name': m.username,
+                            'incident_id': m.incident_id, 'content': m.content, 'is_read': m.is_read,
+                            'sent_at': m.sent_at.isoformat()} for m in messages]).encode()
+
+    def timed(label, func):
+        start = time.perf_counter()
+        size = len(func())
+        print(f'{label:<36}{time.perf_counter() - start:8.3f}s {size / 1024 / 1024:8.1f} MiB')
+
+    print(f'{options.rows} 行, JSON 后端: {"orjson" if orjson else "json"}')
+    for name, rows, serializer, manual in (('users', users, user_serializer, manual_users),
+                                           ('messages', messages, message_serializer, manual_messages)):
+        timed(f'{name}: 手写 dict + json.dumps', manual)
+        timed(f'{name}: ModelSerializer + dumps', lambda: dumps(serializer.many(rows)))
+        timed(f'{name}: 流式分块', lambda: b''.join(serializer.iter_json(rows)))
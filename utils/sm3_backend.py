@@ -0,0 +1,136 @@
+# utils/sm3_backend.py
+"""
+SM3 哈希后端
+按以下顺序选择第一个可用且通过 GB/T 32905 标准测试向量校验的实现:
+    1. openssl: 通过 hashlib 调用 OpenSSL 的 sm3 (需 OpenSSL 编译时启用 SM3)
+    2. python:  基于 bytes/int 的纯 Python 实现
+    3. gmssl:   gmssl 库自带的 sm3_hash (兼容兜底)
+可通过环境变量 SM3_BACKEND 强制指定后端
+运行 python -m utils.sm3_backend 可对各后端进行微基准对比
+"""
+import hashlib
+import os
+import struct
+
+# GB/T 32905-2016 附录 A 中的测试向量
+TEST_VECTORS = [
+    (b'abc', '66c7f0f462eeedd9d1f2d46bdc10e4e24167c4875cf2f7a2297da02b8f4ba8e0'),
+    (b'abcd' * 16, 'debe9ff92275b8a138604889c18e5a4d6fdb70e5387e5765293dcba39c0c5732'),
+]
+
+_IV = (0x7380166F, 0x4914B2B9, 0x172442D7, 0xDA8A0600,
+       0xA96F30BC, 0x163138AA, 0xE38DEE4D, 0xB0FB0E4E)
+_MASK = 0xFFFFFFFF
+
+def _rotl(x, n):
+    n %= 32
+    return ((x << n) | (x >> (32 - n))) & _MASK
+
+# 预先计算每一轮循环左移后的常量 T_j <<< j
+_T = tuple(_rotl(0x79CC4519 if j < 16 else 0x7A879D8A, j) for j in range(64))
+_BLOCK = struct.Struct('>16I')
+_DIGEST = struct.Struct('>8I')
+
+def _compress(v, block):
+    """对单个 64 字节分组执行消息扩展与压缩"""
+    w = list(_BLOCK.unpack(block))
+    for j in range(16, 68):
+        x = w[j - 16] ^ w[j - 9] ^ (((w[j - 3] << 15) | (w[j - 3] >> 17)) & _MASK)
+        x ^= (((x << 15) | (x >> 17)) ^ ((x << 23) | (x >> 9))) & _MASK
+        w.append(x ^ (((w[j - 13] << 7) | (w[j - 13] >> 25)) & _MASK) ^ w[j - 6])
+
+    a, b, c, d, e, f, g, h = v
+    for j in range(64):
+        a12 = ((a << 12) | (a >> 20)) & _MASK
+        ss1 = (a12 + e + _T[j]) & _MASK
+        ss1 = ((ss1 << 7) | (ss1 >> 25)) & _MASK
+        ss2 = ss1 ^ a12
+        if j < 16:
+            tt1 = ((a ^ b ^ c) + d + ss2 + (w[j] ^ w[j + 4])) & _MASK
+            tt2 = ((e ^ f ^ g) + h + ss1 + w[j]) & _MASK
+        else:
+            tt1 = (((a & b) | (a & c) | (b & c)) + d + ss2 + (w[j] ^ w[j + 4])) & _MASK
+            tt2 = (((e & f) | (~e & g)) + h + ss1 + w[j]) & _MASK
+        d = c
+        c = ((b << 9) | (b >> 23)) & _MASK
+        b = a
+        a = tt1
+        h = g
+        g = ((f << 19) | (f >> 13)) & _MASK
+        f = e
+        e = tt2 ^ (((tt2 << 9) | (tt2 >> 23)) & _MASK) ^ (((tt2 << 17) | (tt2 >> 15)) & _MASK)
+    return (a ^ v[0], b ^ v[1], c ^ v[2], d ^ v[3],
+            e ^ v[4], f ^ v[5], g ^ v[6], h ^ v[7])
+
+def _python_sm3(data):
+    """纯 Python 实现, 直接在 bytes 与 int 上运算"""
+    length = len(data)
+    data = bytes(data) + b'\x80' + b'\x00' * ((55 - length) % 64) + struct.pack('>Q', length * 8)
+    v = _IV
+    for i in range(0, len(data), 64):
+        v = _compress(v, data[i:i + 64])
+    return _DIGEST.pack(*v).hex()
+
+def _openssl_sm3(data):
+    return hashlib.new('sm3', data).hexdigest()
+
+def _gmssl_sm3(data):
+    from gmssl import sm3
+    return sm3.sm3_hash(list(data))
+
+def _openssl_available():
+    return 'sm3' in hashlib.algorithms_available
+
+def _gmssl_available():
+    try:
+        import gmssl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+# 后端名称 -> (实现函数, 可用性检查), 按优先级排列
+BACKENDS = {
+    'openssl': (_openssl_sm3, _openssl_available),
+    'python': (_python_sm3, lambda: True),
+    'gmssl': (_gmssl_sm3, _gmssl_available),
+}
+
+def self_test(func):
+    """使用标准测试向量校验实现是否正确"""
+    try:
+        return all(func(message) == digest for message, digest in TEST_VECTORS)
+    except Exception:
+        return False
+
+def available_backends():
+    """返回当前环境中可用且通过校验的后端名称列表 (按优先级)"""
+    return [name for name, (func, available) in BACKENDS.items() if available() and self_test(func)]
+
+def _select_backend():
+    preferred = os.environ.get('SM3_BACKEND')
+    if preferred:
+        if preferred not in BACKENDS:
+            raise ValueError(f"未知的 SM3 后端: {preferred}")
+        func, available = BACKENDS[preferred]
+        if not available() or not self_test(func):
+            raise RuntimeError(f"SM3 后端 {preferred} 不可用或未通过标准向量校验")
+        return preferred
+    return available_backends()[0]
+
+BACKEND_NAME = _select_backend()
+_sm3 = BACKENDS[BACKEND_NAME][0]
+
+def sm3_hexdigest(data):
+    """计算 SM3 摘要, 返回小写十六进制字符串"""
+    return _sm3(data)
+
+if __name__ == '__main__':
+    import timeit
+
+    sample = os.urandom(16).hex().encode('utf-8') + 'password123'.encode('utf-8')
+    print(f'当前后端: {BACKEND_NAME}')
+    for name in available_backends():
+        func = BACKENDS[name][0]
+        rounds = 2000 if name == 'gmssl' else 20000
+        cost = timeit.timeit(lambda: func(sample), number=rounds)
+        print(f'{name:8s} {cost / rounds * 1e6:10.2f} us/次')
@@ -1,28 +1,42 @@
 # utils/sm_utils.py
 import os
-from gmssl import sm3, func  # 导入 gmssl 库
 import binascii
 import hashlib
+import threading
+from utils.sm3_backend import sm3_hexdigest  # 自动选择最快的 SM3 实现
 
 def encrypt_sm3(data, salt):
     """使用 SM3 算法对数据进行哈希 (加盐)"""
     salted_data = salt + data
-    #  将字符串转换为字节串
-    bytes_data = [x for x in salted_data.encode('utf-8')]
-     #  创建 SM3 对象
-    sm3_hash = sm3.sm3_hash(bytes_data)
-    return sm3_hash
+    return sm3_hexdigest(salted_data.encode('utf-8'))
 
 def generate_salt(length=16):
     """生成指定长度的随机盐值"""
     return os.urandom(length).hex()  # 返回 16 进制字符串
 
+# SM4 密码上下文缓存: (key, mode) -> 已完成密钥扩展的 CryptSM4
+# crypt_cbc 只读取轮密钥与模式, 上下文创建后可以在多个线程之间安全共享
+_sm4_contexts = {}
+_sm4_contexts_lock = threading.Lock()
+
+def get_sm4_context(key, mode):
+    """获取指定密钥与方向的 SM4 上下文, 每个 (key, mode) 只执行一次密钥扩展"""
+    context = _sm4_contexts.get((key, mode))
+    if context is None:
+        from gmssl import sm4
+        with _sm4_contexts_lock:
+            context = _sm4_contexts.get((key, mode))
+            if context is None:
+                context = sm4.CryptSM4()
+                context.set_key(key.encode('utf-8'), mode)
+                _sm4_contexts[(key, mode)] = context
+    return context
+
 # 加密功能
 def encrypt_sm4(key, data, iv):
     """SM4加密 (CBC模式)"""
     from gmssl import sm4
-    sm4_crypt = sm4.CryptSM4()
-    sm4_crypt.set_key(key.encode('utf-8'), sm4.SM4_ENCRYPT)
+    sm4_crypt = get_sm4_context(key, sm4.SM4_ENCRYPT)
     encrypt_data = sm4_crypt.crypt_cbc(iv.encode('utf-8'), data.encode('utf-8'))
     return binascii.hexlify(encrypt_data).decode('utf-8')
 
@@ -30,13 +44,35 @@ def encrypt_sm4(key, data, iv):
 def decrypt_sm4(key, data, iv):
     """SM4解密 (CBC模式)"""
     from gmssl import sm4
-    sm4_crypt = sm4.CryptSM4()
-    sm4_crypt.set_key(key.encode('utf-8'), sm4.SM4_DECRYPT)
+    sm4_crypt = get_sm4_context(key, sm4.SM4_DECRYPT)
     # 首先将十六进制字符串转换为字节数组
     data = binascii.unhexlify(data)
     decrypt_data = sm4_crypt.crypt_cbc(iv.encode('utf-8'), data)
     return decrypt_data.decode('utf-8')
 
+# 批量解密
+def decrypt_sm4_many(key, values, iv):
+    """
+    SM4批量解密 (CBC模式), 供一次处理多行数据时使用
+    共用同一个解密上下文, 相同密文只解密一次, None 原样返回
+    :return: 与 values 顺序一致的明文列表
+    """
+    from gmssl import sm4
+    sm4_crypt = get_sm4_context(key, sm4.SM4_DECRYPT)
+    iv = iv.encode('utf-8')
+    plaintexts = {}
+    result = []
+    for value in values:
+        if value is None:
+            result.append(None)
+            continue
+        plaintext = plaintexts.get(value)
+        if plaintext is None:
+            plaintext = sm4_crypt.crypt_cbc(iv, binascii.unhexlify(value)).decode('utf-8')
+            plaintexts[value] = plaintext
+        result.append(plaintext)
+    return result
+
 # 加载服务器 SM2 私钥
 def load_server_sm2_private_key(pem_path, password=None):
     """